@@ -7,6 +7,7 @@ import { SettingsPanel } from "./components/SettingsPanel/SettingsPanel";
 import type { AeronauticalLayerState } from "./types/AeronauticalLayerState";
 import { defaultAeronauticalState } from "./types/AeronauticalLayerState";
 import type { FlightPlan, SearchIndex } from "./types/FlightPlan";
+import { ShardedSearchIndex } from "./utils/searchIndex";
 
 export const accentColor = "iris" as const;
 export const grayColor = "gray" as const;
@@ -56,9 +57,8 @@ function App() {
 		const loadIndex = async () => {
 			setIndexLoading(true);
 			try {
-				const res = await fetch("search_index.json");
-				const data = await res.json();
-				setIndex(data);
+				// Only the manifest; routes fetch the shards they need
+				setIndex(await ShardedSearchIndex.load());
 			} catch (err) {
 				console.error("Failed to load search index", err);
 			} finally {
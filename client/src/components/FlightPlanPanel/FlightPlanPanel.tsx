@@ -22,8 +22,12 @@ import {
 } from "lucide-react";
 import React, { useCallback, useEffect, useState } from "react";
 import { grayColor } from "../../App.tsx";
-import type { FlightPlan, SearchIndex } from "../../types/FlightPlan";
-import { parseRoute } from "../../utils/routeParser";
+import type {
+	FlightPlan,
+	SearchIndex,
+	Suggestion,
+} from "../../types/FlightPlan";
+import { loadRouteData, parseRoute } from "../../utils/routeParser";
 import {
 	Accordion,
 	AccordionContent,
@@ -49,12 +53,36 @@ export const FlightPlanContent: React.FC<FlightPlanContentProps> = ({
 	style,
 }) => {
 	const [activePlan, setActivePlan] = useState<FlightPlan | null>(null);
+	const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
 	const initialPlotDone = React.useRef(false);
 
+	// The fix being typed: the route's last word until a space ends it
+	const typing = /\S+$/.exec(routeString)?.[0] ?? "";
+
+	useEffect(() => {
+		if (!index || !typing) {
+			setSuggestions([]);
+			return;
+		}
+		let current = true;
+		index.loadSuggestions(typing).then(() => {
+			if (current) setSuggestions(index.suggest(typing));
+		});
+		return () => {
+			current = false;
+		};
+	}, [index, typing]);
+
+	const handleSuggestion = (ident: string) => {
+		const rest = routeString.slice(0, routeString.length - typing.length);
+		onRouteStringChange(`${rest}${ident} `);
+	};
+
 	// No longer needed as we fetch in App.tsx
 
-	const handlePlot = useCallback(() => {
+	const handlePlot = useCallback(async () => {
 		if (!index) return;
+		await loadRouteData(routeString, index);
 		const plan = parseRoute(routeString, index);
 		setActivePlan(plan);
 		onFlightPlanChange(plan);
@@ -86,6 +114,24 @@ export const FlightPlanContent: React.FC<FlightPlanContentProps> = ({
 				style={{ fontFamily: "monospace" }}
 			/>
 
+			{suggestions.length > 0 && (
+				<Flex gap="1" wrap="wrap">
+					{suggestions.map((s) => (
+						<Button
+							key={s.ident}
+							size="1"
+							variant="soft"
+							color="gray"
+							title={s.name}
+							onClick={() => handleSuggestion(s.ident)}
+							style={{ fontFamily: "monospace" }}
+						>
+							{s.ident}
+						</Button>
+					))}
+				</Flex>
+			)}
+
 			<Flex gap="3">
 				<Button
 					onClick={handlePlot}
@@ -188,7 +234,7 @@ export const FlightPlanContent: React.FC<FlightPlanContentProps> = ({
 
 			{index && !activePlan && (
 				<Text size="1" color="gray">
-					Database loaded ({Object.keys(index.fixes).length} points)
+					Database loaded ({index.fixCount} points)
 				</Text>
 			)}
 		</Flex>
@@ -17,10 +17,27 @@ export interface ProcedureSegment {
 	transitions: Record<string, ProcedurePoint[]>;
 }
 
+export interface Suggestion {
+	ident: string;
+	name?: string;
+	type: FixInfo["type"];
+}
+
+// Loaded piece by piece (see utils/searchIndex.ts): get* only sees what load* fetched
 export interface SearchIndex {
-	fixes: Record<string, FixInfo>;
-	procedures: Record<string, Record<string, ProcedureSegment>>; // airport -> proc_name -> segment
-	airways: Record<string, string[]>; // airway_id -> ordered fix identifiers
+	fixCount: number;
+	loadFixes(idents: string[]): Promise<void>;
+	getFix(ident: string): FixInfo | undefined;
+	loadProcedureAirports(): Promise<void>;
+	getProcedureAirports(name: string): string[]; // proc_name -> airports publishing it
+	loadProcedures(airports: string[]): Promise<void>;
+	getProcedures(airport: string): Record<string, ProcedureSegment> | undefined; // proc_name -> segment
+	loadAirways(ids: string[]): Promise<void>;
+	getAirway(id: string): string[] | undefined; // ordered fix identifiers
+	// fixes from where `from` joins the airway to where `to` (fix or airway) leaves it
+	getAirwaySegment(id: string, from: string, to: string): string[] | undefined;
+	loadSuggestions(prefix: string): Promise<void>;
+	suggest(prefix: string): Suggestion[]; // best first
 }
 
 export interface RoutePoint {
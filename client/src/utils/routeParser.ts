@@ -6,15 +6,50 @@ import type {
 	SearchIndex,
 } from "../types/FlightPlan";
 
-export const parseRoute = (
-	routeStr: string,
-	index: SearchIndex,
-): FlightPlan => {
-	const parts = routeStr
+const AIRWAY_PATTERN = /^[VJQT]\d+$/;
+
+const tokenize = (routeStr: string): string[] =>
+	routeStr
 		.trim()
 		.toUpperCase()
 		.split(/\s+/)
 		.filter((p) => p.length > 0);
+
+/**
+ * Fetch the parts of the search index that parseRoute may look up for this
+ * route: the fixes it names, its airways and their fixes, and the procedures
+ * of the airports publishing any dotted procedure name.
+ */
+export const loadRouteData = async (
+	routeStr: string,
+	index: SearchIndex,
+): Promise<void> => {
+	const parts = tokenize(routeStr);
+	const names = parts.flatMap((p) => p.split("."));
+	const airways = parts.filter((p) => AIRWAY_PATTERN.test(p));
+	const dotted = parts.filter((p) => p.includes("."));
+
+	await Promise.all([
+		index.loadFixes(names),
+		airways.length > 0 && index.loadAirways(airways),
+		dotted.length > 0 &&
+			index
+				.loadProcedureAirports()
+				.then(() =>
+					index.loadProcedures(
+						dotted
+							.flatMap((p) => p.split("."))
+							.flatMap((name) => index.getProcedureAirports(name)),
+					),
+				),
+	]);
+};
+
+export const parseRoute = (
+	routeStr: string,
+	index: SearchIndex,
+): FlightPlan => {
+	const parts = tokenize(routeStr);
 	const routePoints: RoutePoint[] = [];
 	const allCoords: [number, number][] = [];
 
@@ -96,20 +131,15 @@ export const parseRoute = (
 			// Helper to find a procedure by name across all airports or within context
 			const findProcedure = (name: string) => {
 				// Try context first (if previous point was an airport)
-				if (
-					lastFixId &&
-					index.procedures[lastFixId] &&
-					index.procedures[lastFixId][name]
-				) {
-					return {
-						airport: lastFixId,
-						proc: index.procedures[lastFixId][name],
-					};
+				const contextProc = lastFixId && index.getProcedures(lastFixId)?.[name];
+				if (lastFixId && contextProc) {
+					return { airport: lastFixId, proc: contextProc };
 				}
-				// Scan all airports
-				for (const [apt, procs] of Object.entries(index.procedures)) {
-					if (procs[name]) {
-						return { airport: apt, proc: procs[name] };
+				// Then every airport publishing it
+				for (const apt of index.getProcedureAirports(name)) {
+					const proc = index.getProcedures(apt)?.[name];
+					if (proc) {
+						return { airport: apt, proc };
 					}
 				}
 				return null;
@@ -166,44 +196,39 @@ export const parseRoute = (
 			}
 		}
 
-		// Check for Airway (e.g., V68, J15)
-		if (/^[VJQT]\d+$/.test(part)) {
-			const airwayId = part;
+		// Check for Airway (e.g., V68, J15), flown from the previous fix to the
+		// next part (or, for another airway, to where the two cross)
+		if (AIRWAY_PATTERN.test(part)) {
 			const nextPart = parts[i + 1];
+			const segment =
+				lastFixId && nextPart
+					? index.getAirwaySegment(part, lastFixId, nextPart)
+					: undefined;
 
-			if (lastFixId && nextPart && index.airways) {
-				const airwayFixes = index.airways[airwayId];
-				if (airwayFixes) {
-					const startIdx = airwayFixes.indexOf(lastFixId);
-					const endIdx = airwayFixes.indexOf(nextPart);
-
-					if (startIdx !== -1 && endIdx !== -1) {
-						// Found segment.
-						const step = startIdx < endIdx ? 1 : -1;
-						// Extract intermediate fixes (exclusive of start and end)
-						for (let j = startIdx + step; j !== endIdx; j += step) {
-							const intermediateFixId = airwayFixes[j];
-							const fix = index.fixes[intermediateFixId];
-							if (fix) {
-								routePoints.push({
-									id: intermediateFixId,
-									lat: fix.lat,
-									lon: fix.lon,
-									type: fix.type,
-									name: fix.name,
-								});
-								allCoords.push([fix.lon, fix.lat]);
-							}
-						}
-						// No need to skip nextPart, the loop will handle it naturally.
-						continue;
+			if (segment) {
+				if (segment[0] === lastFixId) segment.shift();
+				if (segment[segment.length - 1] === nextPart) segment.pop();
+				for (const fixId of segment) {
+					const fix = index.getFix(fixId);
+					if (fix) {
+						routePoints.push({
+							id: fixId,
+							lat: fix.lat,
+							lon: fix.lon,
+							type: fix.type,
+							name: fix.name,
+						});
+						allCoords.push([fix.lon, fix.lat]);
+						lastFixId = fixId;
 					}
 				}
+				// No need to skip nextPart, the loop will handle it naturally.
+				continue;
 			}
 		}
 
 		// Direct Fix Lookup
-		const fix = index.fixes[part];
+		const fix = index.getFix(part);
 		if (fix) {
 			lastFixId = part;
 			routePoints.push({
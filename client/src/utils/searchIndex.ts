@@ -0,0 +1,486 @@
+import type {
+	FixInfo,
+	ProcedurePoint,
+	ProcedureSegment,
+	SearchIndex,
+	Suggestion,
+} from "../types/FlightPlan";
+
+// Layout written by faa-ais-pmtiles/src/search/build_index.py
+const BASE_URL = "search/";
+
+interface Manifest {
+	version: number;
+	fix_count: number;
+	coord_scale: number;
+	fix_types: FixInfo["type"][];
+	fix_shards: Record<string, number>;
+	suggest_results: number;
+	suggest_shards: string[];
+}
+
+interface FixShard {
+	idents: string[];
+	names: string[];
+	lon: Int32Array;
+	lat: Int32Array;
+	types: Uint8Array;
+}
+
+// Segments index `fixes` (fix table positions) followed by `points`, whose
+// coordinates are deltas from the previous point's
+interface CompactProcedures {
+	fixes: number[];
+	points: { ids: string[]; lon: number[]; lat: number[] };
+	procedures: Record<
+		string,
+		{ body: number[]; transitions: Record<string, number[]> }
+	>;
+}
+
+interface CompactAirway {
+	fixes: number[]; // fix table positions
+	mea: number[]; // per segment, feet (FL180 as 18000)
+	distance: number[]; // per segment, NM
+}
+
+// [ident, name, index into fix_types]
+type SuggestionEntry = [string, string, number];
+
+interface SuggestionShard {
+	fixes: SuggestionEntry[]; // best first
+	top: Record<string, number[]>;
+	keys: Record<string, [string, number][]>;
+}
+
+const fetchResource = async (path: string): Promise<Response> => {
+	const res = await fetch(BASE_URL + path);
+	if (!res.ok) throw new Error(`Failed to fetch ${path}: ${res.status}`);
+	return res;
+};
+
+/** Search keys are upper-case alphanumeric; anything else matches nothing. */
+const normalizeSuggestionPrefix = (prefix: string): string | null => {
+	const key = prefix.trim().toUpperCase();
+	return /^[A-Z0-9]+$/.test(key) ? key : null;
+};
+
+const decodeShard = (buffer: ArrayBuffer): FixShard => {
+	const count = new DataView(buffer).getUint32(0, true);
+	const lines = new TextDecoder()
+		.decode(new Uint8Array(buffer, 4 + 9 * count))
+		.split("\n");
+	return {
+		idents: lines.slice(0, count),
+		names: lines.slice(count, 2 * count),
+		lon: new Int32Array(buffer, 4, count),
+		lat: new Int32Array(buffer, 4 + 4 * count, count),
+		types: new Uint8Array(buffer, 4 + 8 * count, count),
+	};
+};
+
+/** Central angle between two fixes, to compare great-circle distances. */
+const angle = (a: FixInfo, b: FixInfo): number => {
+	const rad = Math.PI / 180;
+	const h =
+		Math.sin(((b.lat - a.lat) * rad) / 2) ** 2 +
+		Math.cos(a.lat * rad) *
+			Math.cos(b.lat * rad) *
+			Math.sin(((b.lon - a.lon) * rad) / 2) ** 2;
+	return 2 * Math.atan2(Math.sqrt(h), Math.sqrt(1 - h));
+};
+
+const undelta = (deltas: number[]): number[] => {
+	let value = 0;
+	return deltas.map((delta) => {
+		value += delta;
+		return value;
+	});
+};
+
+/** Run `load` once per key; a failed load is logged and may be retried. */
+const loadOnce = (
+	requests: Map<string, Promise<void>>,
+	key: string,
+	load: () => Promise<void>,
+): Promise<void> => {
+	let request = requests.get(key);
+	if (!request) {
+		request = load().catch((err) => {
+			requests.delete(key);
+			console.error(err);
+		});
+		requests.set(key, request);
+	}
+	return request;
+};
+
+/**
+ * The sharded search index. Only the manifest is fetched up front; fix shards,
+ * airways and per-airport procedures are fetched on demand by the load* methods
+ * and then answered synchronously by the get* methods.
+ */
+export class ShardedSearchIndex implements SearchIndex {
+	private shards = new Map<string, FixShard>();
+	private shardRequests = new Map<string, Promise<void>>();
+	private procedures = new Map<string, Record<string, ProcedureSegment>>();
+	private procedureRequests = new Map<string, Promise<void>>();
+	private airways: Record<string, CompactAirway> | null = null;
+	private airwayPositions = new Map<string, Map<number, number>>();
+	private procedureAirports: Record<string, string[]> | null = null;
+	private suggestionTop: Record<string, SuggestionEntry[]> | null = null;
+	private suggestionShards = new Map<string, SuggestionShard>();
+	private suggestionRequests = new Map<string, Promise<void>>();
+	private suggestionShardPrefixes: Set<string>;
+	private shardStarts: { start: number; prefix: string }[] = [];
+	private shardStartByPrefix = new Map<string, number>();
+	private manifest: Manifest;
+
+	private constructor(manifest: Manifest) {
+		this.manifest = manifest;
+		this.suggestionShardPrefixes = new Set(manifest.suggest_shards);
+		// The fix table is the shards in prefix order
+		let start = 0;
+		for (const prefix of Object.keys(manifest.fix_shards).sort()) {
+			this.shardStarts.push({ start, prefix });
+			this.shardStartByPrefix.set(prefix, start);
+			start += manifest.fix_shards[prefix];
+		}
+	}
+
+	static async load(): Promise<ShardedSearchIndex> {
+		const res = await fetchResource("manifest.json");
+		return new ShardedSearchIndex(await res.json());
+	}
+
+	get fixCount(): number {
+		return this.manifest.fix_count;
+	}
+
+	/** The shard holding an ident: its longest prefix listed in the manifest. */
+	private shardPrefix(ident: string): string | null {
+		for (let n = ident.length; n > 0; n--) {
+			const prefix = ident.slice(0, n);
+			if (prefix in this.manifest.fix_shards) return prefix;
+		}
+		return null;
+	}
+
+	/** The shard and position in it of a fix table position. */
+	private locateFix(position: number): { prefix: string; offset: number } {
+		let lo = 0;
+		let hi = this.shardStarts.length - 1;
+		while (lo < hi) {
+			const mid = (lo + hi + 1) >>> 1;
+			if (this.shardStarts[mid].start <= position) lo = mid;
+			else hi = mid - 1;
+		}
+		const { start, prefix } = this.shardStarts[lo];
+		return { prefix, offset: position - start };
+	}
+
+	async loadFixes(idents: string[]): Promise<void> {
+		const prefixes = new Set<string>();
+		for (const ident of idents) {
+			const prefix = this.shardPrefix(ident);
+			if (prefix !== null) prefixes.add(prefix);
+		}
+		await this.loadShards(prefixes);
+	}
+
+	private async loadFixPositions(positions: Iterable<number>): Promise<void> {
+		const prefixes = new Set<string>();
+		for (const position of positions) {
+			prefixes.add(this.locateFix(position).prefix);
+		}
+		await this.loadShards(prefixes);
+	}
+
+	private async loadShards(prefixes: Set<string>): Promise<void> {
+		await Promise.all(
+			[...prefixes].map((prefix) =>
+				loadOnce(this.shardRequests, prefix, async () => {
+					const res = await fetchResource(`fixes/${prefix}.bin`);
+					this.shards.set(prefix, decodeShard(await res.arrayBuffer()));
+				}),
+			),
+		);
+	}
+
+	/** A loaded fix's shard and position in it. */
+	private findFix(
+		ident: string,
+	): { prefix: string; shard: FixShard; offset: number } | undefined {
+		const prefix = this.shardPrefix(ident);
+		const shard = prefix === null ? undefined : this.shards.get(prefix);
+		if (prefix === null || !shard) return undefined;
+		// Idents are sorted within a shard
+		let lo = 0;
+		let hi = shard.idents.length;
+		while (lo < hi) {
+			const mid = (lo + hi) >>> 1;
+			if (shard.idents[mid] < ident) lo = mid + 1;
+			else hi = mid;
+		}
+		if (shard.idents[lo] !== ident) return undefined;
+		return { prefix, shard, offset: lo };
+	}
+
+	getFix(ident: string): FixInfo | undefined {
+		const found = this.findFix(ident);
+		return found && this.fixInfo(found.shard, found.offset);
+	}
+
+	private fixInfo(shard: FixShard, offset: number): FixInfo {
+		const scale = this.manifest.coord_scale;
+		return {
+			lat: shard.lat[offset] / scale,
+			lon: shard.lon[offset] / scale,
+			type: this.manifest.fix_types[shard.types[offset]],
+			name: shard.names[offset] || undefined,
+		};
+	}
+
+	/** The fix at a fix table position, once its shard is loaded. */
+	private fixAt(position: number): [string, FixInfo] | undefined {
+		const { prefix, offset } = this.locateFix(position);
+		const shard = this.shards.get(prefix);
+		if (!shard) return undefined;
+		return [shard.idents[offset], this.fixInfo(shard, offset)];
+	}
+
+	async loadAirways(ids: string[]): Promise<void> {
+		if (!this.airways) {
+			this.airways = await (await fetchResource("airways.json")).json();
+		}
+		const airways = this.airways;
+		await this.loadFixPositions(
+			ids.flatMap((id) => airways?.[id]?.fixes ?? []),
+		);
+	}
+
+	getAirway(id: string): string[] | undefined {
+		return this.airways?.[id]?.fixes.map((p) => this.fixAt(p)?.[0] ?? "");
+	}
+
+	/** Fix table position -> first position along the airway. */
+	private airwayFixPositions(id: string, airway: CompactAirway) {
+		let positions = this.airwayPositions.get(id);
+		if (!positions) {
+			const first = new Map<number, number>();
+			airway.fixes.forEach((p, seq) => {
+				if (!first.has(p)) first.set(p, seq);
+			});
+			positions = first;
+			this.airwayPositions.set(id, positions);
+		}
+		return positions;
+	}
+
+	/**
+	 * Where a route from or to a fix meets the airway: the fix itself or the
+	 * airway fix nearest to it.
+	 */
+	private airwayPosition(
+		id: string,
+		airway: CompactAirway,
+		ident: string,
+	): number | undefined {
+		const found = this.findFix(ident);
+		if (!found) return undefined;
+		const start = this.shardStartByPrefix.get(found.prefix) ?? 0;
+		const seq = this.airwayFixPositions(id, airway).get(start + found.offset);
+		if (seq !== undefined) return seq;
+		const fix = this.fixInfo(found.shard, found.offset);
+		let nearest: number | undefined;
+		let best = Infinity;
+		airway.fixes.forEach((p, n) => {
+			const other = this.fixAt(p);
+			if (!other) return;
+			const d = angle(fix, other[1]);
+			if (d < best) {
+				best = d;
+				nearest = n;
+			}
+		});
+		return nearest;
+	}
+
+	/**
+	 * The fixes of airway `id` from where `from` joins it to where `to` (a fix
+	 * or the next airway, left where the two cross) leaves it, inclusive. Same
+	 * rules as faa-ais-pmtiles/src/search/airways.py.
+	 */
+	getAirwaySegment(
+		id: string,
+		from: string,
+		to: string,
+	): string[] | undefined {
+		const airway = this.airways?.[id];
+		if (!airway) return undefined;
+		const i = this.airwayPosition(id, airway, from);
+		if (i === undefined) return undefined;
+		let j: number | undefined;
+		const other = this.airways?.[to];
+		if (other) {
+			const crossings = this.airwayFixPositions(to, other);
+			airway.fixes.forEach((p, n) => {
+				if (
+					crossings.has(p) &&
+					(j === undefined || Math.abs(n - i) < Math.abs(j - i))
+				) {
+					j = n;
+				}
+			});
+		} else {
+			j = this.airwayPosition(id, airway, to);
+		}
+		if (j === undefined) return undefined;
+		const step = i <= j ? 1 : -1;
+		const fixes: string[] = [];
+		for (let n = i; n !== j + step; n += step) {
+			const fix = this.fixAt(airway.fixes[n]);
+			if (fix) fixes.push(fix[0]);
+		}
+		return fixes;
+	}
+
+	async loadProcedureAirports(): Promise<void> {
+		if (this.procedureAirports) return;
+		this.procedureAirports = await (
+			await fetchResource("procedure_airports.json")
+		).json();
+	}
+
+	getProcedureAirports(name: string): string[] {
+		return this.procedureAirports?.[name] ?? [];
+	}
+
+	async loadProcedures(airports: string[]): Promise<void> {
+		await Promise.all(
+			airports.map((airport) =>
+				loadOnce(this.procedureRequests, airport, async () => {
+					const res = await fetchResource(`procedures/${airport}.json`);
+					const data: CompactProcedures = await res.json();
+					await this.loadFixPositions(data.fixes);
+					this.procedures.set(airport, this.expandProcedures(data));
+				}),
+			),
+		);
+	}
+
+	getProcedures(airport: string): Record<string, ProcedureSegment> | undefined {
+		return this.procedures.get(airport);
+	}
+
+	private expandProcedures(
+		data: CompactProcedures,
+	): Record<string, ProcedureSegment> {
+		const scale = this.manifest.coord_scale;
+		const points: (ProcedurePoint | undefined)[] = [];
+		for (const position of data.fixes) {
+			const fix = this.fixAt(position);
+			points.push(
+				fix && {
+					coords: [fix[1].lon, fix[1].lat],
+					id: fix[0],
+					type: fix[1].type,
+					name: fix[1].name ?? "",
+				},
+			);
+		}
+		const lon = undelta(data.points.lon);
+		const lat = undelta(data.points.lat);
+		data.points.ids.forEach((id, i) => {
+			points.push({
+				coords: [lon[i] / scale, lat[i] / scale],
+				id,
+				type: "waypoint",
+				name: "",
+			});
+		});
+		// A fix whose shard failed to load is left out
+		const resolve = (refs: number[]) => refs.flatMap((i) => points[i] ?? []);
+		const procedures: Record<string, ProcedureSegment> = {};
+		for (const [name, proc] of Object.entries(data.procedures)) {
+			procedures[name] = {
+				body: resolve(proc.body),
+				transitions: Object.fromEntries(
+					Object.entries(proc.transitions).map(([t, refs]) => [
+						t,
+						resolve(refs),
+					]),
+				),
+			};
+		}
+		return procedures;
+	}
+
+	/** The suggestion shard of a search key prefix: its longest listed prefix. */
+	private suggestionShardPrefix(key: string): string | null {
+		for (let n = key.length; n > 0; n--) {
+			const prefix = key.slice(0, n);
+			if (this.suggestionShardPrefixes.has(prefix)) return prefix;
+		}
+		return null;
+	}
+
+	private toSuggestion([ident, name, type]: SuggestionEntry): Suggestion {
+		return {
+			ident,
+			name: name || undefined,
+			type: this.manifest.fix_types[type],
+		};
+	}
+
+	async loadSuggestions(prefix: string): Promise<void> {
+		const key = normalizeSuggestionPrefix(prefix);
+		if (key === null) return;
+		await loadOnce(this.suggestionRequests, "", async () => {
+			this.suggestionTop = await (await fetchResource("suggest/top.json")).json();
+		});
+		if (this.suggestionTop?.[key]) return;
+		const shardPrefix = this.suggestionShardPrefix(key);
+		if (shardPrefix === null) return;
+		await loadOnce(this.suggestionRequests, shardPrefix, async () => {
+			const res = await fetchResource(`suggest/${shardPrefix}.json`);
+			this.suggestionShards.set(shardPrefix, await res.json());
+		});
+	}
+
+	/**
+	 * The best fixes whose ident, FAA airport identifier or a word of whose name
+	 * starts with `prefix`, by decluttering rank. Every lookup is a table hit or
+	 * a scan of at most a few dozen keys.
+	 */
+	suggest(prefix: string): Suggestion[] {
+		const key = normalizeSuggestionPrefix(prefix);
+		if (key === null) return [];
+		const top = this.suggestionTop?.[key];
+		if (top) return top.map((entry) => this.toSuggestion(entry));
+
+		const shardPrefix = this.suggestionShardPrefix(key);
+		const shard =
+			shardPrefix === null ? undefined : this.suggestionShards.get(shardPrefix);
+		if (!shardPrefix || !shard) return [];
+		const listed = shard.top[key];
+		if (listed) return listed.map((i) => this.toSuggestion(shard.fixes[i]));
+
+		// Otherwise filter the keys under the longest prefix that lists them
+		for (let n = key.length; n >= shardPrefix.length; n--) {
+			const pairs = shard.keys[key.slice(0, n)];
+			if (!pairs) continue;
+			const found: number[] = [];
+			for (const [candidate, i] of pairs) {
+				// Pairs are ordered by fix, so a repeated fix follows its first match
+				if (candidate.startsWith(key) && found[found.length - 1] !== i) {
+					found.push(i);
+				}
+			}
+			return found
+				.slice(0, this.manifest.suggest_results)
+				.map((i) => this.toSuggestion(shard.fixes[i]));
+		}
+		return [];
+	}
+}
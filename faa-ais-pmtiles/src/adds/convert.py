@@ -8,15 +8,23 @@ Sources:
   - Digital Obstacle File: GeoJSON from ADDS ArcGIS Hub
 """
 
+import concurrent.futures
+import functools
 import glob
-import json
 import os
+import sys
 
-import geojson
 import geopandas as gpd
-import shapefile
+import pandas as pd
+import pyarrow as pa
+import pyogrio
+import shapely
 
-from src.common.utils import parse_altitude
+from src.common import instrument, region, stream
+from src.common.dissolve import parallel_dissolve
+from src.common.features import FeatureBuilder, round_coordinates
+from src.common.repair import repair_geometries
+from src.common.utils import parse_altitude_array, write_layer
 
 # ---------------------------------------------------------------------------
 # Class Airspace (Shapefiles)
@@ -37,134 +45,271 @@ LOCAL_TYPE_TO_CLASS: dict[str, str] = {
     "MODE C": "MODE_C",
 }
 
+# "type" and "airspace_class" start out as the raw LOCAL_TYPE / CLASS and are
+# resolved by `classify_controlled_airspace`
+CLASS_AIRSPACE_FIELDS: dict = {
+    "name": (("NAME", "IDENT"), "text"),
+    "type": ("LOCAL_TYPE", "upper"),
+    "airspace_class": ("CLASS", "upper"),
+    "is_sua": False,
+    "upper_limit": ("UPPER_VAL", "or_empty"),
+    "lower_limit": ("LOWER_VAL", "or_empty"),
+    "upper_m": ("UPPER_VAL", "altitude_m"),
+    "lower_m": ("LOWER_VAL", "altitude_m"),
+    # "local_type": ("LOCAL_TYPE", "upper"),
+}
 
-def classify_controlled_airspace(record: dict) -> dict:
-    """Derive frontend-compatible properties from shapefile attributes."""
-    raw_class = (record.get("CLASS") or "").strip().upper()
-    local_type = (record.get("LOCAL_TYPE") or "").strip().upper()
-    name = (record.get("NAME") or record.get("IDENT") or "").strip()
-
-    airspace_class = LOCAL_TYPE_TO_CLASS.get(local_type, raw_class)
-    display_type = airspace_class if airspace_class == "E" else local_type
-
-    upper_val = record.get("UPPER_VAL") or ""
-    lower_val = record.get("LOWER_VAL") or ""
-
-    return {
-        "name": name,
-        "type": display_type,
-        "airspace_class": airspace_class,
-        "is_sua": False,
-        "upper_limit": upper_val,
-        "lower_limit": lower_val,
-        "upper_m": parse_altitude(upper_val) * 0.3048,
-        "lower_m": parse_altitude(lower_val) * 0.3048,
-        # "local_type": local_type,
-    }
 
+def classify_controlled_airspace(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Resolve the class and display type of mapped shapefile rows (LOCAL_TYPE wins over CLASS)."""
+    local_type = gdf["type"]
+    airspace_class = local_type.map(LOCAL_TYPE_TO_CLASS).fillna(gdf["airspace_class"])
+    gdf["airspace_class"] = airspace_class
+    gdf["type"] = local_type.where(airspace_class != "E", "E")
+    return gdf
 
-def shape_to_geojson_geometry(
-    shape: shapefile.Shape,
-) -> geojson.Polygon | geojson.MultiPolygon | None:
-    """Convert a pyshp Shape to a GeoJSON geometry."""
-    geo = shape.__geo_interface__
-    geom_type = geo.get("type")
 
-    if geom_type == "Polygon":
-        return geojson.Polygon(geo["coordinates"])
-    elif geom_type == "MultiPolygon":
-        return geojson.MultiPolygon(geo["coordinates"])
-    return None
+def read_class_airspace(shp_path: str, bbox: tuple | None = None) -> gpd.GeoDataFrame:
+    """Read one Class Airspace shapefile into frontend-compatible features."""
+    return classify_controlled_airspace(read_mapped(shp_path, CLASS_AIRSPACE_FIELDS, bbox))
 
 
-def convert_class_airspace(shp_dir: str = "shapefiles") -> list[geojson.Feature]:
-    """Read Class Airspace shapefiles and return features."""
+def convert_class_airspace(
+    shp_dir: str = "shapefiles", max_workers: int | None = None, bbox: tuple | None = None
+) -> gpd.GeoDataFrame:
+    """Read Class Airspace shapefiles (one GDAL reader thread per file) and return features."""
     shp_files = glob.glob(os.path.join(shp_dir, "**", "*.shp"), recursive=True)
     if not shp_files:
         print(f"  No .shp files found in {shp_dir}/")
-        return []
+        return FeatureBuilder().to_geodataframe()
 
-    features: list[geojson.Feature] = []
     for shp_path in shp_files:
         print(f"  Reading {shp_path}...")
-        sf = shapefile.Reader(shp_path)
-        field_names = [f[0] for f in sf.fields[1:]]
+    # GDAL does the decoding with the GIL released, so threads overlap the per-file reads
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(functools.partial(read_class_airspace, bbox=bbox), shp_files))
 
-        for sr in sf.shapeRecords():
-            record = dict(zip(field_names, sr.record))
-            geom = shape_to_geojson_geometry(sr.shape)
-            if geom is None:
-                continue
-            props = classify_controlled_airspace(record)
-            features.append(geojson.Feature(geometry=geom, properties=props))
-
-    print(f"  {len(features)} controlled airspace features")
-    return features
+    gdf = pd.concat(frames, ignore_index=True)
+    instrument.count(features_in=len(gdf))
+    print(f"  {len(gdf)} controlled airspace features")
+    return gdf
 
 
 # ---------------------------------------------------------------------------
-# SUA (ADDS GeoJSON)
+# Declarative property mapping (ADDS GeoJSON)
 # ---------------------------------------------------------------------------
+#
+# Each ADDS layer is described as {output column: (source column(s), rule)} or
+# {output column: constant}. A tuple of sources takes the first non-empty value,
+# like `raw.get("NAME") or raw.get("IDENT")`. Rules are applied column-wise to a
+# pyogrio/Arrow read of only the referenced source columns.
+
+def _is_empty(s: pd.Series) -> pd.Series:
+    return s.isna() | (s.astype(object) == "")
+
+
+def _or_empty(s: pd.Series) -> pd.Series:
+    return s.where(~_is_empty(s), "")
+
+
+def _text(s: pd.Series) -> pd.Series:
+    return _or_empty(s).astype(str).str.strip()
+
+
+def _value(s: pd.Series) -> pd.Series:
+    return s.astype("int64") if pd.api.types.is_integer_dtype(s) else s
 
-def convert_sua(sua_path: str = "data/sua_raw.geojson") -> list[geojson.Feature]:
-    """Read SUA GeoJSON and return features with mapped properties."""
-    if not os.path.exists(sua_path):
-        print(f"  SUA file not found at {sua_path}")
-        return []
 
-    with open(sua_path) as f:
-        data = json.load(f)
+FIELD_RULES = {
+    "value": _value,                                   # raw.get(src)
+    "or_empty": _or_empty,                             # raw.get(src) or ""
+    "text": _text,                                     # (raw.get(src) or "").strip()
+    "upper": lambda s: _text(s).str.upper(),           # (raw.get(src) or "").strip().upper()
+    "altitude_m": lambda s: parse_altitude_array(_or_empty(s)) * 0.3048,
+}
+
+
+def _source_columns(fields: dict) -> list[str]:
+    sources = []
+    for spec in fields.values():
+        if isinstance(spec, tuple):
+            for name in spec[0] if isinstance(spec[0], tuple) else (spec[0],):
+                if name not in sources:
+                    sources.append(name)
+    return sources
+
 
-    features: list[geojson.Feature] = []
-    for ft in data.get("features", []):
-        raw_props = ft.get("properties", {})
-        geom = ft.get("geometry")
-        if geom is None:
+def _map_columns(raw: pd.DataFrame, fields: dict) -> dict[str, pd.Series]:
+    def column(name: str) -> pd.Series:
+        if name in raw.columns:
+            return raw[name]
+        return pd.Series(None, index=raw.index, dtype=object)
+
+    columns = {}
+    for out, spec in fields.items():
+        if not isinstance(spec, tuple):
+            columns[out] = pd.Series([spec] * len(raw), index=raw.index)
+            continue
+        names, rule = spec
+        names = names if isinstance(names, tuple) else (names,)
+        values = column(names[0])
+        for name in names[1:]:
+            values = values.where(~_is_empty(values), column(name))
+        columns[out] = FIELD_RULES[rule](values)
+    return columns
+
+
+def read_mapped(path: str, fields: dict, bbox: tuple | None = None) -> gpd.GeoDataFrame:
+    """
+    Read a GeoJSON layer or shapefile and derive the output columns described by `fields`.
+
+    With a bbox, only features intersecting it are decoded, read through a spatial index.
+    """
+    if bbox is not None:
+        path = region.indexed_copy(path)
+    available = set(pyogrio.read_info(path)["fields"])
+    columns = [n for n in _source_columns(fields) if n in available]
+    use_arrow = bbox is None or region.has_features(path, bbox)
+    raw = pyogrio.read_dataframe(path, columns=columns, use_arrow=use_arrow, bbox=bbox)
+    raw = raw[raw.geometry.notna()].reset_index(drop=True)
+    instrument.count(features_in=len(raw))
+
+    geometry = round_coordinates(raw.geometry.values)
+    return gpd.GeoDataFrame(_map_columns(raw, fields), geometry=geometry, crs="EPSG:4326")
+
+
+# Features per Arrow batch when streaming; bounds peak memory independently of file size
+STREAM_BATCH_SIZE = 65536
+
+
+def _output_schema(fields: dict, source: pa.Schema) -> pa.Schema:
+    """Fixed Arrow types for the mapped columns so every streamed batch agrees."""
+    out = []
+    for name, spec in fields.items():
+        if not isinstance(spec, tuple):
+            out.append(pa.field(name, pa.scalar(spec).type))
             continue
+        src, rule = spec
+        src = src[0] if isinstance(src, tuple) else src
+        if rule == "altitude_m":
+            out.append(pa.field(name, pa.float64()))
+        elif rule == "value" and src in source.names:
+            t = source.field(src).type
+            out.append(pa.field(name, pa.int64() if pa.types.is_integer(t) else pa.float64() if pa.types.is_floating(t) else t))
+        else:
+            out.append(pa.field(name, pa.string()))
+    return pa.schema(out + [pa.field("wkb_geometry", pa.binary())])
+
+
+def write_mapped(
+    path: str, output: str, fields: dict, batch_size: int = STREAM_BATCH_SIZE, bbox: tuple | None = None
+) -> int:
+    """
+    Stream a GeoJSON layer through `fields` straight into a FlatGeobuf.
+
+    Only one Arrow batch of source features and mapped output is held at a time
+    (GDAL reads large GeoJSON incrementally). Rows keep their input order, so every
+    layer written this way needs a constant rank. With a bbox, only features intersecting
+    it are read, through a spatial index. In stream mode the batches go to the layer's
+    tippecanoe pipe as they are mapped. Returns the number of features written.
+    """
+    if bbox is not None:
+        path = region.indexed_copy(path)
+    info = pyogrio.read_info(path)
+    columns = [n for n in _source_columns(fields) if n in set(info["fields"])]
+    empty = bbox is not None and not region.has_features(path, bbox)
+    written = 0
+
+    with pyogrio.raw.open_arrow(path, columns=columns, batch_size=batch_size, bbox=bbox, use_pyarrow=True) as (meta, reader):
+        geometry_name = meta["geometry_name"] or "wkb_geometry"
+        schema = _output_schema(fields, reader.schema)
+
+        def batches():
+            nonlocal written
+            for batch in [] if empty else reader:
+                geoms = shapely.from_wkb(batch.column(geometry_name).to_numpy(zero_copy_only=False))
+                keep = ~shapely.is_missing(geoms)
+                raw = batch.drop_columns([geometry_name]).to_pandas()[keep].reset_index(drop=True)
+
+                mapped = _map_columns(raw, fields)
+                arrays = [
+                    pa.array(mapped[f.name].astype(str) if pa.types.is_string(f.type) else mapped[f.name], type=f.type, from_pandas=True)
+                    for f in schema if f.name in mapped
+                ]
+                arrays.append(pa.array(shapely.to_wkb(shapely.force_2d(round_coordinates(geoms[keep]))), type=pa.binary()))
+                written += len(raw)
+                instrument.count(features_in=len(raw), features_out=len(raw))
+                yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+        if stream.pipe_for(output):
+            stream.send_lines((line for batch in batches() for line in stream.batch_lines(batch, "wkb_geometry")), output)
+            return written
+
+        pyogrio.write_arrow(
+            pa.RecordBatchReader.from_batches(schema, batches()),
+            output,
+            driver="FlatGeobuf",
+            geometry_name="wkb_geometry",
+            geometry_type=info["geometry_type"].removesuffix(" Z"),
+            crs="EPSG:4326",
+            layer_options={'SPATIAL_INDEX': 'NO'},
+        )
+    return written
+
+
+# ---------------------------------------------------------------------------
+# SUA (ADDS GeoJSON)
+# ---------------------------------------------------------------------------
+
+SUA_FIELDS: dict = {
+    "name": ("NAME", "text"),
+    "type": ("TYPE_CODE", "upper"),
+    "airspace_class": ("TYPE_CODE", "upper"),
+    "is_sua": True,
+    "upper_limit": ("UPPER_VAL", "or_empty"),
+    "lower_limit": ("LOWER_VAL", "or_empty"),
+    "upper_m": ("UPPER_VAL", "altitude_m"),
+    "lower_m": ("LOWER_VAL", "altitude_m"),
+    "local_type": ("TYPE_CODE", "upper"),
+}
 
-        type_code = (raw_props.get("TYPE_CODE") or "").strip().upper()
-        name = (raw_props.get("NAME") or "").strip()
 
-        upper_val = raw_props.get("UPPER_VAL") or ""
-        lower_val = raw_props.get("LOWER_VAL") or ""
+def convert_sua(sua_path: str = "data/sua_raw.geojson", bbox: tuple | None = None) -> gpd.GeoDataFrame:
+    """Read SUA GeoJSON and return features with mapped properties."""
+    if not os.path.exists(sua_path):
+        print(f"  SUA file not found at {sua_path}")
+        return FeatureBuilder().to_geodataframe()
 
-        features.append(geojson.Feature(
-            geometry=geom,
-            properties={
-                "name": name,
-                "type": type_code,
-                "airspace_class": type_code,
-                "is_sua": True,
-                "upper_limit": upper_val,
-                "lower_limit": lower_val,
-                "upper_m": parse_altitude(upper_val) * 0.3048,
-                "lower_m": parse_altitude(lower_val) * 0.3048,
-                "local_type": type_code,
-            },
-        ))
+    gdf = read_mapped(sua_path, SUA_FIELDS, bbox)
 
-    print(f"  {len(features)} SUA features")
-    return features
+    print(f"  {len(gdf)} SUA features")
+    return gdf
 
 
 # ---------------------------------------------------------------------------
 # Airspaces (merged output)
 # ---------------------------------------------------------------------------
 
-def convert_airspaces(output_critical: str = "data/airspaces.fgb", output_e: str = "data/airspaces_e.fgb") -> None:
+def convert_airspaces(
+    output_critical: str = "data/airspaces.fgb", output_e: str = "data/airspaces_e.fgb", bbox: tuple | None = None
+) -> None:
     """Merge controlled airspace + SUA into separate High-Priority and Class E files."""
     print("Processing controlled airspace (shapefiles)...")
-    controlled = convert_class_airspace()
+    instrument.section("read_class_airspace")
+    controlled = convert_class_airspace(bbox=bbox)
 
     print("Processing SUA (ArcGIS GeoJSON)...")
-    sua = convert_sua()
+    instrument.section("read_sua")
+    sua = convert_sua(bbox=bbox)
 
-    all_features = controlled + sua
     os.makedirs(os.path.dirname(output_critical), exist_ok=True)
 
-    gdf = gpd.GeoDataFrame.from_features(all_features, crs="EPSG:4326")
-    gdf.geometry = gdf.geometry.force_2d()
-    gdf.geometry = gdf.geometry.buffer(0)
+    # Repair only what is actually invalid, reporting each source separately
+    instrument.section("repair")
+    for source, frame in (("controlled airspace", controlled), ("SUA", sua)):
+        frame.geometry = repair_geometries(frame.geometry.force_2d().values, source)
+
+    gdf = pd.concat([controlled, sua], ignore_index=True)
 
     # Class E5, E6, E7 airspaces don't need distinct names and should merge perfectly
     e_non_surface = gdf["local_type"].isin(["CLASS_E5", "CLASS_E6", "CLASS_E7"])
@@ -179,15 +324,20 @@ def convert_airspaces(output_critical: str = "data/airspaces.fgb", output_e: str
     gdf_critical = gdf[~is_e].copy()
 
     print(f"Dissolving {len(gdf_critical)} critical airspace geometries...")
-    gdf_critical = gdf_critical.dissolve(by=dissolution_cols, as_index=False)
-    gdf_critical.to_file(output_critical, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    instrument.section("dissolve_critical")
+    gdf_critical = parallel_dissolve(gdf_critical, dissolution_cols)
+    write_layer(gdf_critical, output_critical)
+    instrument.count(features_out=len(gdf_critical))
 
     print(f"Dissolving {len(gdf_e)} Class E airspace geometries...")
+    instrument.section("dissolve_class_e")
     # For Class E, we ignore upper_limit and name/is_sua to merge sectors with same floor
     # This creates a cleaner "footprint" of the airspace tier (e.g. 700ft vs 1200ft)
     e_dissolve_cols = ["type", "airspace_class", "lower_limit", "local_type"]
-    gdf_e = gdf_e.dissolve(by=e_dissolve_cols, as_index=False)
-    gdf_e.to_file(output_e, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    # NFDC Class E sectors tile the plane with shared edges, so merge them as a coverage
+    gdf_e = parallel_dissolve(gdf_e, e_dissolve_cols, method="coverage")
+    write_layer(gdf_e, output_e)
+    instrument.count(features_out=len(gdf_e))
 
     print(f"Wrote airspaces to {output_critical} and {output_e}")
 
@@ -196,9 +346,20 @@ def convert_airspaces(output_critical: str = "data/airspaces.fgb", output_e: str
 # Boundary Airspace (ARTCC/FIR)
 # ---------------------------------------------------------------------------
 
+BOUNDARY_FIELDS: dict = {
+    "name": (("NAME", "IDENT"), "text"),
+    "type": ("TYPE_CODE", "upper"),
+    "ident": ("IDENT", "text"),
+    "local_type": ("LOCAL_TYPE", "text"),
+    "upper_limit": ("UPPER_VAL", "or_empty"),
+    "lower_limit": ("LOWER_VAL", "or_empty"),
+}
+
+
 def convert_boundary_airspace(
     raw_path: str = "data/boundary_airspace_raw.geojson",
     output: str = "data/boundary_airspace.fgb",
+    bbox: tuple | None = None,
 ) -> None:
     """Convert boundary airspace GeoJSON with simplified properties to FlatGeobuf."""
     if not os.path.exists(raw_path):
@@ -206,47 +367,36 @@ def convert_boundary_airspace(
         return
 
     print("Processing Boundary Airspace...")
-    with open(raw_path) as f:
-        data = json.load(f)
-
-    features: list[geojson.Feature] = []
-    for ft in data.get("features", []):
-        raw = ft.get("properties", {})
-        geom = ft.get("geometry")
-        if geom is None:
-            continue
-
-        type_code = (raw.get("TYPE_CODE") or "").strip().upper()
-        name = (raw.get("NAME") or raw.get("IDENT") or "").strip()
-
-        features.append(geojson.Feature(
-            geometry=geom,
-            properties={
-                "name": name,
-                "type": type_code,
-                "ident": (raw.get("IDENT") or "").strip(),
-                "local_type": (raw.get("LOCAL_TYPE") or "").strip(),
-                "upper_limit": raw.get("UPPER_VAL") or "",
-                "lower_limit": raw.get("LOWER_VAL") or "",
-            },
-        ))
+    gdf = read_mapped(raw_path, BOUNDARY_FIELDS, bbox)
 
     os.makedirs(os.path.dirname(output), exist_ok=True)
-    gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
     gdf.geometry = gdf.geometry.force_2d()
     gdf.sort_values(by='rank', ascending=True, inplace=True) if 'rank' in gdf.columns else None
-    gdf.to_file(output, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    write_layer(gdf, output)
 
-    print(f"  Wrote {len(features)} boundary airspace features to {output}")
+    print(f"  Wrote {len(gdf)} boundary airspace features to {output}")
 
 
 # ---------------------------------------------------------------------------
 # Holding Patterns
 # ---------------------------------------------------------------------------
 
+HOLDING_FIELDS: dict = {
+    "name": ("NAME", "text"),
+    "ident": ("IDENT", "text"),
+    "course_out": ("CRSOUT", "value"),
+    "course_in": ("CRSIN", "value"),
+    "turn_dir": ("DIRTURN", "text"),
+    "structures": ("STRUCTURES", "text"),
+    "speed_limit": ("SPEEDLIMIT", "value"),
+    "rank": 5,
+}
+
+
 def convert_holding_patterns(
     raw_path: str = "data/holding_patterns_raw.geojson",
     output: str = "data/holding_patterns.fgb",
+    bbox: tuple | None = None,
 ) -> None:
     """Convert holding pattern GeoJSON with simplified properties to FlatGeobuf."""
     if not os.path.exists(raw_path):
@@ -254,46 +404,35 @@ def convert_holding_patterns(
         return
 
     print("Processing Holding Patterns...")
-    with open(raw_path) as f:
-        data = json.load(f)
-
-    features: list[geojson.Feature] = []
-    for ft in data.get("features", []):
-        raw = ft.get("properties", {})
-        geom = ft.get("geometry")
-        if geom is None:
-            continue
-
-        features.append(geojson.Feature(
-            geometry=geom,
-            properties={
-                "name": (raw.get("NAME") or "").strip(),
-                "ident": (raw.get("IDENT") or "").strip(),
-                "course_out": raw.get("CRSOUT"),
-                "course_in": raw.get("CRSIN"),
-                "turn_dir": (raw.get("DIRTURN") or "").strip(),
-                "structures": (raw.get("STRUCTURES") or "").strip(),
-                "speed_limit": raw.get("SPEEDLIMIT"),
-                "rank": 5,
-            },
-        ))
+    gdf = read_mapped(raw_path, HOLDING_FIELDS, bbox)
 
     os.makedirs(os.path.dirname(output), exist_ok=True)
-    gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
     gdf.geometry = gdf.geometry.force_2d()
     gdf.sort_values(by='rank', ascending=True, inplace=True) if 'rank' in gdf.columns else None
-    gdf.to_file(output, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    write_layer(gdf, output)
 
-    print(f"  Wrote {len(features)} holding pattern features to {output}")
+    print(f"  Wrote {len(gdf)} holding pattern features to {output}")
 
 
 # ---------------------------------------------------------------------------
 # Digital Obstacle File (DOF)
 # ---------------------------------------------------------------------------
 
+OBSTACLE_FIELDS: dict = {
+    "type": ("Type_Code", "text"),
+    "agl": ("AGL", "value"),
+    "amsl": ("AMSL", "value"),
+    "lighting": ("Lighting", "text"),
+    # "city": ("City", "text"),
+    # "state": ("State", "text"),
+    "rank": 6,
+}
+
+
 def convert_obstacles(
     raw_path: str = "data/dof_raw.geojson",
     output: str = "data/obstacles.fgb",
+    bbox: tuple | None = None,
 ) -> None:
     """Convert DOF GeoJSON with simplified properties to FlatGeobuf."""
     if not os.path.exists(raw_path):
@@ -301,49 +440,33 @@ def convert_obstacles(
         return
 
     print("Processing Digital Obstacle File...")
-    with open(raw_path) as f:
-        data = json.load(f)
-
-    features: list[geojson.Feature] = []
-    for ft in data.get("features", []):
-        raw = ft.get("properties", {})
-        geom = ft.get("geometry")
-        if geom is None:
-            continue
-
-        obstacle_type = (raw.get("Type_Code") or "").strip()
-        agl = raw.get("AGL")
-        amsl = raw.get("AMSL")
-
-        features.append(geojson.Feature(
-            geometry=geom,
-            properties={
-                "type": obstacle_type,
-                "agl": agl,
-                "amsl": amsl,
-                "lighting": (raw.get("Lighting") or "").strip(),
-                # "city": (raw.get("City") or "").strip(),
-                # "state": (raw.get("State") or "").strip(),
-                "rank": 6,
-            },
-        ))
-
+    # DOF is by far the largest ADDS download; stream it instead of loading it whole
     os.makedirs(os.path.dirname(output), exist_ok=True)
-    gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
-    gdf.geometry = gdf.geometry.force_2d()
-    gdf.sort_values(by='rank', ascending=True, inplace=True) if 'rank' in gdf.columns else None
-    gdf.to_file(output, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    count = write_mapped(raw_path, output, OBSTACLE_FIELDS, bbox=bbox)
 
-    print(f"  Wrote {len(features)} obstacle features to {output}")
+    print(f"  Wrote {count} obstacle features to {output}")
 
 
 # ---------------------------------------------------------------------------
 # Airport Diagram Runways (ADDS GeoJSON)
 # ---------------------------------------------------------------------------
 
+AM_RUNWAY_FIELDS: dict = {
+    "faa_id": ("FAA_ID", "text"),
+    "icao_id": ("ICAO_ID", "text"),
+    "rwy_id": ("RWY_ID", "text"),
+    # SURFACE: 1=paved, 2=unpaved, etc.
+    "surface": ("SURFACE", "text"),
+    # RWY_OPER: 1=closed, 2=open
+    "rwy_oper": ("RWY_OPER", "text"),
+    "rank": 2,
+}
+
+
 def convert_am_runways(
     raw_path: str = "data/am_runways_raw.geojson",
     output: str = "data/am_runways.fgb",
+    bbox: tuple | None = None,
 ) -> None:
     """Convert Airport Diagram Runway GeoJSON to FlatGeobuf."""
     if not os.path.exists(raw_path):
@@ -351,46 +474,34 @@ def convert_am_runways(
         return
 
     print("Processing Airport Diagram Runways...")
-    with open(raw_path) as f:
-        data = json.load(f)
-
-    features: list[geojson.Feature] = []
-    for ft in data.get("features", []):
-        raw = ft.get("properties", {})
-        geom = ft.get("geometry")
-        if geom is None:
-            continue
-
-        # SURFACE: 1=paved, 2=unpaved, etc.
-        # RWY_OPER: 1=closed, 2=open
-        features.append(geojson.Feature(
-            geometry=geom,
-            properties={
-                "faa_id": (raw.get("FAA_ID") or "").strip(),
-                "icao_id": (raw.get("ICAO_ID") or "").strip(),
-                "rwy_id": (raw.get("RWY_ID") or "").strip(),
-                "surface": (raw.get("SURFACE") or "").strip(),
-                "rwy_oper": (raw.get("RWY_OPER") or "").strip(),
-                "rank": 2,
-            },
-        ))
+    gdf = read_mapped(raw_path, AM_RUNWAY_FIELDS, bbox)
 
     os.makedirs(os.path.dirname(output), exist_ok=True)
-    gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
     gdf.geometry = gdf.geometry.force_2d()
     gdf.sort_values(by='rank', ascending=True, inplace=True) if 'rank' in gdf.columns else None
-    gdf.to_file(output, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    write_layer(gdf, output)
 
-    print(f"  Wrote {len(features)} runway features to {output}")
+    print(f"  Wrote {len(gdf)} runway features to {output}")
 
 
 # ---------------------------------------------------------------------------
 # Airport Diagram Taxiways (ADDS GeoJSON)
 # ---------------------------------------------------------------------------
 
+AM_TAXIWAY_FIELDS: dict = {
+    "faa_id": ("FAA_ID", "text"),
+    "icao_id": ("ICAO_ID", "text"),
+    "designator": ("DESIGNATOR", "text"),
+    "surface": ("SURFACE", "text"),
+    "twy_oper": ("TWY_OPER", "text"),
+    "rank": 3,
+}
+
+
 def convert_am_taxiways(
     raw_path: str = "data/am_taxiways_raw.geojson",
     output: str = "data/am_taxiways.fgb",
+    bbox: tuple | None = None,
 ) -> None:
     """Convert Airport Diagram Taxiway GeoJSON to FlatGeobuf."""
     if not os.path.exists(raw_path):
@@ -398,35 +509,14 @@ def convert_am_taxiways(
         return
 
     print("Processing Airport Diagram Taxiways...")
-    with open(raw_path) as f:
-        data = json.load(f)
-
-    features: list[geojson.Feature] = []
-    for ft in data.get("features", []):
-        raw = ft.get("properties", {})
-        geom = ft.get("geometry")
-        if geom is None:
-            continue
-
-        features.append(geojson.Feature(
-            geometry=geom,
-            properties={
-                "faa_id": (raw.get("FAA_ID") or "").strip(),
-                "icao_id": (raw.get("ICAO_ID") or "").strip(),
-                "designator": (raw.get("DESIGNATOR") or "").strip(),
-                "surface": (raw.get("SURFACE") or "").strip(),
-                "twy_oper": (raw.get("TWY_OPER") or "").strip(),
-                "rank": 3,
-            },
-        ))
+    gdf = read_mapped(raw_path, AM_TAXIWAY_FIELDS, bbox)
 
     os.makedirs(os.path.dirname(output), exist_ok=True)
-    gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
     gdf.geometry = gdf.geometry.force_2d()
     gdf.sort_values(by='rank', ascending=True, inplace=True) if 'rank' in gdf.columns else None
-    gdf.to_file(output, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    write_layer(gdf, output)
 
-    print(f"  Wrote {len(features)} taxiway features to {output}")
+    print(f"  Wrote {len(gdf)} taxiway features to {output}")
 
 
 # ---------------------------------------------------------------------------
@@ -434,12 +524,13 @@ def convert_am_taxiways(
 # ---------------------------------------------------------------------------
 
 def main() -> None:
-    convert_airspaces()
-    convert_boundary_airspace()
-    convert_holding_patterns()
-    convert_obstacles()
-    convert_am_runways()
-    convert_am_taxiways()
+    bbox = region.bbox_from_argv(sys.argv[1:])
+    convert_airspaces(bbox=bbox)
+    convert_boundary_airspace(bbox=bbox)
+    convert_holding_patterns(bbox=bbox)
+    convert_obstacles(bbox=bbox)
+    convert_am_runways(bbox=bbox)
+    convert_am_taxiways(bbox=bbox)
 
 
 if __name__ == "__main__":
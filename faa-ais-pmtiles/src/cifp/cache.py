@@ -0,0 +1,157 @@
+"""
+Persistent columnar snapshot of the parsed CIFP, shared by every CIFP consumer.
+
+The sections produced by `src.cifp.reader` are written as one Parquet file each under
+`data/cifp_cache/<sha256>-v<CACHE_VERSION>/`. The snapshot is keyed by the FAACIFP18 content
+hash, so a new cycle (or a reader change, via `CACHE_VERSION`) triggers a single re-parse while
+style-only or ranking-only rebuilds load the previous parse directly.
+"""
+
+import hashlib
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.cifp.reader import SECTIONS, read_cifp
+
+CACHE_DIR = "data/cifp_cache"
+
+# Bump whenever the reader's columns or decoding change to invalidate existing snapshots
+CACHE_VERSION = 2
+
+_WAYPOINT_SCHEMA = pa.schema([
+    ("waypoint_id", pa.string()),
+    ("type", pa.string()),
+    ("usage", pa.string()),
+    ("lat", pa.float64()),
+    ("lon", pa.float64()),
+    ("name_description", pa.string()),
+])
+
+SCHEMAS: dict[str, pa.Schema] = {
+    "airports": pa.schema([
+        ("airport_id", pa.string()),
+        ("longest", pa.int64()),
+        ("is_ifr", pa.bool_()),
+        ("longest_surface", pa.string()),
+        ("lat", pa.float64()),
+        ("lon", pa.float64()),
+        ("elevation", pa.int64()),
+        ("usage", pa.string()),
+        ("airport_name", pa.string()),
+    ]),
+    "vhf_navaids": pa.schema([
+        ("vhf_id", pa.string()),
+        ("frequency", pa.float64()),
+        ("nav_class", pa.string()),
+        ("lat", pa.float64()),
+        ("lon", pa.float64()),
+        ("dme_id", pa.string()),
+        ("dme_lat", pa.float64()),
+        ("dme_lon", pa.float64()),
+        ("dme_elevation", pa.int64()),
+        ("vhf_name", pa.string()),
+    ]),
+    "ndb_navaids": pa.schema([
+        ("ndb_id", pa.string()),
+        ("frequency", pa.float64()),
+        ("lat", pa.float64()),
+        ("lon", pa.float64()),
+        ("ndb_name", pa.string()),
+    ]),
+    "enroute_waypoints": _WAYPOINT_SCHEMA,
+    "terminal_waypoints": _WAYPOINT_SCHEMA,
+    "procedures": pa.schema([
+        ("fac_id", pa.string()),
+        ("procedure_id", pa.string()),
+        ("transition_id", pa.string()),
+        ("seq_no", pa.int64()),
+        ("fix_id", pa.string()),
+        ("alt_1", pa.int64()),
+        ("trans_alt", pa.int64()),
+    ]),
+    "airway_points": pa.schema([
+        ("airway_id", pa.string()),
+        ("seq_no", pa.int64()),
+        ("point_id", pa.string()),
+        ("route_type", pa.string()),
+        ("min_alt_1", pa.int64()),
+        ("min_alt_1_is_fl", pa.bool_()),
+    ]),
+    "runways": pa.schema([
+        ("airport_id", pa.string()),
+        ("runway_id", pa.string()),
+        ("length", pa.int64()),
+        ("bearing", pa.float64()),
+        ("lat", pa.float64()),
+        ("lon", pa.float64()),
+        ("threshold_elevation", pa.int64()),
+        ("width", pa.int64()),
+    ]),
+    "loc_gss": pa.schema([
+        ("airport_id", pa.string()),
+        ("loc_id", pa.string()),
+        ("frequency", pa.float64()),
+        ("runway_id", pa.string()),
+        ("loc_lat", pa.float64()),
+        ("loc_lon", pa.float64()),
+        ("loc_bearing", pa.float64()),
+        ("gs_elevation", pa.int64()),
+    ]),
+}
+
+
+def file_hash(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def snapshot_dir(cifp_path: str, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"{file_hash(cifp_path)}-v{CACHE_VERSION}")
+
+
+def _write_snapshot(sections: dict[str, list[dict]], path: str) -> None:
+    """Write all sections to a temporary directory and move it into place atomically."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    for name in SECTIONS:
+        table = pa.Table.from_pylist(sections[name], schema=SCHEMAS[name])
+        pq.write_table(table, os.path.join(tmp_path, f"{name}.parquet"))
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process finished the same snapshot first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    # Only the current cycle is worth keeping around
+    parent = os.path.dirname(path)
+    for entry in os.listdir(parent):
+        stale = os.path.join(parent, entry)
+        if stale != path and os.path.isdir(stale) and ".tmp-" not in entry:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def load_cifp_tables(cifp_path: str, cache_dir: str = CACHE_DIR) -> dict[str, pa.Table]:
+    """Return {section: pyarrow.Table} for a CIFP file, parsing it only on a cache miss."""
+    path = snapshot_dir(cifp_path, cache_dir)
+    if os.path.isdir(path):
+        print(f"Loading parsed CIFP snapshot from {path}...", flush=True)
+    else:
+        print(f"No CIFP snapshot for {cifp_path}; parsing...", flush=True)
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_snapshot(read_cifp(cifp_path), path)
+        print(f"  Wrote CIFP snapshot to {path}", flush=True)
+
+    return {name: pq.read_table(os.path.join(path, f"{name}.parquet")) for name in SECTIONS}
+
+
+def load_cifp(cifp_path: str, cache_dir: str = CACHE_DIR) -> dict[str, list[dict]]:
+    """Cached equivalent of `read_cifp`: {section: [record dict, ...]}."""
+    return {name: table.to_pylist() for name, table in load_cifp_tables(cifp_path, cache_dir).items()}
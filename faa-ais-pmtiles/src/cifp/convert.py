@@ -1,48 +1,101 @@
 """
 Converts raw CIFP (ARINC 424) data into FlatGeobuf format.
 
-Extracts airports, navaids, airways, procedures, runways, and localizers using the `cifparse` library.
+Extracts airports, navaids, airways, procedures, runways, and localizers from a single streaming
+pass over the ARINC 424 records (see `src.cifp.reader`), cached per FAACIFP18 hash by `src.cifp.cache`.
 Enriches airport data with metadata from NASR (fuel, tower, FAR 139 status).
 """
 
 import sys
 import geojson
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from collections import defaultdict
-from cifparse import CIFP
-from src.cifp import nasr
-from src.common.utils import parse_altitude, unwrap_coordinates, haversine, save_fgb
-from src.runways.geometry import get_opposite_runway_id, calculate_destination, create_runway_poly
+from src.cifp import nasr, ranks
+from src.cifp.cache import load_cifp_tables
+from src.common import instrument, region, stream
+from src.common.features import FeatureBuilder
+from src.common.utils import parse_altitude, unwrap_coordinates, haversine_array, unwrap_longitude_array, save_fgb
+from src.runways.geometry import pair_runway_ends, calculate_destination_array, create_runway_poly_array
 
 def load_nasr_metadata():
     return nasr.load_nasr_metadata()
 
-def build_pmtiles_fgb(cifp_path):
+def add_airway_segments(builder: FeatureBuilder, airway_points: pa.Table, fixes: dict, bbox: tuple | None = None) -> None:
+    """Append one segment per consecutive pair of known fixes along each airway (touching bbox), in bulk."""
+    df = airway_points.select(['airway_id', 'seq_no', 'point_id', 'route_type', 'min_alt_1']).to_pandas()
+    df = df[df['airway_id'].fillna('') != ''].reset_index(drop=True)
+    if df.empty or not fixes:
+        return
+
+    # Airways in order of first appearance, points by sequence number within each airway
+    airway_codes, airway_ids = pd.factorize(df['airway_id'])
+    order = np.lexsort((df['seq_no'].fillna(0).to_numpy(), airway_codes))
+
+    fix_xyz = np.array(list(fixes.values()), dtype=np.float64)
+    fix_idx = pd.Index(list(fixes)).get_indexer(df['point_id'].fillna('').str.strip())
+    order = order[fix_idx[order] >= 0]
+
+    # Consecutive valid points of the same airway form a segment
+    codes = airway_codes[order]
+    pair = np.flatnonzero(codes[:-1] == codes[1:])
+    row1, row2 = order[pair], order[pair + 1]
+    xyz1, xyz2 = fix_xyz[fix_idx[row1]], fix_xyz[fix_idx[row2]]
+    lon1, lat1, lon2, lat2 = xyz1[:, 0], xyz1[:, 1], xyz2[:, 0], xyz2[:, 1]
+    ulon2 = unwrap_longitude_array(lon1, lon2)
+
+    keep = ~((lon1 == ulon2) & (lat1 == lat2))
+    keep &= region.intersects_array(
+        bbox, np.minimum(lon1, lon2), np.minimum(lat1, lat2), np.maximum(lon1, lon2), np.maximum(lat1, lat2)
+    )
+    row1, codes = row1[keep], codes[pair][keep]
+    xyz1, xyz2, lon1, lat1, lon2, lat2, ulon2 = (a[keep] for a in (xyz1, xyz2, lon1, lat1, lon2, lat2, ulon2))
+
+    min_alt = df['min_alt_1'].to_numpy(dtype=np.float64, na_value=0.0)[row1]
+    airway = np.asarray(airway_ids, dtype=object)[codes]
+    prefix = np.array([a[0] for a in airway_ids], dtype=object)[codes]
+
+    route_type = df['route_type'].fillna('').to_numpy(dtype=object)[row1]
+    default_type = np.select(
+        [(prefix == 'V') | (prefix == 'J'), (prefix == 'Q') | (prefix == 'T')], ['Victor', 'GPS'], 'Unknown'
+    )
+    route_type = np.where(route_type == '', default_type, route_type)
+
+    coords = np.stack([
+        np.column_stack([lon1, lat1, np.maximum(xyz1[:, 2], min_alt)]),
+        np.column_stack([ulon2, lat2, np.maximum(xyz2[:, 2], min_alt)]),
+    ], axis=1)
+
+    builder.add_lines(coords, {
+        'airway': airway,
+        'mea': min_alt.astype(np.int64),
+        'distance': np.rint(haversine_array(lon1, lat1, lon2, lat2)).astype(np.int64),
+        'route_type': route_type,
+        'structure': np.where((prefix == 'J') | (prefix == 'Q'), 'High', 'Low').astype(object),
+        'rank': np.full(len(airway), 5),
+    })
+
+def build_pmtiles_fgb(cifp_path, bbox=None):
     print("Fetching NASR airport metadata...", flush=True)
+    instrument.section("nasr_metadata")
     airport_metadata = load_nasr_metadata()
 
     print("Loading CIFP...", flush=True)
-    c = CIFP(cifp_path)
-
-    print("Parsing everything needed...", flush=True)
-    c.parse_airports()
-    c.parse_vhf_navaids()
-    c.parse_ndb_navaids()
-    c.parse_enroute_waypoints()
-    c.parse_terminal_waypoints()
-
-
-    c.parse_procedures()
-    c.parse_airway_points()
-    c.parse_runways()
-    c.parse_loc_gss()
+    instrument.section("load")
+    tables = region.clip_cifp_tables(load_cifp_tables(cifp_path), bbox)
+    # Airways are built straight from the Arrow columns; every other section is walked per record
+    cifp = {name: table.to_pylist() for name, table in tables.items() if name != 'airway_points'}
 
     print("Building lookup dictionaries...", flush=True)
     fixes = {}
 
     print("Extracting Airports...", flush=True)
+    instrument.section("airports")
+    instrument.count(features_in=len(cifp['airports']))
     airport_features_dict = {}
-    for a in c.get_airports():
-        p = a.to_dict()['primary']
+    for p in cifp['airports']:
         lat, lon = p.get('lat'), p.get('lon')
         if lat is not None and lon is not None:
             ident = p.get('airport_id', '').strip()
@@ -63,43 +116,12 @@ def build_pmtiles_fgb(cifp_path):
             else:
                 fac_type = 'civil_hard' if surface == 'H' else 'civil_soft'
 
-            ident = p.get('airport_id', '').strip()
-            # Try direct lookup (now robust with ICAO_ID indexing)
-            meta = airport_metadata.get(ident)
-
-            # Fallback for continental US if ICAO_ID was missing from NASR but present in CIFP
-            if not meta and ident.startswith('K') and len(ident) == 4:
-                meta = airport_metadata.get(ident[1:])
-
-            meta = meta or {}
+            meta = ranks.airport_metadata(airport_metadata, ident)
             has_fuel = meta.get('has_fuel', False)
-            has_tower = meta.get('has_tower', False)
-            far_139 = meta.get('far_139', '')
             longest_runway = int(p.get('longest') or 0)
 
             # Determine facility rank for decluttering (lower is more important)
-            # Tier 1: Major Hubs (FAR 139 Index D/E)
-            # Tier 2: Regional/Commercial (FAR 139 B/C OR Towered OR > 7500ft)
-            # Tier 3: General Aviation (Starts with K OR > 4000ft)
-            # Tier 4: Minor / Private / Others
-
-            # FAR 139 Index D or E are major commercial hubs
-            is_major_hub = any(idx in far_139 for idx in ['D', 'E'])
-            # FAR 139 Index A, B, or C are standard commercial
-            is_commercial = any(idx in far_139 for idx in ['A', 'B', 'C'])
-
-            if is_major_hub:
-                rank = 1
-            elif is_commercial or has_tower or longest_runway >= 7500:
-                rank = 2
-            elif ident.startswith('K') and len(ident) == 4 or longest_runway >= 4000:
-                rank = 3
-            else:
-                rank = 4
-
-            # Ensure military bases with huge runways remain Rank 1 even if not FAR 139
-            if usage == 'M' and longest_runway >= 10000:
-                rank = 1
+            rank = ranks.airport_rank(ident, usage, longest_runway, meta)
 
             properties = {
                 'id': ident,
@@ -120,16 +142,24 @@ def build_pmtiles_fgb(cifp_path):
                 tippecanoe={ 'minzoom': 0 if rank == 1 else (rank + 1) } # Root-level control
             )
 
-            airport_features_dict[ident] = feat
+            # Airports around the region only serve as procedure/airway fixes
+            if p.get('in_region', True):
+                airport_features_dict[ident] = feat
             fixes[ident] = (lon, lat, elev)
 
-    with open('data/airports.geojson', 'w') as f:
-        geojson.dump(geojson.FeatureCollection(list(airport_features_dict.values())), f)
+    if stream.pipe_for('data/airports.geojson'):
+        # One feature per line keeps the root-level `tippecanoe` minzoom
+        stream.send_lines((geojson.dumps(f) for f in airport_features_dict.values()), 'data/airports.geojson')
+    else:
+        with open('data/airports.geojson', 'w') as f:
+            geojson.dump(geojson.FeatureCollection(list(airport_features_dict.values())), f)
+    instrument.count(features_out=len(airport_features_dict))
 
     print("Extracting Navaids...", flush=True)
-    navaid_features = []
-    for nav in c.get_vhf_navaids():
-        p = nav.to_dict()['primary']
+    instrument.section("navaids")
+    instrument.count(features_in=len(cifp['vhf_navaids']) + len(cifp['ndb_navaids']))
+    navaid_features = FeatureBuilder()
+    for p in cifp['vhf_navaids']:
         lat = p.get('lat') or p.get('dme_lat')
         lon = p.get('lon') or p.get('dme_lon')
         if lat is not None and lon is not None:
@@ -137,15 +167,7 @@ def build_pmtiles_fgb(cifp_path):
             ident = (p.get('vhf_id') or p.get('dme_id') or '').strip()
 
             nav_class = p.get('nav_class') or '     '
-            alt_class = nav_class[1:2] if len(nav_class) > 1 else ' '
-            if alt_class == 'H':
-                rank = 2
-            elif alt_class == 'L':
-                rank = 3
-            elif alt_class == 'T':
-                rank = 4
-            else:
-                rank = 5
+            rank = ranks.navaid_rank(nav_class)
 
             # Parse NAVAID type from class (e.g., 'V' for VOR/VORTAC/VORDME, 'T' for TACAN, 'D' for DME)
             nav_type = 'vhf'
@@ -162,84 +184,61 @@ def build_pmtiles_fgb(cifp_path):
                 nav_type = 'dme'
             # (Note: ILS/Localizers are handled separately)
 
-            navaid_features.append(geojson.Feature(
-                geometry=geojson.Point((lon, lat, elev)),
-                properties={'id': ident, 'name': p.get('vhf_name'), 'frequency': p.get('frequency'), 'type': nav_type, 'rank': rank}
-            ))
+            if p.get('in_region', True):
+                navaid_features.add_point(lon, lat, elev, {
+                    'id': ident, 'name': p.get('vhf_name'), 'frequency': p.get('frequency'), 'type': nav_type, 'rank': rank
+                })
             if ident:
                 fixes[ident] = (lon, lat, elev)
 
-    for nav in c.get_ndb_navaids():
-        p = nav.to_dict()['primary']
+    for p in cifp['ndb_navaids']:
         lat, lon = p.get('lat'), p.get('lon')
         if lat is not None and lon is not None:
             elev = float(p.get('elevation') or 0.0)
             ident = (p.get('ndb_id') or '').strip()
-            navaid_features.append(geojson.Feature(
-                geometry=geojson.Point((lon, lat, elev)),
-                properties={'id': ident, 'name': p.get('ndb_name'), 'frequency': p.get('frequency'), 'type': 'ndb', 'rank': 5}
-            ))
+            if p.get('in_region', True):
+                navaid_features.add_point(lon, lat, elev, {
+                    'id': ident, 'name': p.get('ndb_name'), 'frequency': p.get('frequency'), 'type': 'ndb', 'rank': ranks.NDB_RANK
+                })
             if ident:
                 fixes[ident] = (lon, lat, elev)
 
+    save_fgb(navaid_features.to_geodataframe(), 'data/navaids.fgb')
+
     print("Extracting Waypoints...", flush=True)
-    waypoint_features = []
-    for wp in c.get_enroute_waypoints() + c.get_terminal_waypoints():
-        p = wp.to_dict()['primary']
+    instrument.section("waypoints")
+    instrument.count(features_in=len(cifp['enroute_waypoints']) + len(cifp['terminal_waypoints']))
+    waypoint_features = FeatureBuilder()
+    for p in cifp['enroute_waypoints'] + cifp['terminal_waypoints']:
         if p.get('lat') is not None and p.get('lon') is not None:
             ident = (p.get('waypoint_id') or '').strip()
             fixes[ident] = (p.get('lon'), p.get('lat'), 0.0)
+            if not p.get('in_region', True):
+                continue
 
-            # Classify waypoint type from ARINC 424
-            raw_type = (p.get('type') or '').strip()
-            if raw_type == 'C':
-                wpt_type = 'compulsory'
-            elif raw_type == 'R':
-                wpt_type = 'rnav'
-            else:
-                wpt_type = 'named'
-
-            # Usage: H = high altitude, L = low altitude, B = both, blank = terminal/other
+            wpt_type = ranks.waypoint_type((p.get('type') or '').strip())
             usage = (p.get('usage') or '').strip()
+            rank = ranks.waypoint_rank(wpt_type, usage)
 
-            base_rank = 5
-            if wpt_type == 'compulsory':
-                base_rank = 3
-            elif wpt_type == 'rnav':
-                base_rank = 4
-
-            if usage in ('H', 'B'):
-                rank = base_rank
-            elif usage == 'L':
-                rank = base_rank + 1
-            else:
-                rank = base_rank + 2
-
-            rank = min(rank, 6)
-
-            waypoint_features.append(geojson.Feature(
-                geometry=geojson.Point((p.get('lon'), p.get('lat'), 0.0)),
-                properties={
-                    'id': ident,
-                    'type': wpt_type,
-                    'usage': usage,
-                    'name': (p.get('name_description') or '').strip(),
-                    'rank': rank
-                }
-            ))
-
-    save_fgb(waypoint_features, 'data/waypoints.fgb')
+            waypoint_features.add_point(p.get('lon'), p.get('lat'), 0.0, {
+                'id': ident,
+                'type': wpt_type,
+                'usage': usage,
+                'name': (p.get('name_description') or '').strip(),
+                'rank': rank
+            })
 
-    save_fgb(navaid_features, 'data/navaids.fgb')
+    save_fgb(waypoint_features.to_geodataframe(), 'data/waypoints.fgb')
 
     print("Processing Procedures...", flush=True)
+    instrument.section("procedures")
+    instrument.count(features_in=len(cifp['procedures']))
     proc_groups = defaultdict(list)
-    for proc in c.get_procedures():
-        p = proc.to_dict()['primary']
+    for p in cifp['procedures']:
         key = (p.get('fac_id'), p.get('procedure_id'), p.get('transition_id'))
         proc_groups[key].append(p)
 
-    procedure_features = []
+    procedure_features = FeatureBuilder()
     for key, pts in proc_groups.items():
         pts.sort(key=lambda x: x.get('seq_no') or 0)
         coords = []
@@ -255,249 +254,134 @@ def build_pmtiles_fgb(cifp_path):
 
         if len(coords) >= 2:
             coords = unwrap_coordinates(coords)
-            procedure_features.append(geojson.Feature(
-                geometry=geojson.LineString(coords),
-                properties={'airport': key[0], 'procedure': key[1], 'transition': key[2], 'rank': 5}
-            ))
+            procedure_features.add_line(coords, {
+                'airport': key[0], 'procedure': key[1], 'transition': key[2], 'rank': 5
+            })
 
-    save_fgb(procedure_features, 'data/procedures.fgb')
+    save_fgb(procedure_features.to_geodataframe(), 'data/procedures.fgb')
 
     print("Processing Airways...", flush=True)
-    airway_groups = defaultdict(list)
-    for ap in c.get_airway_points():
-        p = ap.to_dict()['primary']
-        key = p.get('airway_id')
-        if key:
-            airway_groups[key].append(p)
-
-    airway_features = []
-    for key, pts in airway_groups.items():
-        pts.sort(key=lambda x: x.get('seq_no') or 0)
-        valid_pts = []
-        for p in pts:
-            fix = (p.get('point_id') or '').strip()
-            if fix in fixes:
-                valid_pts.append((p, fixes[fix]))
-
-        for i in range(len(valid_pts) - 1):
-            p1, fix1 = valid_pts[i]
-            p2, fix2 = valid_pts[i+1]
-            lon1, lat1, elev1 = fix1
-            lon2, lat2, elev2 = fix2
-
-            c_unwrapped = unwrap_coordinates([(lon1, lat1, elev1), (lon2, lat2, elev2)])
-            if len(c_unwrapped) == 2:
-                ulon1, ulat1, _ = c_unwrapped[0]
-                ulon2, ulat2, _ = c_unwrapped[1]
-
-                if ulon1 == ulon2 and ulat1 == ulat2:
-                    continue
-
-                dist_nm = round(haversine(lon1, lat1, lon2, lat2))
-                min_alt = p1.get('min_alt_1')
-                if min_alt and str(min_alt).strip().isdigit():
-                    mea_val = int(str(min_alt).strip())
-                else:
-                    try:
-                        mea_val = int(parse_altitude(min_alt))
-                    except (ValueError, TypeError):
-                        mea_val = 0
-
-                route_type = p1.get('route_type') or p1.get('airway_type')
-                if not route_type:
-                    if key.startswith('V'):
-                        route_type = 'Victor'
-                    elif key.startswith('Q') or key.startswith('T'):
-                        route_type = 'GPS'
-                    elif key.startswith('J'):
-                        route_type = 'Victor'
-                    else:
-                        route_type = 'Unknown'
-
-                coords = [
-                    (ulon1, ulat1, max(elev1, parse_altitude(min_alt))),
-                    (ulon2, ulat2, max(elev2, parse_altitude(min_alt)))
-                ]
-
-                structure = 'High' if key.startswith('J') or key.startswith('Q') else 'Low'
-
-                airway_features.append(geojson.Feature(
-                    geometry=geojson.LineString(coords),
-                    properties={
-                        'airway': key,
-                        'mea': mea_val,
-                        'distance': dist_nm,
-                        'route_type': route_type,
-                        'structure': structure,
-                        'rank': 5
-                    }
-                ))
-
-    save_fgb(airway_features, 'data/airways.fgb')
+    instrument.section("airways")
+    instrument.count(features_in=tables['airway_points'].num_rows)
+    airway_features = FeatureBuilder()
+    add_airway_segments(airway_features, tables['airway_points'], fixes, bbox)
+    save_fgb(airway_features.to_geodataframe(), 'data/airways.fgb')
 
     print("Extracting Runways...", flush=True)
-    thresholds = []
-    for rw in c.get_runways():
-        p = rw.to_dict()['primary']
-        lat, lon = p.get('lat'), p.get('lon')
-        if lat is not None and lon is not None:
-            elev = float(p.get('threshold_elevation') or 0.0)
-            thresholds.append(geojson.Feature(
-                geometry=geojson.Point((lon, lat, elev)),
-                properties={
-                    'airport': p.get('airport_id'),
-                    'runway': p.get('runway_id'),
-                    'length': p.get('length'),
-                    'bearing': p.get('bearing'),
-                    'width': p.get('width'),
-                    'type': 'runway',
-                    'rank': 5
-                }
-            ))
-
-    # Post-process thresholds into polygons and labels
-    runway_features = []
-    label_features = []
-    by_airport = defaultdict(list)
-    for t in thresholds:
-        by_airport[t.properties['airport']].append(t)
-
-    for airport_id, airport_thresholds in by_airport.items():
-        processed = set()
-        for t1 in airport_thresholds:
-            id1 = t1.properties['runway']
-            if id1 in processed:
-                continue
-
-            id2 = get_opposite_runway_id(id1)
-            t2 = next((t for t in airport_thresholds if t.properties['runway'] == id2), None)
-
-            width_ft = float(t1.properties.get('width') or 100.0)
-            length_ft = float(t1.properties.get('length') or 0.0)
-
-            if t2:
-                # Two ends matched!
-                p1 = t1.geometry.coordinates
-                p2 = t2.geometry.coordinates
-                poly = create_runway_poly(p1, p2, width_ft)
-                
-                # Sort bearings
-                b1 = float(t1.properties.get('bearing') or 0.0)
-                b2 = float(t2.properties.get('bearing') or 0.0)
-                bearings = sorted([b1, b2])
-                
-                combined_id = f"{id1.replace('RW', '')}/{id2.replace('RW', '')}"
-
-                if poly:
-                    props = t1.properties.copy()
-                    props.update({
-                        'runway': combined_id,
-                        'bearing_1': bearings[0],
-                        'bearing_2': bearings[1]
-                    })
-                    props.pop('bearing', None)
-                    
-                    runway_features.append(geojson.Feature(
-                        geometry=poly,
-                        properties=props
-                    ))
-                
-                # Create label features for both ends
-                # t1
-                l1_props = {
-                    'label': id1.replace('RW', ''),
-                    'runway_id': combined_id,
-                    'airport_id': airport_id,
-                    'bearing': b1,
-                    'type': 'runway_label'
-                }
-                label_features.append(geojson.Feature(geometry=t1.geometry, properties=l1_props))
-                
-                # t2
-                l2_props = {
-                    'label': id2.replace('RW', ''),
-                    'runway_id': combined_id,
-                    'airport_id': airport_id,
-                    'bearing': b2,
-                    'type': 'runway_label'
-                }
-                label_features.append(geojson.Feature(geometry=t2.geometry, properties=l2_props))
-
-                processed.add(id1)
-                processed.add(id2)
-            else:
-                # One end only, use bearing and length if available
-                p1 = t1.geometry.coordinates
-                bearing = t1.properties.get('bearing')
-                
-                if bearing is not None and length_ft > 0:
-                    try:
-                        b_val = float(bearing)
-                        p2 = calculate_destination(p1, b_val, length_ft)
-                        poly = create_runway_poly(p1, p2, width_ft)
-                        if poly:
-                            props = t1.properties.copy()
-                            props.update({
-                                'bearing_1': b_val,
-                                'bearing_2': None
-                            })
-                            props.pop('bearing', None)
-                            
-                            runway_features.append(geojson.Feature(
-                                geometry=poly,
-                                properties=props
-                            ))
-                            
-                            # Label for the known end
-                            l1_props = {
-                                'label': id1.replace('RW', ''),
-                                'runway_id': t1.properties.get('runway'), # No combined ID if single
-                                'airport_id': airport_id,
-                                'bearing': b_val,
-                                'type': 'runway_label'
-                            }
-                            label_features.append(geojson.Feature(geometry=t1.geometry, properties=l1_props))
-                            
-                    except (ValueError, TypeError):
-                        # Fallback to point if bearing invalid
-                        runway_features.append(t1)
-                else:
-                    # Fallback to point if no bearing/length
-                    runway_features.append(t1)
-                processed.add(id1)
-
-    save_fgb(runway_features, 'data/cifp_runways.fgb')
-    save_fgb(label_features, 'data/cifp_runway_labels.fgb')
+    instrument.section("runways")
+    instrument.count(features_in=tables['runways'].num_rows)
+    runways = tables['runways']
+    runways = runways.filter(pc.and_(pc.is_valid(runways['lat']), pc.is_valid(runways['lon']))).to_pydict()
+
+    # Raw values are kept as object arrays so null properties stay null in the output
+    airport, runway, length, width, bearing = (
+        np.array(runways[name], dtype=object) for name in ('airport_id', 'runway_id', 'length', 'width', 'bearing')
+    )
+    xyz = np.column_stack([
+        np.array(runways['lon'], dtype=np.float64),
+        np.array(runways['lat'], dtype=np.float64),
+        np.nan_to_num(np.array(runways['threshold_elevation'], dtype=np.float64)),
+    ])
+    bearing_deg = np.array(runways['bearing'], dtype=np.float64)
+    length_ft = np.nan_to_num(np.array(runways['length'], dtype=np.float64))
+    width_ft = np.nan_to_num(np.array(runways['width'], dtype=np.float64))
+    width_ft[width_ft == 0] = 100.0
+
+    # One entry per runway: i is the leading end, j its opposite (or i itself when unpaired)
+    i, partner = pair_runway_ends(runways['airport_id'], runways['runway_id'])
+    paired = partner >= 0
+    j = np.where(paired, partner, i)
+    # Unpaired ends can still be polygonized from their bearing and length
+    single = ~paired & ~np.isnan(bearing_deg[i]) & (length_ft[i] > 0)
+
+    p1 = xyz[i]
+    p2 = np.where(paired[:, None], xyz[j], calculate_destination_array(p1, np.nan_to_num(bearing_deg[i]), length_ft[i]))
+    rings, valid = create_runway_poly_array(p1, p2, width_ft[i])
+    has_poly = (paired | single) & valid
+
+    b1, b2 = np.nan_to_num(bearing_deg[i]), np.nan_to_num(bearing_deg[j])
+    bearing_1 = np.where(paired, np.minimum(b1, b2), b1)
+    bearing_2 = np.maximum(b1, b2).astype(object)
+    bearing_2[~paired] = None
+
+    label = np.array([(rw or '').replace('RW', '') for rw in runway], dtype=object)
+    combined_id = label[i] + '/' + label[j]
+    runway_id = np.where(paired, combined_id, runway[i])
+
+    runway_features = FeatureBuilder()
+    n = int(has_poly.sum())
+    runway_features.add_polygons(rings[has_poly], {
+        'airport': airport[i][has_poly],
+        'runway': runway_id[has_poly],
+        'length': length[i][has_poly],
+        'width': width[i][has_poly],
+        'type': ['runway'] * n,
+        'rank': [5] * n,
+        'bearing_1': bearing_1[has_poly],
+        'bearing_2': bearing_2[has_poly],
+    })
+
+    # Fallback to the threshold point if there is no bearing/length
+    fallback = ~paired & ~single
+    n = int(fallback.sum())
+    runway_features.add_points(p1[fallback], {
+        'airport': airport[i][fallback],
+        'runway': runway[i][fallback],
+        'length': length[i][fallback],
+        'bearing': bearing[i][fallback],
+        'width': width[i][fallback],
+        'type': ['runway'] * n,
+        'rank': [5] * n,
+    })
+
+    # Labels for the leading end (when drawn) and the opposite end, interleaved per runway
+    end1 = paired | (single & valid)
+    end2 = paired
+    order = np.lexsort((
+        np.repeat([0, 1], [end1.sum(), end2.sum()]),
+        np.concatenate([np.flatnonzero(end1), np.flatnonzero(end2)]),
+    ))
+    n = len(order)
+    label_features = FeatureBuilder()
+    label_features.add_points(np.concatenate([p1[end1], xyz[j][end2]])[order], {
+        'label': np.concatenate([label[i][end1], label[j][end2]])[order],
+        'runway_id': np.concatenate([runway_id[end1], combined_id[end2]])[order],
+        'airport_id': np.concatenate([airport[i][end1], airport[i][end2]])[order],
+        'bearing': np.concatenate([b1[end1], b2[end2]])[order],
+        'type': ['runway_label'] * n,
+    })
+
+    save_fgb(runway_features.to_geodataframe(), 'data/cifp_runways.fgb')
+    save_fgb(label_features.to_geodataframe(), 'data/cifp_runway_labels.fgb')
 
     print("Extracting Localizers...", flush=True)
-    loc_features = []
-    for loc in c.get_loc_gss():
-        p = loc.to_dict()['primary']
+    instrument.section("localizers")
+    instrument.count(features_in=len(cifp['loc_gss']))
+    loc_features = FeatureBuilder()
+    for p in cifp['loc_gss']:
         lat, lon = p.get('loc_lat'), p.get('loc_lon')
         if lat is not None and lon is not None:
             elev = float(p.get('gs_elevation') or 0.0)
-            loc_features.append(geojson.Feature(
-                geometry=geojson.Point((lon, lat, elev)),
-                properties={
-                    'airport': p.get('airport_id'),
-                    'runway': p.get('runway_id'),
-                    'ident': p.get('loc_id'),
-                    'frequency': p.get('frequency'),
-                    'bearing': p.get('loc_bearing'),
-                    'type': 'localizer',
-                    'rank': 5
-                }
-            ))
-
-    save_fgb(loc_features, 'data/localizers.fgb')
+            loc_features.add_point(lon, lat, elev, {
+                'airport': p.get('airport_id'),
+                'runway': p.get('runway_id'),
+                'ident': p.get('loc_id'),
+                'frequency': p.get('frequency'),
+                'bearing': p.get('loc_bearing'),
+                'type': 'localizer',
+                'rank': 5
+            })
+
+    save_fgb(loc_features.to_geodataframe(), 'data/localizers.fgb')
 
     print("FlatGeobuf generation complete.", flush=True)
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: <command> <FAACIFP18_file>")
+    args = region.strip_bbox_args(sys.argv[1:])
+    if len(args) < 1:
+        print("Usage: <command> <FAACIFP18_file> [--bbox min_lon,min_lat,max_lon,max_lat|<region>]")
         sys.exit(1)
-    build_pmtiles_fgb(sys.argv[1])
+    build_pmtiles_fgb(args[0], region.bbox_from_argv(sys.argv[1:]))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+"""
+Decluttering ranks of airports, navaids and waypoints (lower is more important).
+
+The tiles (`src.cifp.convert`) use them for tippecanoe's minzoom and feature order, and the
+search index (`src.search.build_index`) to order autocomplete suggestions, so both agree on
+what matters most.
+"""
+
+NDB_RANK = 5
+
+
+def airport_metadata(metadata: dict, ident: str) -> dict:
+    """The NASR metadata of a CIFP airport ({} if unknown)."""
+    # Try direct lookup (now robust with ICAO_ID indexing)
+    meta = metadata.get(ident)
+
+    # Fallback for continental US if ICAO_ID was missing from NASR but present in CIFP
+    if not meta and ident.startswith('K') and len(ident) == 4:
+        meta = metadata.get(ident[1:])
+
+    return meta or {}
+
+
+def airport_rank(ident: str, usage: str | None, longest_runway: int, meta: dict) -> int:
+    # Tier 1: Major Hubs (FAR 139 Index D/E)
+    # Tier 2: Regional/Commercial (FAR 139 B/C OR Towered OR > 7500ft)
+    # Tier 3: General Aviation (Starts with K OR > 4000ft)
+    # Tier 4: Minor / Private / Others
+    far_139 = meta.get('far_139', '')
+
+    # FAR 139 Index D or E are major commercial hubs
+    is_major_hub = any(idx in far_139 for idx in ['D', 'E'])
+    # FAR 139 Index A, B, or C are standard commercial
+    is_commercial = any(idx in far_139 for idx in ['A', 'B', 'C'])
+
+    if is_major_hub:
+        rank = 1
+    elif is_commercial or meta.get('has_tower', False) or longest_runway >= 7500:
+        rank = 2
+    elif ident.startswith('K') and len(ident) == 4 or longest_runway >= 4000:
+        rank = 3
+    else:
+        rank = 4
+
+    # Ensure military bases with huge runways remain Rank 1 even if not FAR 139
+    if usage == 'M' and longest_runway >= 10000:
+        rank = 1
+    return rank
+
+
+def navaid_rank(nav_class: str) -> int:
+    """VHF navaid rank from its ARINC 424 class: high, low, then terminal altitude class."""
+    alt_class = nav_class[1:2] if len(nav_class) > 1 else ' '
+    return {'H': 2, 'L': 3, 'T': 4}.get(alt_class, 5)
+
+
+def waypoint_type(raw_type: str) -> str:
+    """Classify a waypoint from its ARINC 424 type."""
+    if raw_type == 'C':
+        return 'compulsory'
+    if raw_type == 'R':
+        return 'rnav'
+    return 'named'
+
+
+def waypoint_rank(wpt_type: str, usage: str) -> int:
+    """Compulsory before RNAV before named; high/both altitude before low before terminal."""
+    base_rank = 5
+    if wpt_type == 'compulsory':
+        base_rank = 3
+    elif wpt_type == 'rnav':
+        base_rank = 4
+
+    # Usage: H = high altitude, L = low altitude, B = both, blank = terminal/other
+    if usage in ('H', 'B'):
+        rank = base_rank
+    elif usage == 'L':
+        rank = base_rank + 1
+    else:
+        rank = base_rank + 2
+
+    return min(rank, 6)
@@ -0,0 +1,231 @@
+"""
+Single-pass streaming reader for FAA CIFP (ARINC 424) files.
+
+Dispatches each fixed-width record to a per-section handler that decodes only the
+columns consumed by the converters. Records are returned as plain dicts keyed like
+`cifparse`'s `to_dict()['primary']` output so downstream code can use either source.
+"""
+
+SECTIONS = (
+    'airports',
+    'vhf_navaids',
+    'ndb_navaids',
+    'enroute_waypoints',
+    'terminal_waypoints',
+    'procedures',
+    'airway_points',
+    'runways',
+    'loc_gss',
+)
+
+# ---------------------------------------------------------------------------
+# Field decoders (mirror cifparse semantics for the fields we consume)
+# ---------------------------------------------------------------------------
+
+def _raw(s):
+    """Positional code field: None when blank, otherwise unstripped."""
+    return s if s.strip() else None
+
+def _text(s):
+    s = s.strip()
+    return s or None
+
+def _int(s):
+    return int(s) if s.isnumeric() else None
+
+def _scaled(s, scalar):
+    if not s.isnumeric():
+        return None
+    return round(int(s) * (10 ** scalar), abs(scalar))
+
+def _num(s):
+    return int(s) if s.isnumeric() else 0
+
+def _lat(s):
+    if not s.strip():
+        return None
+    result = _num(s[1:3]) + _num(s[3:5]) / 60 + round(_num(s[5:]) * 0.01, 2) / 3600
+    return -result if s[0] == 'S' else result
+
+def _lon(s):
+    if not s.strip():
+        return None
+    result = _num(s[1:4]) + _num(s[4:6]) / 60 + round(_num(s[6:]) * 0.01, 2) / 3600
+    return -result if s[0] == 'W' else result
+
+def _altitude(s):
+    """ARINC altitude (5.30); flight levels are returned as the bare FL number."""
+    if s[:2] == 'FL':
+        return int(s[2:]) if s[2:].isnumeric() else None
+    return int(s) if s.isnumeric() else None
+
+def _bearing(s):
+    """Magnetic bearing in tenths of a degree, or whole degrees when suffixed with 'T'."""
+    if not s.strip():
+        return None
+    if s[-1] == 'T':
+        return int(s[:-1]) if s[:-1].isnumeric() else None
+    return _scaled(s, -1)
+
+def _is_primary(c):
+    """Continuation record number 0/1 (or A/B) marks a primary record."""
+    if c.isnumeric():
+        return int(c) in (0, 1)
+    c = c.upper()
+    if 'A' <= c <= 'Z':
+        return c in ('A', 'B')
+    return True
+
+# ---------------------------------------------------------------------------
+# Per-section handlers
+# ---------------------------------------------------------------------------
+
+def _airport(line):
+    return {
+        'airport_id': _text(line[6:10]),
+        'longest': _scaled(line[27:30], 2),
+        'is_ifr': {'Y': True, 'N': False}.get(line[30:31]),
+        'longest_surface': _raw(line[31:32]),
+        'lat': _lat(line[32:41]),
+        'lon': _lon(line[41:51]),
+        'elevation': _int(line[56:61]),
+        'usage': _raw(line[80:81]),
+        'airport_name': _text(line[93:123]),
+    }
+
+def _vhf_navaid(line):
+    return {
+        'vhf_id': _text(line[13:17]),
+        'frequency': _scaled(line[22:27], -2),
+        'nav_class': _raw(line[27:32]),
+        'lat': _lat(line[32:41]),
+        'lon': _lon(line[41:51]),
+        'dme_id': _text(line[51:55]),
+        'dme_lat': _lat(line[55:64]),
+        'dme_lon': _lon(line[64:74]),
+        'dme_elevation': _int(line[79:84]),
+        'vhf_name': _text(line[93:123]),
+    }
+
+def _ndb_navaid(line):
+    return {
+        'ndb_id': _text(line[13:17]),
+        'frequency': _scaled(line[22:27], -1),
+        'lat': _lat(line[32:41]),
+        'lon': _lon(line[41:51]),
+        'ndb_name': _text(line[93:123]),
+    }
+
+def _waypoint(line):
+    return {
+        'waypoint_id': _text(line[13:18]),
+        'type': _raw(line[26:29]),
+        'usage': _raw(line[29:31]),
+        'lat': _lat(line[32:41]),
+        'lon': _lon(line[41:51]),
+        'name_description': _text(line[98:123]),
+    }
+
+def _procedure(line):
+    return {
+        'fac_id': _text(line[6:10]),
+        'procedure_id': _text(line[13:19]),
+        'transition_id': _text(line[20:25]),
+        'seq_no': _int(line[26:29]),
+        'fix_id': _text(line[29:34]),
+        'alt_1': _altitude(line[84:89]),
+        'trans_alt': _int(line[94:99]),
+    }
+
+def _airway_point(line):
+    return {
+        'airway_id': _text(line[13:18]),
+        'seq_no': _int(line[25:29]),
+        'point_id': _text(line[29:34]),
+        'route_type': _raw(line[44:45]),
+        'min_alt_1': _altitude(line[83:88]),
+        'min_alt_1_is_fl': line[83:85] == 'FL',
+    }
+
+def _runway(line):
+    return {
+        'airport_id': _text(line[6:10]),
+        'runway_id': _text(line[13:18]),
+        'length': _int(line[22:27]),
+        'bearing': _bearing(line[27:31]),
+        'lat': _lat(line[32:41]),
+        'lon': _lon(line[41:51]),
+        'threshold_elevation': _int(line[66:71]),
+        'width': _int(line[77:80]),
+    }
+
+def _loc_gs(line):
+    return {
+        'airport_id': _text(line[6:10]),
+        'loc_id': _text(line[13:17]),
+        'frequency': _scaled(line[22:27], -2),
+        'runway_id': _text(line[27:32]),
+        'loc_lat': _lat(line[32:41]),
+        'loc_lon': _lon(line[41:51]),
+        'loc_bearing': _bearing(line[51:55]),
+        'gs_elevation': _int(line[97:102]),
+    }
+
+# (section code, subsection code) -> (bucket, record key length, continuation column, handler)
+# Section D/E carry the subsection in column 6, section P in column 13.
+# SID/STAR/IAP legs get their own buckets so the final procedure order matches cifparse.
+HANDLERS = {
+    ('D', ' '): ('vhf_navaids', 21, 21, _vhf_navaid),
+    ('D', 'B'): ('ndb_navaids', 21, 21, _ndb_navaid),
+    ('E', 'A'): ('enroute_waypoints', 21, 21, _waypoint),
+    ('E', 'R'): ('airway_points', 38, 38, _airway_point),
+    ('P', 'A'): ('airports', 21, 21, _airport),
+    ('P', 'C'): ('terminal_waypoints', 21, 21, _waypoint),
+    ('P', 'D'): ('sids', 38, 38, _procedure),
+    ('P', 'E'): ('stars', 38, 38, _procedure),
+    ('P', 'F'): ('iaps', 38, 38, _procedure),
+    ('P', 'G'): ('runways', 21, 21, _runway),
+    ('P', 'I'): ('loc_gss', 21, 21, _loc_gs),
+}
+
+SUBSECTION_COLUMN = {'D': 5, 'E': 5, 'P': 12}
+
+
+def read_cifp(cifp_path):
+    """Stream a FAACIFP18 file once and return {section: [record dict, ...]}."""
+    buckets = {bucket: [] for bucket, _, _, _ in HANDLERS.values()}
+    # Per bucket: [key of the current record group, whether it has produced a record yet]
+    groups = {bucket: [None, False] for bucket in buckets}
+
+    with open(cifp_path) as f:
+        for line in f:
+            if line.startswith('HDR'):
+                continue
+            sec = line[4:5].upper()
+            col = SUBSECTION_COLUMN.get(sec)
+            if col is None:
+                continue
+            sub = line[col:col + 1]
+            handler = HANDLERS.get((sec, ' ' if not sub.strip() else sub))
+            if handler is None:
+                continue
+
+            bucket, key_len, cont_col, decode = handler
+            group = groups[bucket]
+            key = line[:key_len]
+            if key != group[0]:
+                group[0], group[1] = key, False
+
+            if not _is_primary(line[cont_col:cont_col + 1]):
+                continue
+
+            # Consecutive primaries sharing a key describe the same record; the last one wins
+            if group[1]:
+                buckets[bucket][-1] = decode(line)
+            else:
+                buckets[bucket].append(decode(line))
+                group[1] = True
+
+    result = {name: buckets.get(name, []) for name in SECTIONS}
+    result['procedures'] = buckets['sids'] + buckets['stars'] + buckets['iaps']
+    return result
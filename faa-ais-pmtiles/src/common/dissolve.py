@@ -0,0 +1,159 @@
+"""
+Spatially partitioned, parallel equivalent of `GeoDataFrame.dissolve`.
+
+Rows are grouped by the dissolution columns as usual, then each group is split into
+spatially connected components (geometries linked by overlapping bounding boxes, found with
+one STRtree query over the whole frame). Disjoint components cannot affect each other's
+union, so they are unioned independently across a process pool and reassembled per group. The result has
+the same rows, columns and order as `dissolve(by=..., as_index=False)`, with topologically
+equal geometries.
+
+Layers known to be polygonal coverages (edge-matched, non-overlapping sectors such as Class E)
+can use `method="coverage"`: each component is validated with `coverage_is_valid` and merged
+along its shared edges with `coverage_union_all`, falling back to the generic union only for
+components that are not valid coverages.
+"""
+
+import concurrent.futures
+import os
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+# Components with fewer total vertices than this are batched together into one pool task
+SMALL_COMPONENT_VERTICES = 20_000
+
+
+def connected_components(geoms: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Label geometries so that geometries of a group with overlapping envelopes share a label."""
+    labels = np.arange(len(geoms))
+    # Envelope overlap is a superset of `intersects` and far cheaper than the exact predicate
+    left, right = shapely.STRtree(geoms).query(geoms)
+    same = (groups[left] == groups[right]) & (left != right)
+    left, right = left[same], right[same]
+
+    # Min-label propagation, compressing label chains fully after each round, until every edge agrees
+    while True:
+        new = labels.copy()
+        np.minimum.at(new, left, labels[right])
+        np.minimum.at(new, right, labels[left])
+        while True:
+            jumped = new[new]
+            if np.array_equal(jumped, new):
+                break
+            new = jumped
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def _union(geoms: np.ndarray, method: str) -> tuple:
+    """Return (union, used_coverage) for one component."""
+    if method == "coverage" and len(geoms) > 1:
+        solid = geoms[~shapely.is_missing(geoms) & ~shapely.is_empty(geoms)]
+        if shapely.coverage_is_valid(solid):
+            return shapely.coverage_union_all(solid), True
+    return shapely.union_all(geoms), False
+
+
+def _union_batch(components: list[np.ndarray], method: str) -> list[tuple]:
+    return [_union(geoms, method) for geoms in components]
+
+
+def _union_components(components: list[np.ndarray], method: str, max_workers: int | None) -> list[tuple]:
+    """Union every component, largest first, spreading the work over a process pool."""
+    sizes = [int(shapely.get_num_coordinates(c).sum()) for c in components]
+    order = sorted(range(len(components)), key=lambda i: -sizes[i])
+
+    tasks: list[list[int]] = []
+    small: list[int] = []
+    small_size = 0
+    for i in order:
+        if sizes[i] >= SMALL_COMPONENT_VERTICES:
+            tasks.append([i])
+            continue
+        small.append(i)
+        small_size += sizes[i]
+        if small_size >= SMALL_COMPONENT_VERTICES:
+            tasks.append(small)
+            small, small_size = [], 0
+    if small:
+        tasks.append(small)
+
+    results = [None] * len(components)
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            for i, result in zip(task, _union_batch([components[i] for i in task], method)):
+                results[i] = result
+        return results
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_union_batch, [components[i] for i in task], method): task for task in tasks}
+        for future in concurrent.futures.as_completed(futures):
+            for i, result in zip(futures[future], future.result()):
+                results[i] = result
+    return results
+
+
+def _assemble(parts: list):
+    """Combine the unions of a group's disjoint components into one geometry."""
+    solid = [p for p in parts if p is not None and not p.is_empty]
+    if len(solid) <= 1:
+        return solid[0] if solid else shapely.union_all(parts)
+    pieces = shapely.get_parts(np.array(solid, dtype=object))
+    if (shapely.get_type_id(pieces) == shapely.GeometryType.POLYGON).all():
+        return shapely.multipolygons(pieces)
+    return shapely.union_all(solid)
+
+
+def parallel_dissolve(
+    gdf: gpd.GeoDataFrame,
+    by: list[str],
+    method: str = "unary",
+    max_workers: int | None = None,
+) -> gpd.GeoDataFrame:
+    """
+    Drop-in for `gdf.dissolve(by=by, as_index=False)` that unions components in parallel.
+
+    method is "unary" (generic union) or "coverage" (coverage union with unary fallback).
+    """
+    geometry_name = gdf.geometry.name
+    groupby_kwargs = dict(by=by, sort=True, dropna=True)
+
+    group_codes = gdf.groupby(**groupby_kwargs).ngroup().to_numpy()
+    keep = group_codes >= 0
+    geoms = gdf.geometry.values[keep]
+    codes = group_codes[keep]
+
+    labels = connected_components(np.asarray(geoms, dtype=object), codes)
+    # Component order follows first appearance so each component unions in input order
+    component_ids, first = np.unique(labels, return_index=True)
+    component_ids = component_ids[np.argsort(first)]
+    members = {c: [] for c in component_ids.tolist()}
+    for idx, label in enumerate(labels.tolist()):
+        members[label].append(idx)
+
+    geoms = np.asarray(geoms, dtype=object)
+    components = [geoms[members[c]] for c in component_ids.tolist()]
+    unions = _union_components(components, method, max_workers)
+
+    if method == "coverage":
+        multi = [used for c, (_, used) in zip(components, unions) if len(c) > 1]
+        print(f"  Coverage union: {sum(multi)} of {len(multi)} multi-polygon components; "
+              f"{len(multi) - sum(multi)} invalid coverages fell back to unary union")
+
+    group_parts: dict[int, list] = {}
+    for c, (geom, _) in zip(component_ids.tolist(), unions):
+        group_parts.setdefault(int(codes[c]), []).append(geom)
+
+    data = gdf.drop(labels=geometry_name, axis=1)
+    aggregated_data = data.groupby(**groupby_kwargs).agg("first")
+    aggregated_data.columns = aggregated_data.columns.to_flat_index()
+
+    merged = [_assemble(group_parts[g]) for g in range(len(aggregated_data))]
+    aggregated_geometry = gpd.GeoDataFrame(
+        {geometry_name: merged}, geometry=geometry_name, crs=gdf.crs, index=aggregated_data.index
+    )
+    return aggregated_geometry.join(aggregated_data).reset_index()
@@ -0,0 +1,150 @@
+"""
+Per-stage timing, CPU, peak-memory and feature-count instrumentation.
+
+Code is split into named stages with `with stage("name"):`; stages nest, and sequential code
+already divided by progress banners can call `section("name")` instead, which closes the
+previous section of the enclosing stage and opens a new one. Each stage records:
+
+  wall_s        wall-clock seconds
+  cpu_s         user + system CPU seconds of this process and of the children it reaped
+  peak_rss_mb   process peak RSS while the stage ran (Linux resets the high-water mark at
+                each stage start; elsewhere this is the lifetime peak)
+  features_in / features_out   counts reported by the code through `count()`
+  started_at    Unix time, to line stages up with an external `py-spy record` profile
+
+Records are plain dicts (children under "stages"), so they survive pickling back from
+process-pool workers. Setting PMTILES_PROFILE to a comma-separated list of stage names (or
+"all") additionally runs those stages under cProfile and dumps `<name>.prof` files into
+PROFILE_DIR for snakeviz/pstats.
+"""
+
+import cProfile
+import contextlib
+import os
+import resource
+import threading
+import time
+
+PROFILE_DIR = "data/build_reports/profiles"
+
+_local = threading.local()
+_lock = threading.Lock()
+_open_stages = 0
+
+
+def _stack() -> list[dict]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reset_peak_rss() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _profiled(name: str) -> bool:
+    names = os.environ.get("PMTILES_PROFILE", "")
+    return names == "all" or name in names.split(",")
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Record one (possibly nested) stage; yields its record dict."""
+    global _open_stages
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    record = {"name": name, "started_at": round(time.time(), 3), "stages": []}
+
+    with _lock:
+        if parent is not None:
+            parent["_peak"] = max(parent["_peak"], _peak_rss_mb())
+        # The high-water mark is process-wide, so only reset it when no other thread is mid-stage
+        if _open_stages == len(stack):
+            _reset_peak_rss()
+        _open_stages += 1
+    record["_peak"] = 0.0
+    stack.append(record)
+
+    profiler = None
+    if _profiled(name):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. an enclosing profiled stage) is already active
+            profiler = None
+
+    wall, cpu = time.perf_counter(), _cpu_seconds()
+    try:
+        yield record
+    finally:
+        if stack[-1] is not record:
+            _end_section(stack)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name.replace('/', '.')}.prof"))
+
+        record["wall_s"] = round(time.perf_counter() - wall, 3)
+        record["cpu_s"] = round(_cpu_seconds() - cpu, 3)
+        record["peak_rss_mb"] = round(max(record.pop("_peak"), _peak_rss_mb()), 1)
+        if not record["stages"]:
+            del record["stages"]
+        stack.pop()
+        with _lock:
+            _open_stages -= 1
+        if parent is not None:
+            parent["_peak"] = max(parent["_peak"], record["peak_rss_mb"])
+            parent["stages"].append(record)
+
+
+def _end_section(stack: list[dict]) -> None:
+    if stack and "_section" in stack[-1]:
+        stack[-1].pop("_section").__exit__(None, None, None)
+
+
+def section(name: str) -> None:
+    """Close the current section of the enclosing stage (if any) and start a new one."""
+    stack = _stack()
+    if not stack:
+        return
+    # A section is a child stage left open until the next section or the end of its parent
+    _end_section(stack)
+    cm = stage(name)
+    cm.__enter__()["_section"] = cm
+
+
+def count(**counts: int) -> None:
+    """Add feature counts (e.g. features_in=..., features_out=...) to the innermost stage."""
+    stack = _stack()
+    if stack:
+        record = stack[-1]
+        for key, n in counts.items():
+            record[key] = record.get(key, 0) + int(n)
+
+
+def run_stage(name: str, func, *args) -> dict:
+    """Run `func(*args)` as a top-level stage and return its record (picklable, for pools)."""
+    with stage(name) as record:
+        func(*args)
+    return record
@@ -0,0 +1,187 @@
+"""
+Bounding-box (regional) builds.
+
+Every converter takes an optional `bbox` of (min_lon, min_lat, max_lon, max_lat) and drops
+features outside it as early as it can: GDAL-backed reads pass the box to pyogrio so
+out-of-region features are never decoded into Python, and CIFP sections are filtered as Arrow
+tables before any per-record work. GeoJSON sources have no spatial index, so the first
+regional read of one converts it to a Hilbert-packed FlatGeobuf next to it (see
+`indexed_copy`) and later regional builds read only the matching index pages. Commands accept `--bbox min_lon,min_lat,max_lon,max_lat`
+or `--bbox <region>` for one of the named REGIONS.
+
+Procedures and airways are drawn from fixes that may lie outside the box, so CIFP fix
+lookups keep a LOOKUP_MARGIN_DEG band around it; only features touching the box itself are
+written.
+"""
+
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyogrio
+
+REGIONS: dict[str, tuple[float, float, float, float]] = {
+    "bay_area": (-123.2, 36.8, -121.2, 38.6),
+    "socal": (-120.0, 32.5, -116.0, 35.0),
+    "new_york": (-75.0, 40.0, -72.5, 41.5),
+    "hawaii": (-161.0, 18.5, -154.0, 22.5),
+}
+
+# ~180 NM: covers the fixes of terminal procedures and most airway legs that reach the box
+LOOKUP_MARGIN_DEG = 3.0
+
+# Point sections of the CIFP snapshot -> (lon columns, lat columns), first non-null wins
+CIFP_POINT_COLUMNS = {
+    "airports": (("lon",), ("lat",)),
+    "vhf_navaids": (("lon", "dme_lon"), ("lat", "dme_lat")),
+    "ndb_navaids": (("lon",), ("lat",)),
+    "enroute_waypoints": (("lon",), ("lat",)),
+    "terminal_waypoints": (("lon",), ("lat",)),
+}
+
+# Sections that belong to an airport and are kept whole with it
+CIFP_AIRPORT_COLUMNS = {
+    "runways": "airport_id",
+    "loc_gss": "airport_id",
+    "procedures": "fac_id",
+}
+
+
+def parse_bbox(value: str) -> tuple[float, float, float, float]:
+    """Parse 'min_lon,min_lat,max_lon,max_lat' or a REGIONS name."""
+    if value in REGIONS:
+        return REGIONS[value]
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(","))
+    except ValueError:
+        raise ValueError(
+            f"Invalid bbox {value!r}: expected min_lon,min_lat,max_lon,max_lat or one of {', '.join(REGIONS)}"
+        ) from None
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise ValueError(f"Invalid bbox {value!r}: min must be below max")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def bbox_from_argv(argv: list[str]) -> tuple[float, float, float, float] | None:
+    """The `--bbox VALUE` / `--bbox=VALUE` option of an argument list, if present."""
+    for i, arg in enumerate(argv):
+        if arg == "--bbox" and i + 1 < len(argv):
+            return parse_bbox(argv[i + 1])
+        if arg.startswith("--bbox="):
+            return parse_bbox(arg.split("=", 1)[1])
+    return None
+
+
+def strip_bbox_args(argv: list[str]) -> list[str]:
+    """argv without its `--bbox` option, for commands that also take positional arguments."""
+    out, skip = [], False
+    for i, arg in enumerate(argv):
+        if skip:
+            skip = False
+        elif arg == "--bbox":
+            skip = True
+        elif not arg.startswith("--bbox="):
+            out.append(arg)
+    return out
+
+
+def pad(bbox: tuple, margin: float) -> tuple[float, float, float, float]:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return min_lon - margin, min_lat - margin, max_lon + margin, max_lat + margin
+
+
+def contains_array(bbox: tuple | None, lon, lat) -> np.ndarray:
+    """Element-wise point-in-box test (all True without a box); NaN coordinates are outside."""
+    lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+    if bbox is None:
+        return np.ones(lon.shape, dtype=bool)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+
+
+def intersects_array(bbox: tuple | None, min_lon, min_lat, max_lon, max_lat) -> np.ndarray:
+    """Element-wise envelope/box intersection test (all True without a box)."""
+    if bbox is None:
+        return np.ones(np.shape(min_lon), dtype=bool)
+    return (
+        (np.asarray(max_lon) >= bbox[0]) & (np.asarray(min_lon) <= bbox[2])
+        & (np.asarray(max_lat) >= bbox[1]) & (np.asarray(min_lat) <= bbox[3])
+    )
+
+
+def indexed_copy(path: str) -> str:
+    """
+    A spatially indexed FlatGeobuf copy of a GeoJSON file, for bbox reads.
+
+    Built on first use and rebuilt whenever the source is newer; other formats are returned
+    as is. Features in the copy are in spatial (not source) order.
+    """
+    if not path.endswith(".geojson"):
+        return path
+    copy = f"{path.removesuffix('.geojson')}.indexed.fgb"
+    if os.path.exists(copy) and os.path.getmtime(copy) >= os.path.getmtime(path):
+        return copy
+
+    print(f"  Indexing {path} for regional reads...", flush=True)
+    info = pyogrio.read_info(path)
+    # GDAL picks the driver's file layout from the extension, so keep .fgb on the temp file
+    tmp_path = f"{copy.removesuffix('.fgb')}.tmp-{os.getpid()}.fgb"
+    with pyogrio.raw.open_arrow(path, use_pyarrow=True) as (meta, reader):
+        pyogrio.write_arrow(
+            reader,
+            tmp_path,
+            driver="FlatGeobuf",
+            geometry_name=meta["geometry_name"] or "wkb_geometry",
+            geometry_type=info["geometry_type"],
+            crs="EPSG:4326",
+            layer_options={"SPATIAL_INDEX": "YES"},
+        )
+    os.replace(tmp_path, copy)
+    return copy
+
+
+def has_features(path: str, bbox: tuple) -> bool:
+    """
+    Whether any feature of `path` intersects bbox (a cheap index lookup on FlatGeobuf).
+
+    GDAL's Arrow stream of a spatially filtered FlatGeobuf yields a batch of garbage rather
+    than nothing when no feature matches, so check before reading through Arrow.
+    """
+    return len(pyogrio.read_dataframe(path, columns=[], read_geometry=False, fid_as_index=True, bbox=bbox)) > 0
+
+
+def _coalesce(table: pa.Table, names: tuple[str, ...]) -> np.ndarray:
+    column = pc.coalesce(*(table[n] for n in names))
+    return column.to_numpy(zero_copy_only=False).astype(np.float64)
+
+
+def clip_cifp_tables(tables: dict[str, pa.Table], bbox: tuple | None) -> dict[str, pa.Table]:
+    """
+    Restrict CIFP snapshot tables to a region before any per-record work.
+
+    Point sections keep every row within LOOKUP_MARGIN_DEG of the box and gain an `in_region`
+    column marking the rows inside it; runways, localizers and procedures keep the rows of
+    in-region airports. Airway points are left whole, since only their fixes have coordinates.
+    """
+    if bbox is None:
+        return tables
+
+    lookup = pad(bbox, LOOKUP_MARGIN_DEG)
+    clipped = dict(tables)
+    for name, (lon_cols, lat_cols) in CIFP_POINT_COLUMNS.items():
+        table = tables[name]
+        lon, lat = _coalesce(table, lon_cols), _coalesce(table, lat_cols)
+        keep = contains_array(lookup, lon, lat)
+        inside = contains_array(bbox, lon, lat)[keep]
+        clipped[name] = table.filter(pa.array(keep)).append_column("in_region", pa.array(inside))
+
+    airports = pc.utf8_trim_whitespace(clipped["airports"].filter(clipped["airports"]["in_region"])["airport_id"])
+    for name, column in CIFP_AIRPORT_COLUMNS.items():
+        table = tables[name]
+        member = pc.is_in(pc.utf8_trim_whitespace(table[column]), value_set=airports.combine_chunks())
+        clipped[name] = table.filter(pc.fill_null(member, False))
+
+    counts = ", ".join(f"{n} {clipped[n].num_rows}/{tables[n].num_rows}" for n in (*CIFP_POINT_COLUMNS, *CIFP_AIRPORT_COLUMNS))
+    print(f"  Clipped CIFP to {bbox}: {counts}", flush=True)
+    return clipped
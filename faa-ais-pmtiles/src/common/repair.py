@@ -0,0 +1,43 @@
+"""
+Selective repair of invalid polygon geometries.
+
+Validity is checked for the whole array in one vectorized call and only the invalid
+geometries are passed to `make_valid`, so valid inputs come through untouched. The
+"structure" method rebuilds polygons from their rings (a bowtie keeps both lobes, where
+`buffer(0)` silently drops one) and discards parts that collapse to lines or points.
+Each call prints a per-reason summary so upstream data regressions show up in the logs.
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+import shapely
+
+# GEOS appends the offending location, e.g. "Self-intersection[-97.1 32.8]"
+_REASON_LOCATION = re.compile(r"\[.*\]$")
+
+
+def repair_geometries(geoms, label: str = "geometries") -> np.ndarray:
+    """
+    Return a copy of `geoms` with only the invalid entries repaired, printing a report.
+
+    Missing geometries are left as-is; repairs that collapse to nothing become empty polygons.
+    """
+    geoms = np.array(geoms, dtype=object)
+    invalid = ~shapely.is_valid(geoms) & ~shapely.is_missing(geoms)
+    count = int(invalid.sum())
+    print(f"  Repair {label}: {count} of {len(geoms)} invalid")
+    if not count:
+        return geoms
+
+    reasons = Counter(_REASON_LOCATION.sub("", r) for r in shapely.is_valid_reason(geoms[invalid]).tolist())
+    for reason, n in reasons.most_common():
+        print(f"    {n:>6}  {reason}")
+
+    repaired = shapely.make_valid(geoms[invalid], method="structure", keep_collapsed=False)
+    emptied = int(shapely.is_empty(repaired).sum())
+    if emptied:
+        print(f"    {emptied} collapsed to empty geometries")
+    geoms[invalid] = repaired
+    return geoms
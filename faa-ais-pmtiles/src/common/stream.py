@@ -0,0 +1,134 @@
+"""
+Newline-delimited GeoJSON output into tippecanoe through named pipes.
+
+In `build-pmtiles --stream` mode the build creates one named pipe per tiled layer in the
+directory given by PMTILES_STREAM_DIR and starts tippecanoe reading from them before the
+converters run. A converter whose output has a pipe (`pipe_for`) writes its features into
+it instead of writing the FlatGeobuf, so conversion and tiling overlap and the layer never
+touches the disk. Any FlatGeobuf from an earlier build is removed, so the incremental
+manifest never mistakes it for current.
+
+Opening a pipe blocks until tippecanoe reaches that layer, and tippecanoe reads a job's
+layers in command-line order, so a converter that writes several layers of one archive
+must write them in that order. Each pipe is unlinked once it has been opened; pipes still
+present after the converters finish (e.g. a missing source) are closed empty by
+`close_unwritten`.
+"""
+
+import json
+import math
+import os
+from json.encoder import encode_basestring_ascii as quote
+
+import numpy as np
+import pandas as pd
+import shapely
+
+STREAM_DIR_ENV = "PMTILES_STREAM_DIR"
+
+
+def pipe_path(stream_dir: str, output: str) -> str:
+    return os.path.join(stream_dir, os.path.splitext(os.path.basename(output))[0] + ".json")
+
+
+def create_pipes(stream_dir: str, outputs: list[str]) -> dict[str, str]:
+    """Create a named pipe for each converter output; returns {output: pipe}."""
+    pipes = {}
+    for output in outputs:
+        pipes[output] = pipe_path(stream_dir, output)
+        os.mkfifo(pipes[output])
+    return pipes
+
+
+def pipe_for(output: str) -> str | None:
+    """The pipe standing in for a converter output, or None when it is written to disk."""
+    stream_dir = os.environ.get(STREAM_DIR_ENV)
+    if not stream_dir:
+        return None
+    path = pipe_path(stream_dir, output)
+    return path if os.path.exists(path) else None
+
+
+def _json_value(value) -> str:
+    if isinstance(value, str):
+        return quote(value)
+    if value is None or value is pd.NA or value != value:
+        return "null"
+    return json.dumps(value.item() if isinstance(value, np.generic) else value)
+
+
+def _json_values(column: pd.Series) -> list[str]:
+    """A column's values as JSON, floats at full precision as in the FlatGeobuf path."""
+    values = column.tolist()
+    if not isinstance(column.dtype, np.dtype):
+        return list(map(_json_value, values))
+    if column.dtype.kind == "f":
+        return [repr(v) if math.isfinite(v) else "null" for v in values]
+    if column.dtype.kind in "iu":
+        return list(map(str, values))
+    if column.dtype.kind == "b":
+        return ["true" if v else "false" for v in values]
+    return list(map(_json_value, values))
+
+
+def _feature_lines(properties: pd.DataFrame, geoms) -> list[str]:
+    keep = ~shapely.is_missing(geoms)
+    properties = properties[keep]
+    geometry = shapely.to_geojson(shapely.force_2d(geoms[keep]))
+    # Encoded column by column; pandas' own JSON writer rounds floats to 15 digits at most
+    template = "{" + ",".join(quote(str(name)).replace("%", "%%") + ":%s" for name in properties.columns) + "}"
+    columns = [_json_values(properties[name]) for name in properties.columns]
+    rows = [template % fields for fields in zip(*columns)] if columns else ["{}"] * len(geometry)
+    return [f'{{"type":"Feature","geometry":{g},"properties":{p}}}' for g, p in zip(geometry, rows)]
+
+
+def frame_lines(gdf) -> list[str]:
+    """GeoJSON feature lines for a GeoDataFrame, in row order."""
+    return _feature_lines(pd.DataFrame(gdf.drop(columns=gdf.geometry.name)), gdf.geometry.values)
+
+
+def batch_lines(batch, geometry_name: str) -> list[str]:
+    """GeoJSON feature lines for an Arrow record batch with a WKB geometry column."""
+    geoms = shapely.from_wkb(batch.column(geometry_name).to_numpy(zero_copy_only=False))
+    return _feature_lines(batch.drop_columns([geometry_name]).to_pandas(), geoms)
+
+
+def send_lines(lines, output: str) -> int:
+    """Write GeoJSON feature lines into the pipe for `output`; returns the feature count."""
+    pipe = pipe_for(output)
+    if os.path.exists(output):
+        os.remove(output)
+    count = 0
+    # Blocks until tippecanoe opens this layer
+    with open(pipe, "w") as f:
+        os.unlink(pipe)
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+            count += 1
+    print(f"  Streamed {count} features for {output}")
+    return count
+
+
+def close_unwritten(pipes) -> None:
+    """Send an empty layer down every pipe no converter opened, so tippecanoe can finish."""
+    for pipe in pipes:
+        if os.path.exists(pipe):
+            with open(pipe, "w"):
+                os.unlink(pipe)
+
+
+def release(pipes) -> None:
+    """
+    Detach the converters from pipes whose tippecanoe job has gone (e.g. it failed).
+
+    A converter blocked opening one of them is woken by a momentary reader and then fails
+    on its first write; later converters find no pipe and write the FlatGeobuf instead.
+    """
+    for pipe in pipes:
+        try:
+            fd = os.open(pipe, os.O_RDONLY | os.O_NONBLOCK)
+        except FileNotFoundError:
+            continue
+        os.unlink(pipe)
+        os.close(fd)
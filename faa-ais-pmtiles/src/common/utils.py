@@ -2,11 +2,15 @@
 Shared utility functions for geospatial calculations and file I/O.
 
 Includes Haversine distance, altitude parsing, coordinate unwrapping (anti-meridian handling),
-and FlatGeobuf saving.
+and FlatGeobuf saving (or streaming into tippecanoe, see `src.common.stream`). The `*_array` variants are NumPy equivalents for batched segments.
 """
 
 import math
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from src.common import instrument, stream
 
 def haversine(lon1, lat1, lon2, lat2):
     R = 3440.065 # Earth radius in NM
@@ -18,6 +22,16 @@ def haversine(lon1, lat1, lon2, lat2):
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return R * c
 
+def haversine_array(lon1, lat1, lon2, lat2):
+    R = 3440.065 # Earth radius in NM
+    dLat = np.radians(np.subtract(lat2, lat1))
+    dLon = np.radians(np.subtract(lon2, lon1))
+    a = (np.sin(dLat / 2) * np.sin(dLat / 2) +
+        np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) *
+        np.sin(dLon / 2) * np.sin(dLon / 2))
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
 def parse_altitude(alt_str):
     if not alt_str:
         return 0.0
@@ -37,6 +51,11 @@ def parse_altitude(alt_str):
                 pass
         return 0.0
 
+def parse_altitude_array(values):
+    """parse_altitude over an array-like, evaluated once per distinct value."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    return np.array([parse_altitude(v) for v in uniques], dtype=np.float64)[codes]
+
 def unwrap_coordinates(coords):
     if not coords:
         return coords
@@ -53,22 +72,35 @@ def unwrap_coordinates(coords):
         unwrapped.append((curr_lon, lat, elev))
     return unwrapped
 
+def unwrap_longitude_array(prev_lon, lon):
+    """Shift each lon by whole turns to within 180 degrees of prev_lon (as unwrap_coordinates)."""
+    d = np.subtract(lon, prev_lon)
+    turns = np.where(d > 180, -np.ceil((d - 180) / 360), np.where(d < -180, np.ceil((-180 - d) / 360), 0))
+    return lon + 360 * turns
+
+def write_layer(gdf, output_path):
+    """Write a finished layer to its tippecanoe pipe in stream mode, otherwise as FlatGeobuf."""
+    if stream.pipe_for(output_path):
+        stream.send_lines(stream.frame_lines(gdf), output_path)
+        return
+    # Disable spatial index to ensure linear reading order by tippecanoe
+    gdf.to_file(output_path, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+
 def save_fgb(features, output_path):
+    if len(features) == 0:
+        # Still replace the file, so a regional build never leaves a national layer behind
+        print(f"  No features for {output_path}, writing an empty layer.")
+        write_layer(gpd.GeoDataFrame(geometry=[], crs="EPSG:4326"), output_path)
+        return
     if isinstance(features, gpd.GeoDataFrame):
-        if features.empty:
-            print(f"  No features for {output_path}, skipping.")
-            return
         gdf = features
         if gdf.crs is None:
             gdf.set_crs("EPSG:4326", inplace=True)
     else:
-        if not features:
-            print(f"  No features for {output_path}, skipping.")
-            return
         gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
 
     if 'rank' in gdf.columns:
         gdf.sort_values(by='rank', ascending=True, inplace=True)
     gdf.geometry = gdf.geometry.force_2d()
-    # Disable spatial index to ensure linear reading order by tippecanoe
-    gdf.to_file(output_path, driver="FlatGeobuf", engine="pyogrio", layer_options={'SPATIAL_INDEX': 'NO'})
+    write_layer(gdf, output_path)
+    instrument.count(features_out=len(gdf))
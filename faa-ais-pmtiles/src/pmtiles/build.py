@@ -3,21 +3,42 @@ Orchestrates the entire PMTiles build pipeline.
 
 Coordinates the fetching of raw data (CIFP, ADDS, NASR), conversion to intermediate
 formats (FlatGeobuf/GeoJSON), and the compilation of final PMTiles archives using `tippecanoe`.
+Conversion and tiling are incremental: each stage below declares its inputs, outputs and code,
+and only reruns when their content changes (see `src.pmtiles.dag`). Pass `--force` to rebuild
+everything, `--bbox min_lon,min_lat,max_lon,max_lat` (or a region name from
+`src.common.region.REGIONS`) to build only one region, `--shard` to tile the largest
+archives as parallel spatial shards (see `src.pmtiles.shard`), and `--stream` to pipe the
+converters' output straight into tippecanoe (see `src.common.stream`). The build fails
+when a tile breaks its size or feature budget (see `src.tools.tile_budget`).
 """
 
 import concurrent.futures
+import functools
+import importlib.metadata
+import json
 import os
+import shutil
 import subprocess
+import sys
+import tempfile
+import time
 
 from src.adds import convert as shp_to_fgb
 from src.adds import fetch as fetch_airspace_shp
 from src.cifp import convert as cifp_to_fgb
 from src.cifp import fetch as fetch_cifp
 from src.cifp import nasr as fetch_nasr
+from src.common import instrument, region, stream
+from src.pmtiles import shard
+from src.pmtiles.dag import in_pool, run_stages
+from src.pmtiles.schedule import run_concurrently, run_scheduled
 from src.runways.merge import merge_runways
+from src.tools import tile_budget
 
-# Each PMTiles file is served directly to the frontend — no tile-join needed.
-# This allows each file to use its own optimal zoom range.
+REPORT_DIR = "data/build_reports"
+
+# Each PMTiles file is served directly to the frontend — archives are only joined to
+# reassemble `--shard` builds. This allows each file to use its own optimal zoom range.
 PMTILES_FILES = [
     "airspaces",
     "enroute",
@@ -36,88 +57,361 @@ def fetch_nasr_wrapper():
     fetch_nasr.get_airport_metadata()
 
 
+# ---------------------------------------------------------------------------
+# Build stages
+# ---------------------------------------------------------------------------
+#
+# {name, inputs (paths or globs), outputs, code (modules whose source affects the
+# outputs), config, run (picklable callable) or cmd (tippecanoe shell command)}.
+# Stages in one step run concurrently.
+
+ADDS_CODE = [
+    "src.adds.convert",
+    "src.common.features",
+    "src.common.region",
+    "src.common.stream",
+    "src.common.utils",
+]
+
+CONVERT_STAGES = [
+    {
+        "name": "cifp",
+        "inputs": ["FAACIFP18", "data/nasr_metadata.json"],
+        "outputs": [
+            "data/airports.geojson",
+            "data/waypoints.fgb",
+            "data/navaids.fgb",
+            "data/procedures.fgb",
+            "data/airways.fgb",
+            "data/cifp_runways.fgb",
+            "data/cifp_runway_labels.fgb",
+            "data/localizers.fgb",
+        ],
+        "code": [
+            "src.cifp.convert",
+            "src.cifp.reader",
+            "src.cifp.cache",
+            "src.cifp.nasr",
+            "src.cifp.ranks",
+            "src.common.features",
+            "src.common.region",
+            "src.common.stream",
+            "src.common.utils",
+            "src.runways.geometry",
+        ],
+        "run": functools.partial(cifp_to_fgb.build_pmtiles_fgb, "FAACIFP18"),
+    },
+    {
+        "name": "airspaces",
+        "inputs": ["shapefiles/**/*", "data/sua_raw.geojson"],
+        "outputs": ["data/airspaces.fgb", "data/airspaces_e.fgb"],
+        "code": ADDS_CODE + ["src.common.dissolve", "src.common.repair"],
+        "run": shp_to_fgb.convert_airspaces,
+    },
+    {
+        "name": "boundary_airspace",
+        "inputs": ["data/boundary_airspace_raw.geojson"],
+        "outputs": ["data/boundary_airspace.fgb"],
+        "code": ADDS_CODE,
+        "run": shp_to_fgb.convert_boundary_airspace,
+    },
+    {
+        "name": "holding_patterns",
+        "inputs": ["data/holding_patterns_raw.geojson"],
+        "outputs": ["data/holding_patterns.fgb"],
+        "code": ADDS_CODE,
+        "run": shp_to_fgb.convert_holding_patterns,
+    },
+    {
+        "name": "obstacles",
+        "inputs": ["data/dof_raw.geojson"],
+        "outputs": ["data/obstacles.fgb"],
+        "code": ADDS_CODE,
+        "run": shp_to_fgb.convert_obstacles,
+    },
+    {
+        "name": "am_runways",
+        "inputs": ["data/am_runways_raw.geojson"],
+        "outputs": ["data/am_runways.fgb"],
+        "code": ADDS_CODE,
+        "run": shp_to_fgb.convert_am_runways,
+    },
+    {
+        "name": "am_taxiways",
+        "inputs": ["data/am_taxiways_raw.geojson"],
+        "outputs": ["data/am_taxiways.fgb"],
+        "code": ADDS_CODE,
+        "run": shp_to_fgb.convert_am_taxiways,
+    },
+]
+
+MERGE_STAGES = [
+    {
+        "name": "merge_runways",
+        "inputs": ["data/cifp_runways.fgb", "data/cifp_runway_labels.fgb", "data/am_runways.fgb"],
+        "outputs": ["data/runways.fgb", "data/runway_labels.fgb"],
+        "code": ["src.runways.merge", "src.common.region", "src.common.stream", "src.common.utils"],
+        "run": merge_runways,
+    },
+]
+
+# Archive name -> (tippecanoe options, {layer: source}). tippecanoe turns FlatGeobuf integer
+# columns into strings but keeps GeoJSON numbers, so -T pins every integer attribute for
+# file-based and streamed (`--stream`) builds alike.
+TIPPECANOE_JOBS = {
+    "airspaces": (
+        "-Z0 -z8 --no-feature-limit --no-tile-size-limit --buffer=25 --no-clipping",
+        {"airspaces": "data/airspaces.fgb"},
+    ),
+    "enroute": (
+        "-Z0 -z8 --no-feature-limit --no-tile-size-limit -T mea:int -T distance:int -T rank:int",
+        {"airways": "data/airways.fgb", "airspaces": "data/airspaces_e.fgb"},
+    ),
+    "boundary": (
+        "-Z0 -z8 --no-feature-limit --no-tile-size-limit",
+        {"boundary_airspace": "data/boundary_airspace.fgb"},
+    ),
+    "airports_navaids": (
+        "-Z0 -z10 --no-feature-limit --no-tile-size-limit --order-by=rank --order-smallest-first -T rank:int -T longest_runway:int",
+        {"airports": "data/airports.geojson", "navaids": "data/navaids.fgb", "localizers": "data/localizers.fgb"},
+    ),
+    "waypoints_obstacles": (
+        "-Z0 -z10 --drop-fraction-as-needed --order-by=rank --order-smallest-first -T rank:int -T agl:int -T amsl:int"
+        " -T course_in:int -T course_out:int -T speed_limit:int",
+        {"waypoints": "data/waypoints.fgb", "holding_patterns": "data/holding_patterns.fgb", "obstacles": "data/obstacles.fgb"},
+    ),
+    "airport_diagrams": (
+        "-Z9 -z14 --no-feature-limit --no-tile-size-limit -T rank:int",
+        {"runways": "data/runways.fgb", "am_taxiways": "data/am_taxiways.fgb", "runway_labels": "data/runway_labels.fgb"},
+    ),
+}
+
+
+# Archives that `--shard` tiles per grid cell, from the given zoom up. That zoom is the
+# archive's base zoom (its maxzoom): below it tippecanoe thins points across the whole input.
+SHARDED_ARCHIVES = {
+    "waypoints_obstacles": 10,
+    "airport_diagrams": 14,
+}
+SHARD_GRID_ZOOM = 4
+SHARD_DIR = "data/shards"
+
+
+def regional_stages(stages: list[dict], bbox: tuple | None) -> list[dict]:
+    """Restrict the `run` stages to bbox; the box becomes part of each stage's key."""
+    if bbox is None:
+        return stages
+    return [
+        {**s, "run": functools.partial(s["run"], bbox=bbox), "config": {**(s.get("config") or {}), "bbox": bbox}}
+        for s in stages
+    ]
+
+
+def tippecanoe_stage(name: str, options: str, layers: dict[str, str], output: str, version: str) -> dict:
+    sources = " ".join(f"-L {layer}:{path}" for layer, path in layers.items())
+    cmd = f"uv run tippecanoe {options} -o {output} -f {sources}"
+    return {
+        "name": name,
+        "inputs": list(layers.values()),
+        "outputs": [output],
+        "config": {"cmd": cmd, "tippecanoe": version},
+        "cmd": cmd,
+    }
+
+
+def split_stages() -> list[dict]:
+    """Split the inputs of each sharded archive into per-cell FlatGeobufs."""
+    stages = []
+    for archive, shard_zoom in SHARDED_ARCHIVES.items():
+        options, layers = TIPPECANOE_JOBS[archive]
+        out_dir = os.path.join(SHARD_DIR, archive)
+        buffer = shard.buffer_of(options)
+        stages.append({
+            "name": f"{archive}.shards",
+            "inputs": list(layers.values()),
+            "outputs": [os.path.join(out_dir, "shards.json")],
+            "code": ["src.pmtiles.shard"],
+            "config": {"grid_zoom": SHARD_GRID_ZOOM, "shard_zoom": shard_zoom, "buffer": buffer},
+            "run": functools.partial(shard.split_archive, layers, out_dir, SHARD_GRID_ZOOM, shard_zoom, buffer),
+        })
+    return stages
+
+
+def shard_parts(archive: str) -> list[str]:
+    """The partial archives `tippecanoe_stages(sharded=True)` builds for a sharded archive."""
+    out_dir = os.path.join(SHARD_DIR, archive)
+    parts = [f"{out_dir}/{cell}.pmtiles" for cell in shard.load_cells(out_dir)]
+    minzoom, _ = shard.zoom_range(TIPPECANOE_JOBS[archive][0])
+    if minzoom < SHARDED_ARCHIVES[archive]:
+        parts.insert(0, f"{out_dir}/low.pmtiles")
+    return parts
+
+
+def tippecanoe_stages(
+    bbox: tuple | None = None, sharded: bool = False, archives: list[str] | None = None, pipes: dict | None = None
+) -> list[dict]:
+    """Jobs for `archives` (default: all), reading each source from its entry in `pipes` if any."""
+    version = importlib.metadata.version("tippecanoe")
+    # Features that merely overlap the region (e.g. ARTCC boundaries) are cut at its edge
+    clip = f" --clip-bounding-box={','.join(str(v) for v in bbox)}" if bbox else ""
+    stages = []
+    for archive, (options, layers) in TIPPECANOE_JOBS.items():
+        if archives is not None and archive not in archives:
+            continue
+        layers = {layer: (pipes or {}).get(path, path) for layer, path in layers.items()}
+        options += clip
+        if not (sharded and archive in SHARDED_ARCHIVES):
+            stages.append(tippecanoe_stage(f"{archive}.pmtiles", options, layers, f"output/{archive}.pmtiles", version))
+            continue
+
+        # Zooms below the shard zoom from the whole input, the rest per grid cell
+        shard_zoom = SHARDED_ARCHIVES[archive]
+        minzoom, maxzoom = shard.zoom_range(options)
+        out_dir = os.path.join(SHARD_DIR, archive)
+        if minzoom < shard_zoom:
+            low = shard.with_zooms(options, minzoom, shard_zoom - 1)
+            stages.append(tippecanoe_stage(f"{archive}.low.pmtiles", low, layers, f"{out_dir}/low.pmtiles", version))
+        high = shard.with_zooms(options, shard_zoom, maxzoom)
+        for cell, cell_layers in shard.load_cells(out_dir).items():
+            stages.append(tippecanoe_stage(f"{archive}.{cell}.pmtiles", high, cell_layers, f"{out_dir}/{cell}.pmtiles", version))
+    return stages
+
+
+def join_stages() -> list[dict]:
+    """Reassemble each sharded archive from its parts, taking each tile from the part that owns it."""
+    stages = []
+    for archive in SHARDED_ARCHIVES:
+        out_dir = os.path.join(SHARD_DIR, archive)
+        parts = shard_parts(archive)
+        output = f"output/{archive}.pmtiles"
+        stages.append({
+            "name": f"{archive}.pmtiles",
+            "inputs": [os.path.join(out_dir, "shards.json"), *parts],
+            "outputs": [output],
+            "code": ["src.pmtiles.shard", "src.tools.pmtiles_reader"],
+            "run": functools.partial(shard.join_parts, out_dir, output),
+        })
+    return stages
+
+
+def streamed_archives(sharded: bool = False) -> list[str]:
+    """
+    Archives that `--stream` tiles from pipes: those whose every layer is a converter output.
+
+    Archives fed by the runway merge need complete converter files first, and sharded
+    archives are split from files, so both are still tiled afterwards.
+    """
+    produced = {path for s in CONVERT_STAGES for path in s["outputs"]}
+    return [
+        archive for archive, (_, layers) in TIPPECANOE_JOBS.items()
+        if set(layers.values()) <= produced and not (sharded and archive in SHARDED_ARCHIVES)
+    ]
+
+
+def convert_streaming(bbox: tuple | None, archives: list[str]) -> list[dict]:
+    """
+    Run every converter while tippecanoe tiles `archives` straight from their output.
+
+    Every converter runs at once and unconditionally: a converter writing into a pipe waits
+    for its tippecanoe job, which may in turn wait for another converter's layer. Streamed
+    archives are not recorded in the manifest, so the next file-based build retiles them.
+    """
+    stream_dir = tempfile.mkdtemp(prefix="pmtiles-stream-", dir=os.environ.get("PMTILES_TMPDIR"))
+    outputs = [path for archive in archives for path in TIPPECANOE_JOBS[archive][1].values()]
+    pipes = stream.create_pipes(stream_dir, outputs)
+    os.environ[stream.STREAM_DIR_ENV] = stream_dir
+
+    def tile(results):
+        return [{"status": "streamed", **record} for _, record in results]
+
+    try:
+        # tippecanoe starts before the converter pool forks (see `run_concurrently`)
+        results = run_concurrently(tippecanoe_stages(bbox, archives=archives, pipes=pipes), {})
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as tiler:
+            tiling = tiler.submit(tile, results)
+            # A failed tippecanoe job must not leave converters waiting on its pipes
+            tiling.add_done_callback(lambda f: f.exception() and stream.release(pipes.values()))
+            pool = functools.partial(concurrent.futures.ProcessPoolExecutor, max_workers=len(CONVERT_STAGES))
+            try:
+                converted = run_stages(regional_stages(CONVERT_STAGES, bbox), in_pool(pool), force=True)
+            finally:
+                stream.close_unwritten(pipes.values())
+            return converted + tiling.result()
+    finally:
+        del os.environ[stream.STREAM_DIR_ENV]
+        shutil.rmtree(stream_dir, ignore_errors=True)
+
+
+def write_report(report: dict, report_dir: str = REPORT_DIR) -> str:
+    """Write a run report as data/build_reports/<UTC start time>.json and return its path."""
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(report["started_at"]))
+    path = os.path.join(report_dir, f"{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+    return path
+
+
 def main():
+    report = {"started_at": round(time.time(), 3), "argv": sys.argv[1:], "steps": []}
+    wall = time.perf_counter()
+
     print("Step 1: Fetching data concurrently...")
     with concurrent.futures.ThreadPoolExecutor() as executor:
-        f1 = executor.submit(fetch_cifp.main)
-        f2 = executor.submit(fetch_airspace_shp.main)
-        f3 = executor.submit(fetch_nasr_wrapper)
+        f1 = executor.submit(instrument.run_stage, "fetch_cifp", fetch_cifp.main)
+        f2 = executor.submit(instrument.run_stage, "fetch_adds", fetch_airspace_shp.main)
+        f3 = executor.submit(instrument.run_stage, "fetch_nasr", fetch_nasr_wrapper)
         concurrent.futures.wait([f1, f2, f3])
         # Check exceptions
-        f1.result()
-        f2.result()
-        f3.result()
+        report["steps"].append({"name": "fetch", "stages": [f1.result(), f2.result(), f3.result()]})
 
     if not os.path.exists("FAACIFP18"):
         print("Error: FAACIFP18 not found after fetching.")
         return
 
-    print("Step 2: Parsing and converting to FlatGeobuf concurrently...")
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        f1 = executor.submit(shp_to_fgb.main)
-        f2 = executor.submit(cifp_to_fgb.build_pmtiles_fgb, "FAACIFP18")
-        concurrent.futures.wait([f1, f2])
-        f1.result()
-        f2.result()
+    force = "--force" in sys.argv[1:]
+    sharded = "--shard" in sys.argv[1:]
+    streaming = "--stream" in sys.argv[1:]
+    bbox = region.bbox_from_argv(sys.argv[1:])
+    if bbox:
+        print(f"Regional build: {bbox}")
+
+    streamed = streamed_archives(sharded) if streaming else []
+    if streaming:
+        print(f"Step 2: Converting and streaming {', '.join(streamed)} into tippecanoe...")
+        os.makedirs("output", exist_ok=True)
+        report["steps"].append({"name": "convert+tile", "stages": convert_streaming(bbox, streamed)})
+    else:
+        print("Step 2: Parsing and converting to FlatGeobuf concurrently...")
+        stages = run_stages(regional_stages(CONVERT_STAGES, bbox), in_pool(concurrent.futures.ProcessPoolExecutor), force=force)
+        report["steps"].append({"name": "convert", "stages": stages})
 
     print("Step 2.5: Merging Runways...")
-    merge_runways()
+    stages = run_stages(regional_stages(MERGE_STAGES, bbox), in_pool(concurrent.futures.ThreadPoolExecutor), force=force)
+    report["steps"].append({"name": "merge", "stages": stages})
 
-    print("Step 3: Compiling into PMTiles with tippecanoe concurrently...")
+    print("Step 3: Compiling into PMTiles with tippecanoe within the CPU/memory budget...")
     os.makedirs("output", exist_ok=True)
+    if sharded:
+        stages = run_stages(split_stages(), in_pool(concurrent.futures.ProcessPoolExecutor), force=force)
+        report["steps"].append({"name": "split", "stages": stages})
+    remaining = [archive for archive in TIPPECANOE_JOBS if archive not in streamed]
+    stages = run_stages(tippecanoe_stages(bbox, sharded, remaining), run_scheduled, force=force)
+    report["steps"].append({"name": "tile", "stages": stages})
+    if sharded:
+        stages = run_stages(join_stages(), in_pool(concurrent.futures.ProcessPoolExecutor), force=force)
+        report["steps"].append({"name": "join", "stages": stages})
 
-    cmd_airspaces = (
-        "uv run tippecanoe -Z0 -z8 -o output/airspaces.pmtiles "
-        "--no-feature-limit --no-tile-size-limit --buffer=25 --no-clipping -f "
-        "-l airspaces data/airspaces.fgb"
-    )
-    cmd_enroute = (
-        "uv run tippecanoe -Z0 -z8 -o output/enroute.pmtiles "
-        "--no-feature-limit --no-tile-size-limit -f "
-        "-L airways:data/airways.fgb "
-        "-L airspaces:data/airspaces_e.fgb"
-    )
-    cmd_boundary = (
-        "uv run tippecanoe -Z0 -z8 -o output/boundary.pmtiles "
-        "--no-feature-limit --no-tile-size-limit -f "
-        "-l boundary_airspace data/boundary_airspace.fgb"
-    )
-    cmd_airports_navaids = (
-        "uv run tippecanoe -Z0 -z10 -o output/airports_navaids.pmtiles --no-feature-limit --no-tile-size-limit -f "
-        "--order-by=rank --order-smallest-first "
-        "-L airports:data/airports.geojson "
-        "-L navaids:data/navaids.fgb "
-        "-L localizers:data/localizers.fgb "
-    )
-    cmd_waypoints_obstacles = (
-        "uv run tippecanoe -Z0 -z10 -o output/waypoints_obstacles.pmtiles --drop-fraction-as-needed -f "
-        "--order-by=rank --order-smallest-first "
-        "-L waypoints:data/waypoints.fgb "
-        "-L holding_patterns:data/holding_patterns.fgb "
-        "-L obstacles:data/obstacles.fgb"
-    )
-    cmd_airport_diagrams = (
-        "uv run tippecanoe -Z9 -z14 -o output/airport_diagrams.pmtiles "
-        "--no-feature-limit --no-tile-size-limit -f "
-        "-L runways:data/runways.fgb "
-        "-L am_taxiways:data/am_taxiways.fgb "
-        "-L runway_labels:data/runway_labels.fgb"
-    )
+    print("Step 4: Checking tile sizes and feature counts against their budgets...")
+    with instrument.stage("tile_budget") as record:
+        failures = tile_budget.check()["failures"]
+    report["steps"].append({"name": "budget", "stages": [record], "failures": failures})
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [
-            executor.submit(run_cmd, cmd_airspaces),
-            executor.submit(run_cmd, cmd_enroute),
-            executor.submit(run_cmd, cmd_boundary),
-            executor.submit(run_cmd, cmd_airports_navaids),
-            executor.submit(run_cmd, cmd_waypoints_obstacles),
-            executor.submit(run_cmd, cmd_airport_diagrams),
-        ]
-        concurrent.futures.wait(futures)
-        for f in futures:
-            f.result()
-
-    print("Pipeline complete!")
+    report["wall_s"] = round(time.perf_counter() - wall, 3)
+    print(f"Pipeline complete! Run report: {write_report(report)}")
+    if failures:
+        print("Error: tiles are over budget; not publishing to client/public/.")
+        sys.exit(1)
 
     print("Symlinking output to client/public/...")
     run_cmd(
@@ -0,0 +1,150 @@
+"""
+Content-hash dependency tracking for the PMTiles build.
+
+Every stage declares the files it reads, the files it writes, the modules whose source it
+runs and any config (e.g. a tippecanoe command line). Its key is the SHA-256 over all of
+those; a stage runs only when its key differs from the one recorded in the manifest after
+its last successful run, or when one of its outputs is missing. Because downstream stages
+hash the *content* of upstream outputs, a converter that reruns but writes identical files
+does not force the archives built from them to rebuild.
+
+File digests are memoized in the manifest by (size, mtime), so unchanged multi-hundred-MB
+inputs are not re-read on every build.
+"""
+
+import concurrent.futures
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+
+import pyogrio
+
+from src.cifp.cache import file_hash
+from src.common import instrument
+
+MANIFEST_PATH = "data/build_manifest.json"
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}, "history": {}}
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH) -> None:
+    """Write the manifest atomically so an interrupted build cannot corrupt it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def expand_paths(patterns: list[str]) -> list[str]:
+    """Expand glob patterns (recursive `**` allowed) to a sorted list of existing files."""
+    paths = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+        else:
+            paths.add(pattern)
+    return sorted(paths)
+
+
+def content_hash(path: str, manifest: dict) -> str | None:
+    """SHA-256 of a file (None if missing), reusing the manifest's digest while size and mtime match."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    memo = manifest["files"].get(path)
+    if memo and memo["size"] == st.st_size and memo["mtime_ns"] == st.st_mtime_ns:
+        return memo["sha256"]
+    digest = file_hash(path)
+    manifest["files"][path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+    return digest
+
+
+def module_hash(module: str) -> str:
+    """SHA-256 of a module's source file."""
+    return file_hash(importlib.util.find_spec(module).origin)
+
+
+def stage_key(stage: dict, manifest: dict) -> str:
+    """Hash of everything that determines a stage's outputs."""
+    state = {
+        "inputs": {p: content_hash(p, manifest) for p in expand_paths(stage.get("inputs", []))},
+        "code": {m: module_hash(m) for m in stage.get("code", [])},
+        "config": stage.get("config"),
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+
+def is_stale(stage: dict, key: str, manifest: dict) -> bool:
+    if manifest["stages"].get(stage["name"]) != key:
+        return True
+    return not all(os.path.exists(p) for p in stage["outputs"])
+
+
+def in_pool(executor_cls):
+    """Runner that executes each stage's `run` callable as an instrumented stage on a pool."""
+    def runner(stages: list[dict], history: dict):
+        with executor_cls() as executor:
+            futures = {executor.submit(instrument.run_stage, s["name"], s["run"]): s["name"] for s in stages}
+            for future in concurrent.futures.as_completed(futures):
+                yield futures[future], future.result()
+    return runner
+
+
+def describe_outputs(paths: list[str]) -> dict:
+    """Size, and feature count where the format's header has one, of each existing output."""
+    outputs = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        outputs[path] = {"bytes": os.path.getsize(path)}
+        if path.endswith(".fgb"):
+            outputs[path]["features"] = pyogrio.read_info(path)["features"]
+    return outputs
+
+
+def run_stages(stages: list[dict], runner, force: bool = False, manifest_path: str = MANIFEST_PATH) -> list[dict]:
+    """
+    Run the stale stages of one build step, record their keys and return their reports.
+
+    `runner(stale_stages, history)` executes the stages, yielding (name, record) as each one
+    finishes (see `src.common.instrument`); its headline numbers are kept in the manifest as
+    that stage's history for later runs.
+    Stages within a step must not depend on each other; steps run in dependency order, so
+    each step's keys are computed against the outputs of the steps before it.
+    """
+    manifest = load_manifest(manifest_path)
+    history = manifest.setdefault("history", {})
+    keys = {s["name"]: stage_key(s, manifest) for s in stages}
+    stale = [s for s in stages if force or is_stale(s, keys[s["name"]], manifest)]
+    outputs = {s["name"]: s["outputs"] for s in stages}
+    reports = []
+    for s in stages:
+        if s not in stale:
+            print(f"  {s['name']}: up to date")
+            reports.append({"name": s["name"], "status": "up to date"})
+
+    try:
+        if stale:
+            for name, record in runner(stale, history):
+                manifest["stages"][name] = keys[name]
+                history[name] = {k: record[k] for k in ("wall_s", "cpu_s", "peak_rss_mb")}
+                record["outputs"] = describe_outputs(outputs[name])
+                record["output_bytes"] = sum(o["bytes"] for o in record["outputs"].values())
+                reports.append({"status": "rebuilt", **record})
+                print(f"  {name}: rebuilt in {record['wall_s']:.1f}s")
+    finally:
+        # Keep the keys of the stages that did finish, even if another one failed
+        for s in stages:
+            for path in s["outputs"]:
+                content_hash(path, manifest)
+        save_manifest(manifest, manifest_path)
+    return reports
@@ -0,0 +1,198 @@
+"""
+CPU- and memory-budgeted scheduling of concurrent tippecanoe jobs.
+
+tippecanoe sizes its thread pool from the machine's core count, so starting every archive
+at once oversubscribes the CPUs and their temp files and working sets compete for RAM. This
+scheduler instead starts jobs longest-first (by last run's wall time, or by input size on
+a first build), gives each one an explicit thread count proportional to its expected cost
+via `TIPPECANOE_MAX_THREADS`, and its own temporary directory via `-t`. A job starts only
+while the sum of granted threads and expected peak memory stays inside the budget; smaller
+jobs backfill whatever the long ones leave free.
+
+The budget defaults to every core and three quarters of physical memory and can be set
+with the PMTILES_CPUS and PMTILES_MEMORY_MB environment variables. Peak RSS of each job's
+process tree is measured and fed back as the next build's memory estimate.
+
+Each job runs in its own session under a small Python launcher, so stopping a job signals
+its whole process group (shell, `uv` and tippecanoe alike). The launcher also measures the
+peak RSS: `wait4` on a process forked from this one reports at least this process's own
+RSS, because exec records the high-water mark of the memory the child inherited.
+
+Jobs reading streamed inputs (see `src.common.stream`) instead all start at once through
+`run_concurrently`, since the converters feeding them block until they are read.
+"""
+
+import concurrent.futures
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+# First-build estimates, before there is any history for a job
+ASSUMED_MB_PER_SECOND = 20
+ASSUMED_BASE_MEMORY_MB = 256
+ASSUMED_MEMORY_PER_INPUT_MB = 2
+
+# Runs a job's shell command, then writes the peak RSS (KB) of the processes it waited for
+_LAUNCHER = """
+import resource, subprocess, sys
+code = subprocess.call(sys.argv[1], shell=True)
+with open(sys.argv[2], "w") as f:
+    f.write(str(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss))
+sys.exit(code if code >= 0 else 128 - code)
+"""
+PEAK_RSS_FILE = "peak_rss_kb"
+
+
+def cpu_budget() -> int:
+    return int(os.environ.get("PMTILES_CPUS") or os.cpu_count() or 1)
+
+
+def memory_budget_mb() -> int:
+    if os.environ.get("PMTILES_MEMORY_MB"):
+        return int(os.environ["PMTILES_MEMORY_MB"])
+    return int(os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2**20 * 0.75)
+
+
+def _input_mb(stage: dict) -> float:
+    return sum(os.path.getsize(p) for p in stage["inputs"] if os.path.exists(p)) / 2**20
+
+
+def estimate(stage: dict, history: dict) -> tuple[float, float]:
+    """Return (expected seconds, expected peak MB) for a job from history or input size."""
+    past = history.get(stage["name"], {})
+    size = _input_mb(stage)
+    seconds = past.get("wall_s") or size / ASSUMED_MB_PER_SECOND
+    memory = past.get("peak_rss_mb") or ASSUMED_BASE_MEMORY_MB + ASSUMED_MEMORY_PER_INPUT_MB * size
+    return seconds, memory
+
+
+def run_scheduled(stages: list[dict], history: dict, cpus: int | None = None, memory_mb: int | None = None):
+    """
+    Runner for `run_stages`: execute each stage's `cmd` shell command within the budget.
+
+    Yields (name, record) as jobs finish, with records shaped like `src.common.instrument`'s. If a job fails the others are terminated and
+    `subprocess.CalledProcessError` is raised.
+    """
+    cpus = cpus or cpu_budget()
+    memory_mb = memory_mb or memory_budget_mb()
+    tmp_root = os.environ.get("PMTILES_TMPDIR") or tempfile.gettempdir()
+
+    estimates = {s["name"]: estimate(s, history) for s in stages}
+    total = sum(seconds for seconds, _ in estimates.values()) or 1
+    pending = sorted(stages, key=lambda s: -estimates[s["name"]][0])
+    print(f"  Scheduling {len(pending)} tippecanoe jobs on {cpus} CPUs / {memory_mb} MB")
+
+    running: dict[int, dict] = {}
+    used_cpus, used_mb = 0, 0.0
+    try:
+        while pending or running:
+            for stage in list(pending):
+                seconds, memory = estimates[stage["name"]]
+                threads = min(cpus, max(1, round(cpus * seconds / total)))
+                if running and (used_cpus + threads > cpus or used_mb + memory > memory_mb):
+                    continue
+                job = _start(stage, threads, tmp_root, f", ~{memory:.0f} MB")
+                job["memory"] = memory
+                running[job["proc"].pid] = job
+                pending.remove(stage)
+                used_cpus += threads
+                used_mb += memory
+
+            pid, status, usage = os.wait4(-1, 0)
+            job = running.pop(pid, None)
+            if job is None:
+                continue
+            _finish(job, status)
+            used_cpus -= job["threads"]
+            used_mb -= job["memory"]
+            if job["proc"].returncode:
+                raise subprocess.CalledProcessError(job["proc"].returncode, job["cmd"])
+
+            yield job["stage"]["name"], _record(job, usage)
+    finally:
+        for job in running.values():
+            _stop(job)
+            job["proc"].wait()
+            shutil.rmtree(job["tmp_dir"], ignore_errors=True)
+
+
+def _start(stage: dict, threads: int, tmp_root: str, detail: str = "") -> dict:
+    tmp_dir = tempfile.mkdtemp(prefix=f"tippecanoe-{stage['name']}-", dir=tmp_root)
+    cmd = f"{stage['cmd']} -t {tmp_dir}"
+    print(f"Running ({threads} threads{detail}): {cmd}")
+    env = dict(os.environ, TIPPECANOE_MAX_THREADS=str(threads))
+    launcher = [sys.executable, "-c", _LAUNCHER, cmd, os.path.join(tmp_dir, PEAK_RSS_FILE)]
+    return {
+        "stage": stage, "cmd": cmd, "proc": subprocess.Popen(launcher, env=env, start_new_session=True),
+        "threads": threads, "tmp_dir": tmp_dir, "start": time.perf_counter(), "started_at": round(time.time(), 3),
+    }
+
+
+def _stop(job: dict) -> None:
+    """Terminate a job's whole process group, not just its launcher."""
+    try:
+        os.killpg(job["proc"].pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+def _finish(job: dict, status: int) -> None:
+    """Record a reaped job's exit code and peak RSS, and remove its temporary directory."""
+    job["proc"].returncode = os.waitstatus_to_exitcode(status)
+    try:
+        with open(os.path.join(job["tmp_dir"], PEAK_RSS_FILE)) as f:
+            job["peak_rss_kb"] = int(f.read())
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(job["tmp_dir"], ignore_errors=True)
+
+
+def _record(job: dict, usage) -> dict:
+    # Without the launcher's figure (it was killed), ru_maxrss also counts this process's
+    # RSS, which errs high: the safe direction for a memory estimate
+    return {
+        "name": job["stage"]["name"],
+        "started_at": job["started_at"],
+        "threads": job["threads"],
+        "wall_s": round(time.perf_counter() - job["start"], 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(job.get("peak_rss_kb", usage.ru_maxrss) / 1024, 1),
+    }
+
+
+def run_concurrently(stages: list[dict], history: dict, cpus: int | None = None):
+    """
+    Runner that starts every job immediately, each with up to `cpus` threads.
+
+    The jobs start when this is called rather than at the first result, so the caller can
+    fork worker processes once it returns: a fork while `subprocess.Popen` starts a job
+    would hand the workers Popen's exec status pipe and leave it waiting for them. Returns
+    an iterator of (name, record) as jobs finish, like `run_scheduled`. Jobs are reaped by
+    pid rather than with `wait4(-1)`, since converter worker processes run alongside them.
+    """
+    cpus = cpus or cpu_budget()
+    tmp_root = os.environ.get("PMTILES_TMPDIR") or tempfile.gettempdir()
+    return _reap_all([_start(stage, cpus, tmp_root) for stage in stages])
+
+
+def _reap_all(jobs: list[dict]):
+    def reap(job):
+        _, status, usage = os.wait4(job["proc"].pid, 0)
+        _finish(job, status)
+        return job, usage
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(jobs) or 1) as pool:
+        try:
+            for future in concurrent.futures.as_completed([pool.submit(reap, job) for job in jobs]):
+                job, usage = future.result()
+                if job["proc"].returncode:
+                    raise subprocess.CalledProcessError(job["proc"].returncode, job["cmd"])
+                yield job["stage"]["name"], _record(job, usage)
+        finally:
+            for job in jobs:
+                if job["proc"].returncode is None:
+                    _stop(job)
@@ -0,0 +1,316 @@
+"""
+Spatial sharding of tippecanoe inputs for parallel tiling.
+
+A sharded archive is tiled in pieces that `join_parts` reassembles:
+
+  * one "low" job over the whole input for the zooms below `shard_zoom`, and
+  * one job per cell of a coarse tile grid (`grid_zoom`) for `shard_zoom` and up, fed only
+    the features that touch the cell.
+
+Tiles at `shard_zoom` and above lie inside exactly one grid cell, and tippecanoe builds
+each tile from just the features within its buffer, so each cell's input is the set of
+features intersecting the cell grown by one tile buffer at `shard_zoom`; features that
+straddle a cell edge are written to every cell they touch. Those copies also make a cell
+job emit partial tiles just outside its cell, so the join takes each tile only from the
+part that owns it. Below its base zoom tippecanoe thins points by their position in the
+*whole* input, so `shard_zoom` must not be lower than the archive's base zoom.
+
+tippecanoe quantizes its input to maxzoom + full detail bits, so the low job (whose maxzoom
+is `shard_zoom - 1`) raises its full detail by as much as its maxzoom is lowered
+(`with_zooms`) and keeps the full run's low detail. Its zooms below its maxzoom then match a
+single run tile for tile, as do the cells' zooms. The output is still not identical:
+tippecanoe writes a job's own maxzoom at full detail, so `shard_zoom - 1` comes out at twice
+the resolution (extent 8192 instead of 4096). Measured with `src.tools.compare_tiles` on a
+scale 0.5 synthetic build, that is every z9 tile of waypoints_obstacles (3723 of 19459) and
+every z13 tile of airport_diagrams (5357 of 25535), about 1% more bytes at those zooms, with
+the same features, properties and order except for one z13 tile that keeps one more runway
+and two z13 tiles only the sharded build has. Matching that zoom too would take a low job
+running up to the archive's maxzoom, which costs as much as the single run.
+"""
+
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+
+import numpy as np
+import pyarrow as pa
+import pyogrio
+import shapely
+
+from src.tools.pmtiles_reader import HEADER, PMTilesReader, tileid_to_zxy
+
+# tippecanoe's default tile buffer, in 1/256ths of a tile
+DEFAULT_BUFFER = 5
+# and its default -d/-D tile detail (extent 2^12)
+DEFAULT_DETAIL = 12
+
+MAX_LATITUDE = 85.0511287798066
+
+
+def _tile_x(lon, z: int) -> np.ndarray:
+    return (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * 2**z
+
+
+def _tile_y(lat, z: int) -> np.ndarray:
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE))
+    return (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * 2**z
+
+
+def cell_ranges(bounds: np.ndarray, grid_zoom: int, margin: float) -> tuple[np.ndarray, ...]:
+    """
+    Inclusive grid-cell ranges (x0, x1, y0, y1) touched by each feature's bounds.
+
+    `bounds` is an (n, 4) array of min_lon, min_lat, max_lon, max_lat; `margin` grows each
+    feature by that many grid cells (the tile buffer, expressed at grid zoom).
+    """
+    n = 2**grid_zoom
+    x0 = np.floor(_tile_x(bounds[:, 0], grid_zoom) - margin)
+    x1 = np.floor(_tile_x(bounds[:, 2], grid_zoom) + margin)
+    # Tile y grows southwards, so the northern edge gives the smaller y
+    y0 = np.floor(_tile_y(bounds[:, 3], grid_zoom) - margin)
+    y1 = np.floor(_tile_y(bounds[:, 1], grid_zoom) + margin)
+    return tuple(np.clip(a, 0, n - 1).astype(np.int64) for a in (x0, x1, y0, y1))
+
+
+def buffer_of(options: str) -> int:
+    """The --buffer / -b setting of a tippecanoe command line."""
+    match = re.search(r"(?:--buffer[= ]|-b ?)(\d+)", options)
+    return int(match.group(1)) if match else DEFAULT_BUFFER
+
+
+def zoom_range(options: str) -> tuple[int, int]:
+    """The -Z/-z (minzoom, maxzoom) of a tippecanoe command line."""
+    return int(re.search(r"-Z ?(\d+)", options).group(1)), int(re.search(r"-z ?(\d+)", options).group(1))
+
+
+def detail_of(options: str) -> tuple[int, int]:
+    """The -d/--full-detail and -D/--low-detail of a tippecanoe command line."""
+    full = re.search(r"(?:--full-detail[= ]|(?<![\w-])-d ?)(\d+)", options)
+    low = re.search(r"(?:--low-detail[= ]|(?<![\w-])-D ?)(\d+)", options)
+    return int(full.group(1)) if full else DEFAULT_DETAIL, int(low.group(1)) if low else DEFAULT_DETAIL
+
+
+def with_zooms(options: str, minzoom: int, maxzoom: int) -> str:
+    """
+    Options restricted to minzoom..maxzoom, tiling them as the full run (`options`) would.
+
+    tippecanoe takes its base zoom (below which points are thinned) from the maxzoom of the
+    invocation and quantizes its input to maxzoom + full detail bits, so a lower maxzoom
+    pins the full run's base zoom and raises the full detail by as much. The other zooms
+    keep the full run's low detail.
+    """
+    _, full_maxzoom = zoom_range(options)
+    full_detail, low_detail = detail_of(options)
+    options = re.sub(r"-Z ?\d+", f"-Z{minzoom}", options)
+    options = re.sub(r"-z ?\d+", f"-z{maxzoom}", options)
+    if maxzoom < full_maxzoom:
+        if not re.search(r"(?:-B ?|--base-zoom[= ])\S+", options):
+            options += f" -B{full_maxzoom}"
+        options = re.sub(r" *(?:--full-detail[= ]|--low-detail[= ]|(?<![\w-])-[dD] ?)\d+", "", options)
+        options += f" -d{full_detail + full_maxzoom - maxzoom} -D{low_detail}"
+    return options
+
+
+def split_archive(layers: dict[str, str], out_dir: str, grid_zoom: int, shard_zoom: int, buffer: int) -> dict:
+    """
+    Write each layer's features into per-cell FlatGeobufs under out_dir and return
+    {"cells": {"z-x-y": {layer: path}}}, also saved as out_dir/shards.json.
+
+    Features keep their input order within every cell, which tippecanoe's ordering and
+    ranking rely on.
+    """
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    # One pixel of slack: tippecanoe tests the buffer on its quantized coordinates
+    margin = (buffer + 1) / 256 / 2 ** (shard_zoom - grid_zoom)
+
+    cells: dict[str, dict[str, str]] = {}
+    for layer, path in layers.items():
+        if not os.path.exists(path):
+            continue
+        # Arrow round-trips every column type (and null) exactly, unlike a pandas read
+        meta, table = pyogrio.read_arrow(path)
+        geometry_name = meta["geometry_name"] or "wkb_geometry"
+        geoms = shapely.from_wkb(table[geometry_name].to_numpy(zero_copy_only=False))
+        present = ~shapely.is_missing(geoms) & ~shapely.is_empty(geoms)
+        if not present.any():
+            continue
+        x0, x1, y0, y1 = cell_ranges(shapely.bounds(geoms), grid_zoom, margin)
+
+        written = 0
+        # Points and small features touch one cell; only visit occupied columns and rows
+        for x in range(int(x0[present].min()), int(x1[present].max()) + 1):
+            in_column = present & (x0 <= x) & (x1 >= x)
+            if not in_column.any():
+                continue
+            for y in range(int(y0[in_column].min()), int(y1[in_column].max()) + 1):
+                mask = in_column & (y0 <= y) & (y1 >= y)
+                if not mask.any():
+                    continue
+                cell = f"{grid_zoom}-{x}-{y}"
+                os.makedirs(os.path.join(out_dir, cell), exist_ok=True)
+                cell_path = os.path.join(out_dir, cell, f"{layer}.fgb")
+                pyogrio.write_arrow(
+                    table.filter(pa.array(mask)),
+                    cell_path,
+                    driver="FlatGeobuf",
+                    geometry_name=geometry_name,
+                    geometry_type=meta["geometry_type"],
+                    crs=meta["crs"],
+                    layer_options={"SPATIAL_INDEX": "NO"},
+                )
+                cells.setdefault(cell, {})[layer] = cell_path
+                written += int(mask.sum())
+        print(f"  {layer}: {int(present.sum())} features -> {written} across shards (incl. edge copies)")
+
+    manifest = {"grid_zoom": grid_zoom, "shard_zoom": shard_zoom, "buffer": buffer, "cells": dict(sorted(cells.items()))}
+    with open(os.path.join(out_dir, "shards.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    print(f"  Split into {len(cells)} shards at z{grid_zoom}")
+    return manifest
+
+
+def load_cells(out_dir: str) -> dict[str, dict[str, str]]:
+    with open(os.path.join(out_dir, "shards.json")) as f:
+        return json.load(f)["cells"]
+
+
+# ---------------------------------------------------------------------------
+# Join
+# ---------------------------------------------------------------------------
+
+# PMTiles v3: the header and root directory must fit in the first 16 KiB
+ROOT_DIRECTORY_BYTES = 16384 - HEADER.size
+
+
+def _varints(values) -> bytes:
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _serialize_directory(entries: list[tuple[int, int, int, int]]) -> bytes:
+    ids, offsets = [], []
+    last_id = 0
+    for i, (tile_id, offset, length, _) in enumerate(entries):
+        ids.append(tile_id - last_id)
+        last_id = tile_id
+        # 0 means "right after the previous entry's data"
+        contiguous = i > 0 and offset == entries[i - 1][1] + entries[i - 1][2]
+        offsets.append(0 if contiguous else offset + 1)
+    values = [len(entries), *ids, *(e[3] for e in entries), *(e[2] for e in entries), *offsets]
+    return gzip.compress(_varints(values), mtime=0)
+
+
+def _directories(entries: list) -> tuple[bytes, bytes]:
+    """Serialize the entries as a root directory, splitting them into leaves if it is too big."""
+    root = _serialize_directory(entries)
+    leaves = bytearray()
+    leaf_size = 4096
+    while len(root) > ROOT_DIRECTORY_BYTES:
+        leaves, pointers = bytearray(), []
+        for i in range(0, len(entries), leaf_size):
+            leaf = _serialize_directory(entries[i:i + leaf_size])
+            pointers.append((entries[i][0], len(leaves), len(leaf), 0))
+            leaves += leaf
+        root = _serialize_directory(pointers)
+        leaf_size *= 2
+    return root, bytes(leaves)
+
+
+def _merge_metadata(base: dict, parts: list[dict], name: str) -> dict:
+    metadata = dict(base, name=name, description=name)
+    layers = {layer["id"]: dict(layer) for layer in metadata.get("vector_layers", [])}
+    for part in parts:
+        for layer in part.get("vector_layers", []):
+            merged = layers.setdefault(layer["id"], dict(layer))
+            merged["minzoom"] = min(merged["minzoom"], layer["minzoom"])
+            merged["maxzoom"] = max(merged["maxzoom"], layer["maxzoom"])
+            merged["fields"] = {**layer.get("fields", {}), **merged.get("fields", {})}
+    metadata["vector_layers"] = list(layers.values())
+    metadata.pop("tippecanoe_decisions", None)
+    return metadata
+
+
+def join_parts(out_dir: str, output: str) -> None:
+    """
+    Write `output` from the low part (zooms below shard_zoom) and, for each grid cell, the
+    tiles of its part that lie inside that cell.
+
+    Tiles are copied still compressed; identical tiles are stored once and consecutive ones
+    run-length encoded, as tippecanoe does. The header bounds, center and metadata come from
+    the low part, which saw the whole input.
+    """
+    with open(os.path.join(out_dir, "shards.json")) as f:
+        manifest = json.load(f)
+    grid_zoom = manifest["grid_zoom"]
+
+    readers = []
+    sources = []  # (tile_id, reader, offset, length)
+    low_path = os.path.join(out_dir, "low.pmtiles")
+    if os.path.exists(low_path):
+        readers.append(PMTilesReader(low_path))
+        for tile_id, offset, length, run in readers[-1].entries():
+            sources.extend((tile_id + k, readers[-1], offset, length) for k in range(run))
+    for cell in manifest["cells"]:
+        _, cx, cy = (int(v) for v in cell.split("-"))
+        readers.append(PMTilesReader(os.path.join(out_dir, f"{cell}.pmtiles")))
+        for tile_id, offset, length, run in readers[-1].entries():
+            for k in range(run):
+                z, x, y = tileid_to_zxy(tile_id + k)
+                if z >= grid_zoom and (x >> (z - grid_zoom), y >> (z - grid_zoom)) == (cx, cy):
+                    sources.append((tile_id + k, readers[-1], offset, length))
+    sources.sort(key=lambda s: s[0])
+
+    entries, contents, layout = [], {}, []
+    data_length = 0
+    for tile_id, reader, offset, length in sources:
+        digest = hashlib.sha1(reader.raw_tile(offset, length)).digest()
+        if digest not in contents:
+            contents[digest] = data_length
+            layout.append((reader, offset, length))
+            data_length += length
+        new_offset = contents[digest]
+        last = entries[-1] if entries else None
+        if last and last[0] + last[3] == tile_id and last[1] == new_offset:
+            entries[-1] = (last[0], last[1], last[2], last[3] + 1)
+        else:
+            entries.append((tile_id, new_offset, length, 1))
+
+    base = readers[0]
+    metadata = _merge_metadata(base.metadata(), [r.metadata() for r in readers[1:]], output)
+    metadata_bytes = gzip.compress(json.dumps(metadata).encode(), mtime=0)
+    root, leaves = _directories(entries)
+    zooms = [tileid_to_zxy(e[0])[0] for e in (entries[0], entries[-1])] if entries else [0, 0]
+
+    h = base.header
+    metadata_offset = HEADER.size + len(root)
+    leaf_offset = metadata_offset + len(metadata_bytes)
+    data_offset = leaf_offset + len(leaves)
+    header = HEADER.pack(
+        b"PMTiles", 3,
+        HEADER.size, len(root), metadata_offset, len(metadata_bytes),
+        leaf_offset, len(leaves), data_offset, data_length,
+        sum(e[3] for e in entries), len(entries), len(contents),
+        1, 2, h["tile_compression"], h["tile_type"], zooms[0], zooms[1],
+        h["min_lon_e7"], h["min_lat_e7"], h["max_lon_e7"], h["max_lat_e7"],
+        zooms[1], h["center_lon_e7"], h["center_lat_e7"],
+    )
+
+    tmp_path = f"{output}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header + root + metadata_bytes + leaves)
+        for reader, offset, length in layout:
+            f.write(reader.raw_tile(offset, length))
+    os.replace(tmp_path, output)
+    for reader in readers:
+        reader.close()
+    print(f"  Joined {len(readers)} parts into {output}: {len(entries)} tile entries, {len(contents)} distinct tiles")
@@ -3,12 +3,14 @@ Utilities for processing runway geometry.
 
 Provides functions to match opposite runway ends (e.g., 19R and 01L), calculate
 destination points based on bearing and distance, and generate rectangular polygons
-representing runway surfaces.
+representing runway surfaces. The `*_array` functions and `pair_runway_ends` process
+every threshold of a cycle at once.
 """
 
 import re
 import math
 import geojson
+import numpy as np
 
 def get_opposite_runway_id(rw_id):
     if not rw_id:
@@ -89,3 +91,85 @@ def create_runway_poly(p1, p2, width_ft):
         (p1[0] + off_x, p1[1] + off_y, p1[2])
     ]
     return geojson.Polygon([coords])
+
+# ---------------------------------------------------------------------------
+# Batch API
+# ---------------------------------------------------------------------------
+
+def pair_runway_ends(airport_ids, runway_ids):
+    """
+    Matches thresholds to their opposite ends with a hash join on (airport, opposite id).
+
+    Returns (leader, partner) index arrays, one entry per runway, ordered by airport
+    (first appearance) then input order. partner is -1 for ends without a match.
+    Each (airport, runway id) is consumed once, so duplicate ends are skipped.
+    """
+    opposite = {rw: get_opposite_runway_id(rw) for rw in set(runway_ids)}
+    first_index = {}
+    airport_rank = {}
+    for i, key in enumerate(zip(airport_ids, runway_ids)):
+        first_index.setdefault(key, i)
+        airport_rank.setdefault(key[0], len(airport_rank))
+
+    order = np.argsort(np.array([airport_rank[a] for a in airport_ids], dtype=np.int64), kind='stable')
+
+    processed = set()
+    leader, partner = [], []
+    for i in order.tolist():
+        key = (airport_ids[i], runway_ids[i])
+        if key in processed:
+            continue
+        opp = opposite[runway_ids[i]]
+        j = first_index.get((key[0], opp), -1) if opp else -1
+
+        processed.add(key)
+        if j >= 0:
+            processed.add((key[0], opp))
+        leader.append(i)
+        partner.append(j)
+
+    return np.array(leader, dtype=np.int64), np.array(partner, dtype=np.int64)
+
+def calculate_destination_array(p1, bearing, distance_ft):
+    """calculate_destination over (n, 3) points with per-point bearing and distance."""
+    R_ft = 3440.065 * 6076.12
+    lat_rad = np.radians(p1[:, 1])
+    lon_rad = np.radians(p1[:, 0])
+    bearing_rad = np.radians(bearing)
+
+    d_over_R = np.asarray(distance_ft, dtype=np.float64) / R_ft
+
+    lat2 = np.arcsin(np.sin(lat_rad) * np.cos(d_over_R) +
+                     np.cos(lat_rad) * np.sin(d_over_R) * np.cos(bearing_rad))
+    lon2 = lon_rad + np.arctan2(np.sin(bearing_rad) * np.sin(d_over_R) * np.cos(lat_rad),
+                                np.cos(d_over_R) - np.sin(lat_rad) * np.sin(lat2))
+
+    return np.column_stack([np.degrees(lon2), np.degrees(lat2), p1[:, 2]])
+
+def create_runway_poly_array(p1, p2, width_ft):
+    """
+    create_runway_poly over (n, 3) end pairs.
+
+    Returns (n, 5, 3) closed rings and a mask that is False for zero-length runways
+    (whose rings are NaN and must be dropped).
+    """
+    lat_avg = np.radians((p1[:, 1] + p2[:, 1]) / 2.0)
+    ft_to_deg_lat = 1.0 / 364173.0
+    ft_to_deg_lon = 1.0 / (364173.0 * np.cos(lat_avg))
+
+    dx = (p2[:, 0] - p1[:, 0]) / ft_to_deg_lon
+    dy = (p2[:, 1] - p1[:, 1]) / ft_to_deg_lat
+
+    length = np.sqrt(dx*dx + dy*dy)
+    valid = length != 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nx = -dy / length
+        ny = dx / length
+
+    hw = np.asarray(width_ft, dtype=np.float64) / 2.0
+    # Offset in degrees; elevation comes from the ends unchanged
+    off = np.column_stack([nx * hw * ft_to_deg_lon, ny * hw * ft_to_deg_lat, np.zeros(len(p1))])
+
+    rings = np.stack([p1 + off, p2 + off, p2 - off, p1 - off, p1 + off], axis=1)
+    return rings, valid
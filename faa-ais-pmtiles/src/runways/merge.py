@@ -9,6 +9,8 @@ import geopandas as gpd
 import pandas as pd
 import re
 import os
+import sys
+from src.common import region
 from src.common.utils import save_fgb
 
 from collections import defaultdict
@@ -34,7 +36,7 @@ def normalize_runway_id(rid):
     # Actually, let's keep it simple: sorting them should be enough for "01L/19R" vs "19R/01L"
     return tuple(sorted(p.strip() for p in parts if p.strip()))
 
-def merge_runways(cifp_path='data/cifp_runways.fgb', cifp_labels_path='data/cifp_runway_labels.fgb', am_path='data/am_runways.fgb', output_path='data/runways.fgb', output_labels_path='data/runway_labels.fgb'):
+def merge_runways(cifp_path='data/cifp_runways.fgb', cifp_labels_path='data/cifp_runway_labels.fgb', am_path='data/am_runways.fgb', output_path='data/runways.fgb', output_labels_path='data/runway_labels.fgb', bbox=None):
     print(f"Merging runways from {cifp_path} and {am_path}...", flush=True)
     
     cifp_exists = os.path.exists(cifp_path)
@@ -52,7 +54,7 @@ def merge_runways(cifp_path='data/cifp_runways.fgb', cifp_labels_path='data/cifp
 
     if am_exists:
         try:
-            am_gdf = gpd.read_file(am_path, engine="pyogrio")
+            am_gdf = gpd.read_file(am_path, engine="pyogrio", bbox=bbox)
             if not am_gdf.empty:
                 am_gdf['source'] = 'AM'
                 
@@ -94,7 +96,7 @@ def merge_runways(cifp_path='data/cifp_runways.fgb', cifp_labels_path='data/cifp
 
     if cifp_exists:
         try:
-            cifp_gdf = gpd.read_file(cifp_path, engine="pyogrio")
+            cifp_gdf = gpd.read_file(cifp_path, engine="pyogrio", bbox=bbox)
             if not cifp_gdf.empty:
                 cifp_gdf['source'] = 'CIFP'
                 
@@ -182,7 +184,7 @@ def merge_runways(cifp_path='data/cifp_runways.fgb', cifp_labels_path='data/cifp
     # Process Labels
     if labels_exists:
         try:
-            labels_gdf = gpd.read_file(cifp_labels_path, engine="pyogrio")
+            labels_gdf = gpd.read_file(cifp_labels_path, engine="pyogrio", bbox=bbox)
             if not labels_gdf.empty:
                 # We only want labels for runways that exist in the final merged set.
                 # Create a set of valid (airport_id, normalized_runway_id)
@@ -225,7 +227,7 @@ def merge_runways(cifp_path='data/cifp_runways.fgb', cifp_labels_path='data/cifp
             print(f"Error processing labels: {e}")
 
 def main():
-    merge_runways()
+    merge_runways(bbox=region.bbox_from_argv(sys.argv[1:]))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,194 @@
+"""
+Airway graph and route-string expansion.
+
+`AirwayGraph` holds every airway as its ordered fixes with the MEA and great-circle length of
+each segment, and for every fix the airways through it:
+
+    graph.neighbors[fix] -> [(airway, neighbor, sequence, mea, distance), ...]
+
+where sequence is the fix's position along the airway. Each airway also indexes the positions
+of its fixes, so the segment between two fixes of an airway is a slice found in constant time
+and its length a difference of cumulative distances.
+
+`expand` turns an ICAO-style route into the fixes it flies:
+
+    KSJC V334 SNS V25 KLAX -> KSJC <V334 fixes> SNS <V25 fixes> KLAX
+
+An airway is joined at the fix before it and left at the fix after it; when either is not on
+the airway (an airport, say), the airway fix nearest to it is used instead. An airway followed
+directly by another is left where the two cross. Speed/altitude groups and DCT are dropped
+and any other token (fixes, coordinates, procedures) is passed through.
+
+The search index stores the graph in `airways.json` (see `src.search.build_index`), and the
+client's route parser expands airways the same way.
+
+    python -m src.search.airways <FAACIFP18_file> "<route>" [--bbox min_lon,min_lat,max_lon,max_lat|<region>]
+"""
+
+import re
+import sys
+import timeit
+from collections import defaultdict
+
+import numpy as np
+
+from src.cifp.cache import load_cifp_tables
+from src.common import region
+from src.common.utils import haversine_array
+
+# Same patterns as the client's route parser
+AIRWAY_PATTERN = re.compile(r'^[VJQT]\d+$')
+SPEED_ALTITUDE_PATTERN = re.compile(r'^([NMK]\d{4})?([AFSM]\d{3,4})$')
+
+
+class AirwayGraph:
+    """Airways as ordered fixes with per-segment MEA (feet, flight levels included) and distance (NM), indexed by fix."""
+
+    def __init__(self, airways: dict[str, list[str]], mea: dict[str, list[int]], coords: dict[str, tuple[float, float]]):
+        self.airways = airways
+        self.mea = mea
+        self.coords = coords
+        self.distance: dict[str, list[float]] = {}
+        self.neighbors: dict[str, list[tuple]] = defaultdict(list)
+        self._positions: dict[str, dict[str, int]] = {}
+        self._cumulative: dict[str, np.ndarray] = {}
+        self._lonlat: dict[str, np.ndarray] = {}
+
+        for airway, fixes in airways.items():
+            lonlat = self._lonlat[airway] = np.array([coords[fix] for fix in fixes], dtype=np.float64)
+            lon, lat = lonlat[:, 0], lonlat[:, 1]
+            lengths = haversine_array(lon[:-1], lat[:-1], lon[1:], lat[1:])
+            self._cumulative[airway] = np.concatenate([[0.0], np.cumsum(lengths)])
+            distance = self.distance[airway] = np.round(lengths, 1).tolist()
+
+            positions = self._positions[airway] = {}
+            for seq, fix in enumerate(fixes):
+                # A fix an airway passes twice is joined at its first pass
+                positions.setdefault(fix, seq)
+            for seq, (a, b) in enumerate(zip(fixes, fixes[1:])):
+                self.neighbors[a].append((airway, b, seq, mea[airway][seq], distance[seq]))
+                self.neighbors[b].append((airway, a, seq + 1, mea[airway][seq], distance[seq]))
+
+    @classmethod
+    def from_airway_points(cls, airway_points: list[dict], coords: dict[str, tuple[float, float]]) -> "AirwayGraph":
+        """The graph of CIFP airway point records, keeping the fixes in coords (ident -> (lon, lat))."""
+        points = defaultdict(list)
+        for p in airway_points:
+            airway_id = p.get('airway_id')
+            point_id = (p.get('point_id') or '').strip()
+            if airway_id and point_id in coords:
+                # The reader gives flight levels as the bare FL number
+                mea = (p.get('min_alt_1') or 0) * (100 if p.get('min_alt_1_is_fl') else 1)
+                points[airway_id].append((p.get('seq_no') or 0, point_id, mea))
+
+        airways, mea = {}, {}
+        for airway_id, pts in points.items():
+            pts.sort(key=lambda pt: pt[0])
+            # A repeated point would make a zero-length segment
+            pts = [pt for n, pt in enumerate(pts) if n == 0 or pt[1] != pts[n - 1][1]]
+            if len(pts) > 1:
+                airways[airway_id] = [fix for _, fix, _ in pts]
+                # A segment's MEA is given on the record of the point it starts from
+                mea[airway_id] = [alt for _, _, alt in pts[:-1]]
+        return cls(airways, mea, coords)
+
+    def position(self, airway: str, fix: str) -> int:
+        """Where a route from or to `fix` meets the airway: the fix itself or the airway fix nearest to it."""
+        if airway not in self.airways:
+            raise ValueError(f"Unknown airway {airway}")
+        seq = self._positions[airway].get(fix)
+        if seq is None:
+            if fix not in self.coords:
+                raise ValueError(f"Unknown fix {fix} next to airway {airway}")
+            lon, lat = self.coords[fix]
+            lonlat = self._lonlat[airway]
+            seq = int(np.argmin(haversine_array(lon, lat, lonlat[:, 0], lonlat[:, 1])))
+        return seq
+
+    def junction(self, airway: str, seq: int, other: str) -> int:
+        """Position of the fix where `other` crosses the airway, nearest to position seq."""
+        if other not in self.airways:
+            raise ValueError(f"Unknown airway {other}")
+        crossings = [n for n, fix in enumerate(self.airways[airway]) if fix in self._positions[other]]
+        if not crossings:
+            raise ValueError(f"Airways {airway} and {other} do not cross")
+        return min(crossings, key=lambda n: abs(n - seq))
+
+    def _span(self, airway: str, start: str, end: str) -> tuple[int, int]:
+        i = self.position(airway, start)
+        if end in self.airways or AIRWAY_PATTERN.match(end):
+            return i, self.junction(airway, i, end)
+        return i, self.position(airway, end)
+
+    def segment(self, airway: str, start: str, end: str) -> list[str]:
+        """The airway's fixes from where `start` joins it to where `end` (a fix or the next airway) leaves it."""
+        i, j = self._span(airway, start, end)
+        fixes = self.airways[airway]
+        return fixes[i:j + 1] if i <= j else fixes[j:i + 1][::-1]
+
+    def segment_distance(self, airway: str, start: str, end: str) -> float:
+        """Length (NM) of `segment(airway, start, end)`."""
+        i, j = self._span(airway, start, end)
+        cumulative = self._cumulative[airway]
+        return float(abs(cumulative[j] - cumulative[i]))
+
+    def expand(self, route: str) -> list[str]:
+        """The fixes and other waypoints a route string flies, with its airways filled in."""
+        tokens = [t for t in route.upper().split() if t != 'DCT' and not SPEED_ALTITUDE_PATTERN.match(t)]
+        points = []
+        for n, token in enumerate(tokens):
+            if token not in self.airways and not AIRWAY_PATTERN.match(token):
+                points.append(token)
+                continue
+            if not points or n + 1 == len(tokens):
+                raise ValueError(f"Airway {token} needs a fix before and after it")
+            start, end = points[-1], tokens[n + 1]
+            fixes = self.segment(token, start, end)
+            if fixes[0] == start:
+                fixes = fixes[1:]
+            if fixes and fixes[-1] == end:
+                fixes = fixes[:-1]
+            points.extend(fixes)
+        return points
+
+    def to_index(self, table: dict[str, int]) -> dict:
+        """airways.json of the search index, with fixes as their fix table positions."""
+        return {
+            airway: {
+                'fixes': [table[fix] for fix in fixes],
+                'mea': self.mea[airway],
+                'distance': self.distance[airway],
+            }
+            for airway, fixes in self.airways.items()
+        }
+
+
+def main():
+    # Loaded here: the search index builds on this module
+    from src.search.build_index import collect_fixes
+
+    args = region.strip_bbox_args(sys.argv[1:])
+    if len(args) < 2:
+        print('Usage: python -m src.search.airways <FAACIFP18_file> "<route>" [--bbox min_lon,min_lat,max_lon,max_lat|<region>]')
+        sys.exit(1)
+
+    tables = region.clip_cifp_tables(load_cifp_tables(args[0]), region.bbox_from_argv(sys.argv[1:]))
+    cifp = {name: table.to_pylist() for name, table in tables.items()}
+    fixes = collect_fixes(cifp)
+    graph = AirwayGraph.from_airway_points(
+        cifp['airway_points'], {ident: (fix['lon'], fix['lat']) for ident, fix in fixes.items()}
+    )
+
+    try:
+        points = graph.expand(args[1])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    runs = 10_000
+    seconds = timeit.timeit(lambda: graph.expand(args[1]), number=runs) / runs
+    print(" ".join(points))
+    print(f"{len(points)} points in {seconds * 1e6:.1f} µs ({len(graph.airways)} airways)")
+
+
+if __name__ == "__main__":
+    main()
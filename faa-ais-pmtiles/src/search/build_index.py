@@ -1,49 +1,307 @@
 """
 Builds a searchable index of airports, navaids, and fixes from the CIFP dataset.
 
-Generates a JSON file mapping identifiers to their coordinates and metadata,
-optimized for client-side search.
+The index is a directory the client loads piece by piece instead of one large file:
+
+    manifest.json                 version, fix count, coordinate scale, fix types and the
+                                  fix shards ({ident prefix: fix count})
+    fixes/<prefix>.bin            the fixes whose ident starts with the prefix (binary, below)
+    procedures/<airport>.json     one airport's procedures
+    procedure_airports.json       procedure name -> airports that publish it
+    airways.json                  the airway graph (`src.search.airways`)
+    suggest/top.json              autocomplete results of the prefixes the suggestion shards
+                                  split on
+    suggest/<prefix>.json         autocomplete tables of the search keys under the prefix
+
+Only the manifest is fetched at startup; a route fetches the fix shards of its idents and,
+if it uses them, the airways and the procedures of the airports involved, then the fix
+shards those refer to.
+
+Fixes are sorted by ident and split by ident prefix until no shard holds more than
+MAX_SHARD_FIXES; an ident belongs to the shard of its longest listed prefix, and the client
+binary-searches the shard's sorted idents. Concatenated in prefix order the shards form the
+fix table, and a fix's position in it is how procedures and airways refer to it. A shard is
+little-endian:
+
+    uint32 count
+    int32  lon[count], lat[count]     degrees * COORD_SCALE
+    uint8  type[count]                index into FIX_TYPES
+    UTF-8  idents then names, each line-terminated, in ident order
+
+Procedure files list each distinct point once, so a fix's coordinates, type and name are
+stored only in its shard:
+
+    {"fixes": [fix table position, ...],
+     "points": {"ids": [...], "lon": [...], "lat": [...]},   points that are not fixes of
+                                                             the index (type 'waypoint'),
+                                                             coordinates * COORD_SCALE,
+                                                             each a delta from the last
+     "procedures": {name: {"body": [...], "transitions": {id: [...]}}}}
+
+where segments index the fixes followed by the points. Airways list their fixes' positions in
+the fix table and each segment's MEA (feet, FL180 as 18000) and length (NM, to 0.1):
+{airway: {"fixes": [...], "mea": [...], "distance": [...]}}.
+
+Autocomplete matches a typed prefix against search keys: every ident, the FAA identifier of
+K-prefixed airports (SFO for KSFO) and each word of a fix's name. Results are the
+SUGGEST_RESULTS best fixes with a matching key, best first by the decluttering rank the
+tiles use (`src.cifp.ranks`), then ident. The keys are split into shards like the fixes
+(at most MAX_SUGGEST_KEYS each), and every answer is precomputed or nearly so, so a lookup
+costs the same however many fixes there are:
+
+    top.json       {prefix: [[ident, name, type], ...]} for each prefix shorter than, or
+                   equal to, a split shard prefix
+    <prefix>.json  {"fixes": [[ident, name, type], ...],   best first
+                    "top":   {prefix: [fix, ...]},          prefixes matching more than
+                                                            SUGGEST_RESULTS fixes
+                    "keys":  {prefix: [[key, fix], ...]}}   the shortest prefixes matching
+                                                            at most SUGGEST_RESULTS fixes,
+                                                            with the keys under them, best
+                                                            fix first
+
+where a fix is an index into "fixes". A longer prefix is answered by filtering the "keys" of
+its longest listed prefix.
 """
 
 import sys
+import heapq
 import json
 import os
+import re
+import shutil
+import struct
 from collections import defaultdict
-from cifparse import CIFP
+
+import numpy as np
+
+from src.cifp import nasr, ranks
+from src.cifp.cache import load_cifp_tables
+from src.common import region
+from src.search.airways import AirwayGraph
 from src.common.utils import parse_altitude
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python -m src.build_search_index <FAACIFP18_file>")
-        sys.exit(1)
+DEFAULT_OUTPUT = "../client/public/search"
 
-    cifp_path = sys.argv[1]
-    output_dir = "../client/public"
-    output_path = os.path.join(output_dir, "search_index.json")
+INDEX_VERSION = 4
+MAX_SHARD_FIXES = 2048
+MAX_SUGGEST_KEYS = 4096
+SUGGEST_RESULTS = 10
+# Millionths of a degree, about 0.1 m
+COORD_SCALE = 1_000_000
+FIX_TYPES = ['airport', 'navaid', 'waypoint', 'compulsory']
 
-    if not os.path.exists(output_dir):
-        print(f"Output directory {output_dir} does not exist. Creating it.")
-        os.makedirs(output_dir, exist_ok=True)
 
-    print(f"Loading CIFP from {cifp_path}...", flush=True)
-    c = CIFP(cifp_path)
-
-    print("Parsing data...", flush=True)
-    c.parse_airports()
-    c.parse_vhf_navaids()
-    c.parse_ndb_navaids()
-    c.parse_enroute_waypoints()
-    c.parse_terminal_waypoints()
-    c.parse_procedures()
-    c.parse_airway_points()
-
-    fixes = {} # ident -> {lat, lon, type, name}
-    
-    print("Indexing fixes...", flush=True)
-    
+def partition_idents(idents, prefix='', limit=MAX_SHARD_FIXES):
+    """Split sorted idents into {prefix: idents}, lengthening prefixes until each shard fits."""
+    shards = {}
+    if prefix and len(idents) <= limit:
+        return {prefix: idents}
+    groups = defaultdict(list)
+    for ident in idents:
+        if len(ident) == len(prefix):
+            # Exactly the prefix of a split shard: it keeps a shard of its own
+            shards[prefix] = [ident]
+        else:
+            groups[ident[len(prefix)]].append(ident)
+    for char, group in groups.items():
+        shards.update(partition_idents(group, prefix + char, limit))
+    return shards
+
+
+def encode_fix_shard(idents, fixes):
+    """The binary shard of `idents` (sorted) described in the module docstring."""
+    coords = np.array([(fixes[i]['lon'], fixes[i]['lat']) for i in idents], dtype=np.float64).reshape(-1, 2)
+    quantized = np.round(coords * COORD_SCALE).astype('<i4')
+    types = np.array([FIX_TYPES.index(fixes[i]['type']) for i in idents], dtype=np.uint8)
+    strings = ''.join(f'{i}\n' for i in idents) + ''.join(f"{fixes[i].get('name') or ''}\n" for i in idents)
+    return (
+        struct.pack('<I', len(idents))
+        + quantized[:, 0].tobytes() + quantized[:, 1].tobytes()
+        + types.tobytes()
+        + strings.encode()
+    )
+
+
+def fix_table(shards):
+    """Ident -> position in the fix table: the shards concatenated in prefix order."""
+    return {ident: n for n, ident in enumerate(i for prefix in sorted(shards) for i in shards[prefix])}
+
+
+def _deltas(values):
+    return [b - a for a, b in zip([0] + values, values)]
+
+
+def compact_procedures(procs, table):
+    """An airport's procedures with each distinct point stored once (see module docstring)."""
+    fixes, points = {}, {}  # fix table position / (id, lon, lat) -> first use
+
+    def key(pt):
+        # A point named after a fix of the index has that fix's coordinates (see build_search_index)
+        if pt['id'] in table:
+            return fixes.setdefault(table[pt['id']], len(fixes)), None
+        lon, lat = (int(round(c * COORD_SCALE)) for c in pt['coords'])
+        return None, points.setdefault((pt['id'], lon, lat), len(points))
+
+    segments = {
+        name: {
+            'body': [key(pt) for pt in proc['body']],
+            'transitions': {t: [key(pt) for pt in pts] for t, pts in proc['transitions'].items()},
+        }
+        for name, proc in procs.items()
+    }
+
+    def ref(k):
+        fix, point = k
+        return fix if point is None else len(fixes) + point
+
+    return {
+        'fixes': list(fixes),
+        'points': {
+            'ids': [i for i, _, _ in points],
+            'lon': _deltas([lon for _, lon, _ in points]),
+            'lat': _deltas([lat for _, _, lat in points]),
+        },
+        'procedures': {
+            name: {
+                'body': [ref(k) for k in seg['body']],
+                'transitions': {t: [ref(k) for k in refs] for t, refs in seg['transitions'].items()},
+            }
+            for name, seg in segments.items()
+        },
+    }
+
+
+def suggestion_keys(fixes):
+    """Search key -> idents of the fixes it finds (see module docstring)."""
+    keys = defaultdict(set)
+    for ident, fix in fixes.items():
+        keys[ident].add(ident)
+        if fix['type'] == 'airport' and len(ident) == 4 and ident.startswith('K'):
+            keys[ident[1:]].add(ident)
+        for word in re.findall(r'[A-Z0-9]{2,}', (fix.get('name') or '').upper()):
+            keys[word].add(ident)
+    return keys
+
+
+def _suggestion_shard(prefix, shard_keys, keys, order, entry):
+    """The autocomplete tables of the keys under one shard prefix (see module docstring)."""
+    matches = defaultdict(set)
+    for key in shard_keys:
+        for n in range(len(prefix), len(key) + 1):
+            matches[key[:n]] |= keys[key]
+
+    top, frontier = {}, {}
+    for node, idents in matches.items():
+        if len(idents) > SUGGEST_RESULTS:
+            top[node] = heapq.nsmallest(SUGGEST_RESULTS, idents, key=order.__getitem__)
+        elif node == prefix or len(matches[node[:-1]]) > SUGGEST_RESULTS:
+            frontier[node] = []
+    for key in shard_keys:
+        node = next((key[:n] for n in range(len(prefix), len(key) + 1) if key[:n] in frontier), None)
+        if node is not None:
+            frontier[node].extend((key, ident) for ident in keys[key])
+
+    listed = {ident for idents in top.values() for ident in idents}
+    listed.update(ident for pairs in frontier.values() for _, ident in pairs)
+    table = sorted(listed, key=order.__getitem__)
+    index = {ident: i for i, ident in enumerate(table)}
+    return {
+        'fixes': [entry(ident) for ident in table],
+        'top': {node: [index[i] for i in idents] for node, idents in sorted(top.items())},
+        'keys': {
+            node: sorted(([key, index[ident]] for key, ident in pairs), key=lambda pair: (pair[1], pair[0]))
+            for node, pairs in sorted(frontier.items())
+        },
+    }
+
+
+def build_suggestions(fixes):
+    """The autocomplete tables: (top.json, {shard prefix: shard}); fixes need a 'rank'."""
+    ranked = sorted(fixes, key=lambda ident: (fixes[ident]['rank'], ident))
+    order = {ident: i for i, ident in enumerate(ranked)}
+    keys = suggestion_keys(fixes)
+    shards = partition_idents(sorted(keys), limit=MAX_SUGGEST_KEYS)
+
+    def entry(ident):
+        return [ident, fixes[ident].get('name') or '', FIX_TYPES.index(fixes[ident]['type'])]
+
+    # Prefixes the shards split on are answered from one table fetched up front
+    split = {prefix[:n] for prefix in shards for n in range(1, len(prefix))}
+    matches = defaultdict(set)
+    for key, idents in keys.items():
+        for n in range(1, len(key) + 1):
+            if key[:n] in split:
+                matches[key[:n]] |= idents
+    top = {
+        prefix: [entry(ident) for ident in heapq.nsmallest(SUGGEST_RESULTS, idents, key=order.__getitem__)]
+        for prefix, idents in sorted(matches.items())
+    }
+    return top, {
+        prefix: _suggestion_shard(prefix, shard_keys, keys, order, entry)
+        for prefix, shard_keys in shards.items()
+    }
+
+
+def write_index(output_dir, fixes, procedures, airways: AirwayGraph):
+    """Write the index directory, replacing any previous one in a single rename."""
+    tmp_dir = f"{output_dir.rstrip('/')}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, 'fixes'))
+    os.makedirs(os.path.join(tmp_dir, 'procedures'))
+    os.makedirs(os.path.join(tmp_dir, 'suggest'))
+
+    shards = partition_idents(sorted(fixes))
+    for prefix, idents in shards.items():
+        with open(os.path.join(tmp_dir, 'fixes', f'{prefix}.bin'), 'wb') as f:
+            f.write(encode_fix_shard(idents, fixes))
+    table = fix_table(shards)
+
+    procedure_airports = defaultdict(list)
+    for airport, procs in procedures.items():
+        with open(os.path.join(tmp_dir, 'procedures', f'{airport}.json'), 'w') as f:
+            json.dump(compact_procedures(procs, table), f, separators=(',', ':'))
+        for name in procs:
+            procedure_airports[name].append(airport)
+
+    with open(os.path.join(tmp_dir, 'procedure_airports.json'), 'w') as f:
+        json.dump(procedure_airports, f, separators=(',', ':'))
+    with open(os.path.join(tmp_dir, 'airways.json'), 'w') as f:
+        json.dump(airways.to_index(table), f, separators=(',', ':'))
+
+    top, suggest_shards = build_suggestions(fixes)
+    with open(os.path.join(tmp_dir, 'suggest', 'top.json'), 'w') as f:
+        json.dump(top, f, separators=(',', ':'))
+    for prefix, shard in suggest_shards.items():
+        with open(os.path.join(tmp_dir, 'suggest', f'{prefix}.json'), 'w') as f:
+            json.dump(shard, f, separators=(',', ':'))
+
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump({
+            'version': INDEX_VERSION,
+            'fix_count': len(fixes),
+            'coord_scale': COORD_SCALE,
+            'fix_types': FIX_TYPES,
+            'fix_shards': {prefix: len(idents) for prefix, idents in sorted(shards.items())},
+            'suggest_results': SUGGEST_RESULTS,
+            'suggest_shards': sorted(suggest_shards),
+        }, f, separators=(',', ':'))
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.rename(tmp_dir, output_dir)
+    return len(shards), len(suggest_shards)
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def collect_fixes(cifp):
+    """Airports, navaids and waypoints of the CIFP sections (as lists of records) by ident."""
+    fixes = {} # ident -> {lat, lon, type, name, rank}
+    airport_metadata = nasr.load_nasr_metadata()
+
     # Airports
-    for a in c.get_airports():
-        p = a.to_dict()['primary']
+    for p in cifp['airports']:
         ident = p.get('airport_id', '').strip()
         lat, lon = p.get('lat'), p.get('lon')
         if ident and lat is not None and lon is not None:
@@ -51,12 +309,14 @@ def main():
                 'lat': float(lat), 
                 'lon': float(lon), 
                 'type': 'airport',
-                'name': p.get('airport_name')
+                'name': p.get('airport_name'),
+                'rank': ranks.airport_rank(
+                    ident, p.get('usage'), int(p.get('longest') or 0), ranks.airport_metadata(airport_metadata, ident)
+                ),
             }
 
     # Navaids
-    for nav in c.get_vhf_navaids():
-        p = nav.to_dict()['primary']
+    for p in cifp['vhf_navaids']:
         ident = (p.get('vhf_id') or p.get('dme_id') or '').strip()
         lat = p.get('lat') or p.get('dme_lat')
         lon = p.get('lon') or p.get('dme_lon')
@@ -65,11 +325,11 @@ def main():
                 'lat': float(lat), 
                 'lon': float(lon), 
                 'type': 'navaid',
-                'name': p.get('vhf_name')
+                'name': p.get('vhf_name'),
+                'rank': ranks.navaid_rank(p.get('nav_class') or '     '),
             }
             
-    for nav in c.get_ndb_navaids():
-        p = nav.to_dict()['primary']
+    for p in cifp['ndb_navaids']:
         ident = (p.get('ndb_id') or '').strip()
         lat, lon = p.get('lat'), p.get('lon')
         if ident and lat is not None and lon is not None:
@@ -77,12 +337,12 @@ def main():
                 'lat': float(lat), 
                 'lon': float(lon), 
                 'type': 'navaid',
-                'name': p.get('ndb_name')
+                'name': p.get('ndb_name'),
+                'rank': ranks.NDB_RANK,
             }
 
     # Waypoints
-    for wp in c.get_enroute_waypoints() + c.get_terminal_waypoints():
-        p = wp.to_dict()['primary']
+    for p in cifp['enroute_waypoints'] + cifp['terminal_waypoints']:
         ident = (p.get('waypoint_id') or '').strip()
         lat, lon = p.get('lat'), p.get('lon')
         if ident and lat is not None and lon is not None:
@@ -96,17 +356,33 @@ def main():
             fixes[ident] = {
                 'lat': float(lat), 
                 'lon': float(lon), 
-                'type': wpt_type
+                'type': wpt_type,
+                'rank': ranks.waypoint_rank(ranks.waypoint_type(raw_type), (p.get('usage') or '').strip()),
             }
 
+    return fixes
+
+
+def build_search_index(cifp_path, output_dir=DEFAULT_OUTPUT, bbox=None):
+    parent = os.path.dirname(os.path.normpath(output_dir)) or "."
+    if not os.path.exists(parent):
+        print(f"Output directory {parent} does not exist. Creating it.")
+        os.makedirs(parent, exist_ok=True)
+
+    print(f"Loading CIFP from {cifp_path}...", flush=True)
+    # With a bbox, fixes around the region are kept for its procedures and airways
+    tables = region.clip_cifp_tables(load_cifp_tables(cifp_path), bbox)
+    cifp = {name: table.to_pylist() for name, table in tables.items()}
+
+    print("Indexing fixes...", flush=True)
+    fixes = collect_fixes(cifp)
+
     print("Indexing procedures...", flush=True)
     # Structure: procedures[airport_id][proc_name] = { transitions: { trans_id: [points] }, body: [points] }
     procedures = defaultdict(lambda: defaultdict(lambda: {'transitions': defaultdict(list), 'body': []}))
     
-    proc_list = c.get_procedures()
     grouped = defaultdict(list)
-    for proc in proc_list:
-        p = proc.to_dict()['primary']
+    for p in cifp['procedures']:
         # fac_id is airport, procedure_id is name (TECKY4), transition_id is transition (VLREE)
         key = (p.get('fac_id'), p.get('procedure_id'), p.get('transition_id'))
         grouped[key].append(p)
@@ -157,33 +433,25 @@ def main():
             final_procs[apt][pid] = data
 
     print("Indexing airways...", flush=True)
-    airway_data = defaultdict(list)
-    for ap in c.get_airway_points():
-        p = ap.to_dict()['primary']
-        airway_id = p.get('airway_id')
-        point_id = (p.get('point_id') or '').strip()
-        seq_no = p.get('seq_no') or 0
-        if airway_id and point_id:
-            airway_data[airway_id].append({
-                'id': point_id,
-                'seq': seq_no
-            })
-    
-    # Sort by sequence
-    final_airways = {}
-    for aid, pts in airway_data.items():
-        pts.sort(key=lambda x: x['seq'])
-        final_airways[aid] = [p['id'] for p in pts]
-
-    print(f"Writing index to {output_path}...", flush=True)
-    with open(output_path, 'w') as f:
-        json.dump({
-            "fixes": fixes,
-            "procedures": final_procs,
-            "airways": final_airways
-        }, f)
-    
-    print(f"Done. Index size: {os.path.getsize(output_path) / 1024 / 1024:.2f} MB")
+    airways = AirwayGraph.from_airway_points(
+        cifp['airway_points'], {ident: (fix['lon'], fix['lat']) for ident, fix in fixes.items()}
+    )
+
+    print(f"Writing index to {output_dir}...", flush=True)
+    shard_count, suggest_count = write_index(output_dir, fixes, final_procs, airways)
+
+    print(
+        f"Done. Index size: {_dir_size(output_dir) / 1024 / 1024:.2f} MB in {shard_count} fix shards, "
+        f"{suggest_count} suggestion shards and {len(final_procs)} airport procedure files; manifest {os.path.getsize(os.path.join(output_dir, 'manifest.json')) / 1024:.1f} KB"
+    )
+
+def main():
+    args = region.strip_bbox_args(sys.argv[1:])
+    if len(args) < 1:
+        print("Usage: python -m src.build_search_index <FAACIFP18_file> [--bbox min_lon,min_lat,max_lon,max_lat|<region>]")
+        sys.exit(1)
+
+    build_search_index(args[0], bbox=region.bbox_from_argv(sys.argv[1:]))
 
 if __name__ == "__main__":
     main()
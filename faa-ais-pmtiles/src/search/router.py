@@ -0,0 +1,280 @@
+"""
+Shortest routes over the airway network.
+
+`Router` finds the cheapest route between two fixes or airports with A* over the airway graph
+(`src.search.airways`), using the great-circle distance to the destination as the heuristic. A
+leg costs its length in NM, times AIRWAY_TYPE_PENALTY when its airway is not of a preferred type
+(e.g. prefer=("Q", "T") for RNAV routes). Per query, airways outside the requested structure
+(Low: V/T, High: J/Q, as in the airways tile layer) are left out, as are segments whose MEA is
+above the cruise altitude. An origin or destination that is not on an airway joins the network
+direct at up to JOIN_CANDIDATES airway fixes within JOIN_RADIUS_NM.
+
+    router.route("KSJC", "KLAX", altitude=9000, structure="Low")
+    -> ("KSJC SJC V334 SNS V25 LAX KLAX", [fixes flown], distance)
+
+The returned route string expands back to the same fixes with `AirwayGraph.expand`.
+
+The router is precomputed once per CIFP cycle: `load_router` pickles it under
+`data/airway_graph/`, keyed like the CIFP snapshot by the FAACIFP18 content hash, so one load
+serves thousands of queries a second. A pairs file (one "ORIGIN DESTINATION" per line) routes
+in bulk:
+
+    python -m src.search.router <FAACIFP18_file> <origin> <destination> [options]
+    python -m src.search.router <FAACIFP18_file> --pairs <file> [options]
+
+with options --altitude <feet>, --structure low|high, --prefer Q,T and
+--bbox min_lon,min_lat,max_lon,max_lat|<region>.
+"""
+
+import argparse
+import heapq
+import math
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from src.cifp.cache import file_hash, load_cifp_tables
+from src.common import region
+from src.common.utils import haversine_array
+from src.search.airways import AirwayGraph
+
+CACHE_DIR = "data/airway_graph"
+
+# Bump whenever the pickled Router changes to invalidate existing graphs
+ROUTER_VERSION = 2
+
+EARTH_RADIUS_NM = 3440.065  # as in haversine_array
+AIRWAY_TYPE_PENALTY = 1.25
+JOIN_CANDIDATES = 8
+JOIN_RADIUS_NM = 60.0
+STRUCTURES = ("Low", "High")
+
+
+def airway_structure(airway: str) -> str:
+    """High (J/Q) or Low (V/T) airway structure."""
+    return "High" if airway[:1] in ("J", "Q") else "Low"
+
+
+class Router:
+    """A* routing over an `AirwayGraph`, compiled to integer fix and airway ids."""
+
+    def __init__(self, graph: AirwayGraph):
+        self.coords = graph.coords
+        self.fixes = sorted(graph.neighbors)
+        self.airways = sorted(graph.airways)
+        self._fix_ids = {fix: n for n, fix in enumerate(self.fixes)}
+        airway_ids = {airway: n for n, airway in enumerate(self.airways)}
+
+        lonlat = np.array([self.coords[fix] for fix in self.fixes], dtype=np.float64).reshape(-1, 2)
+        self._lon, self._lat = lonlat[:, 0], lonlat[:, 1]
+        # Heuristic terms per fix: latitude and longitude in radians, cosine of latitude
+        self._rad = [(math.radians(lat), math.radians(lon), math.cos(math.radians(lat))) for lon, lat in lonlat]
+
+        # edges[fix id] -> [(neighbor id, airway id, NM, MEA feet), ...]; lengths are unrounded
+        # so that no leg is shorter than the heuristic's great circle
+        self._edges: list[list[tuple]] = [[] for _ in self.fixes]
+        for fix, links in graph.neighbors.items():
+            i = self._fix_ids[fix]
+            lon, lat = self.coords[fix]
+            for airway, neighbor, _, mea, _ in links:
+                nlon, nlat = self.coords[neighbor]
+                length = float(haversine_array(lon, lat, nlon, nlat))
+                self._edges[i].append((self._fix_ids[neighbor], airway_ids[airway], length, mea))
+
+        self._joins: dict[str, list[tuple[int, float]]] = {}
+        self._weights: dict[tuple, list[float | None]] = {}
+
+    def _distance(self, i: int, target: tuple[float, float, float]) -> float:
+        lat, lon, cos_lat = self._rad[i]
+        tlat, tlon, tcos_lat = target
+        a = math.sin((tlat - lat) / 2) ** 2 + cos_lat * tcos_lat * math.sin((tlon - lon) / 2) ** 2
+        return 2 * EARTH_RADIUS_NM * math.asin(min(1.0, math.sqrt(a)))
+
+    def join(self, ident: str) -> list[tuple[int, float]]:
+        """The airway fixes a route from or to `ident` starts or ends at, with the direct leg's length."""
+        joins = self._joins.get(ident)
+        if joins is None:
+            if ident in self._fix_ids:
+                joins = [(self._fix_ids[ident], 0.0)]
+            elif ident in self.coords:
+                lon, lat = self.coords[ident]
+                distance = haversine_array(lon, lat, self._lon, self._lat)
+                nearest = np.argsort(distance)[:JOIN_CANDIDATES]
+                joins = [(int(n), float(distance[n])) for n in nearest if distance[n] <= JOIN_RADIUS_NM]
+                if not joins:
+                    raise ValueError(f"No airway within {JOIN_RADIUS_NM:g} NM of {ident}")
+            else:
+                raise ValueError(f"Unknown fix {ident}")
+            self._joins[ident] = joins
+        return joins
+
+    def weights(self, structure: str | None = None, prefer: tuple[str, ...] = ()) -> list[float | None]:
+        """Cost per NM of each airway (None when excluded) for a structure and preferred airway types."""
+        key = (structure, tuple(prefer))
+        weights = self._weights.get(key)
+        if weights is None:
+            if structure is not None and structure.title() not in STRUCTURES:
+                raise ValueError(f"Unknown airway structure {structure}")
+            weights = [
+                None if structure is not None and airway_structure(airway) != structure.title()
+                else 1.0 if not prefer or airway[:1] in prefer
+                else AIRWAY_TYPE_PENALTY
+                for airway in self.airways
+            ]
+            self._weights[key] = weights
+        return weights
+
+    def route(self, origin: str, destination: str, altitude: int | None = None,
+              structure: str | None = None, prefer: tuple[str, ...] = ()) -> tuple[str, list[str], float]:
+        """The cheapest airway route: (route string, fixes flown, distance in NM)."""
+        starts = self.join(origin)
+        ends = dict(self.join(destination))
+        weights = self.weights(structure, prefer)
+        edges = self._edges
+        if destination in self._fix_ids:
+            target = self._rad[self._fix_ids[destination]]
+        else:
+            lon, lat = self.coords[destination]
+            target = (math.radians(lat), math.radians(lon), math.cos(math.radians(lat)))
+
+        # Heap entries are (cost + heuristic, cost, distance, fix id); -1 is the destination itself
+        cost = {}
+        previous: dict[int, tuple[int, int, float]] = {}
+        heap = []
+        for i, length in starts:
+            if length < cost.get(i, math.inf):
+                cost[i] = length
+                previous[i] = (-1, -1, length)
+                heapq.heappush(heap, (length + self._distance(i, target), length, length, i))
+
+        done = set()
+        while heap:
+            _, g, distance, i = heapq.heappop(heap)
+            if i == -1:
+                break
+            if i in done:
+                continue
+            done.add(i)
+            if i in ends:
+                total = g + ends[i]
+                if total < cost.get(-1, math.inf):
+                    cost[-1] = total
+                    previous[-1] = (i, -1, distance + ends[i])
+                    heapq.heappush(heap, (total, total, distance + ends[i], -1))
+            for j, airway, length, mea in edges[i]:
+                weight = weights[airway]
+                if weight is None or j in done or (altitude is not None and mea > altitude):
+                    continue
+                cj = g + length * weight
+                if cj < cost.get(j, math.inf):
+                    cost[j] = cj
+                    previous[j] = (i, airway, length)
+                    heapq.heappush(heap, (cj + self._distance(j, target), cj, distance + length, j))
+        else:
+            raise ValueError(f"No airway route from {origin} to {destination}")
+
+        # Walk back from the destination: legs are (airway or None for direct, fix reached)
+        legs = []
+        i = previous[-1][0]
+        while i != -1:
+            prev, airway, _ = previous[i]
+            legs.append((self.airways[airway] if airway >= 0 else None, self.fixes[i]))
+            i = prev
+        legs.reverse()
+        if legs[0][1] != origin:
+            legs.insert(0, (None, origin))
+        if legs[-1][1] != destination:
+            legs.append((None, destination))
+
+        tokens = [legs[0][1]]
+        for n, (airway, fix) in enumerate(legs[1:], 1):
+            if airway is None:
+                tokens.append(fix)
+            elif n + 1 == len(legs) or legs[n + 1][0] != airway:
+                tokens.extend((airway, fix))
+        return " ".join(tokens), [fix for _, fix in legs], distance
+
+
+def router_path(cifp_path: str, bbox: tuple | None = None, cache_dir: str = CACHE_DIR) -> str:
+    suffix = "" if bbox is None else "-" + "_".join(f"{v:g}" for v in bbox)
+    return os.path.join(cache_dir, f"{file_hash(cifp_path)}-v{ROUTER_VERSION}{suffix}.pickle")
+
+
+def load_router(cifp_path: str, bbox: tuple | None = None, cache_dir: str = CACHE_DIR) -> Router:
+    """The router of a CIFP cycle (optionally clipped to a bbox), building it only on a cache miss."""
+    path = router_path(cifp_path, bbox, cache_dir)
+    if os.path.exists(path):
+        print(f"Loading airway graph from {path}...", flush=True)
+        router = Router.__new__(Router)
+        with open(path, "rb") as f:
+            router.__dict__.update(pickle.load(f))
+        return router
+
+    # Loaded here: the search index builds on the airway graph
+    from src.search.build_index import collect_fixes
+
+    print(f"No airway graph for {cifp_path}; building...", flush=True)
+    tables = region.clip_cifp_tables(load_cifp_tables(cifp_path), bbox)
+    cifp = {name: table.to_pylist() for name, table in tables.items()}
+    fixes = collect_fixes(cifp)
+    graph = AirwayGraph.from_airway_points(
+        cifp['airway_points'], {ident: (fix['lon'], fix['lat']) for ident, fix in fixes.items()}
+    )
+    router = Router(graph)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        # Its state rather than the object, which would refer to __main__.Router under `python -m`
+        pickle.dump(router.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+    print(f"  Wrote airway graph to {path}", flush=True)
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shortest airway routes between fixes or airports.")
+    parser.add_argument("cifp", help="FAACIFP18 file")
+    parser.add_argument("endpoints", nargs="*", metavar="ident", help="origin and destination")
+    parser.add_argument("--pairs", help="file of 'ORIGIN DESTINATION' lines to route in bulk")
+    parser.add_argument("--altitude", type=int, help="cruise altitude (feet); segments with a higher MEA are avoided")
+    parser.add_argument("--structure", choices=["low", "high"], help="only Low (V/T) or High (J/Q) airways")
+    parser.add_argument("--prefer", default="", help=f"preferred airway types, e.g. Q,T (others cost x{AIRWAY_TYPE_PENALTY})")
+    parser.add_argument("--bbox", type=region.parse_bbox, help="min_lon,min_lat,max_lon,max_lat or a region name")
+    args = parser.parse_args()
+
+    if args.pairs:
+        with open(args.pairs) as f:
+            pairs = [line.upper().split()[:2] for line in f if len(line.split()) >= 2]
+    elif len(args.endpoints) == 2:
+        pairs = [[ident.upper() for ident in args.endpoints]]
+    else:
+        parser.error("give an origin and a destination, or --pairs")
+
+    router = load_router(args.cifp, args.bbox)
+    options = {
+        "altitude": args.altitude,
+        "structure": args.structure,
+        "prefer": tuple(t.strip().upper() for t in args.prefer.split(",") if t.strip()),
+    }
+
+    start = time.perf_counter()
+    failed = 0
+    for origin, destination in pairs:
+        try:
+            route, fixes, distance = router.route(origin, destination, **options)
+            print(f"{origin} {destination}: {route} ({len(fixes)} fixes, {distance:.1f} NM)")
+        except ValueError as e:
+            failed += 1
+            print(f"{origin} {destination}: Error: {e}")
+    seconds = time.perf_counter() - start
+    print(f"{len(pairs)} routes ({failed} failed) in {seconds:.3f} s, {len(pairs) / seconds:.0f} per second "
+          f"({len(router.fixes)} fixes, {len(router.airways)} airways)")
+    if failed == len(pairs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmarks the conversion pipeline against synthetic inputs (see `src.tools.synth`).
+
+Each benchmark runs `--repeat` times inside the synthetic working directory and is measured
+with `src.common.instrument` (wall, CPU, peak RSS); the median run is reported. Results can
+be saved as a baseline JSON and later runs compared against it, failing when a benchmark's
+wall time regresses by more than `--tolerance`.
+
+No baseline is committed: wall times only compare on the machine that recorded them, and
+even there unchanged code varied by up to 1.6x between runs on a shared 1-CPU VM (1.5x at
+--scale 0.25 for the benchmarks under 0.2 s), so record one locally before a change and
+compare after it, raising `--repeat` and `--tolerance` on noisy machines.
+
+    bench --scale 0.05 --save data/bench_baseline.json
+    bench --scale 0.05 --compare data/bench_baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+
+from src.adds import convert as adds
+from src.cifp.cache import CACHE_DIR
+from src.cifp.convert import build_pmtiles_fgb
+from src.common import instrument
+from src.runways.merge import merge_runways
+from src.search.build_index import build_search_index
+from src.tools.synth import generate
+
+
+def _clear_cifp_cache():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+# name -> (function, args, setup run before every repeat)
+BENCHMARKS = {
+    "cifp_cold": (build_pmtiles_fgb, ("FAACIFP18",), _clear_cifp_cache),
+    "cifp_warm": (build_pmtiles_fgb, ("FAACIFP18",), None),
+    "adds_airspaces": (adds.convert_airspaces, (), None),
+    "adds_boundary_airspace": (adds.convert_boundary_airspace, (), None),
+    "adds_holding_patterns": (adds.convert_holding_patterns, (), None),
+    "adds_obstacles": (adds.convert_obstacles, (), None),
+    "adds_am_runways": (adds.convert_am_runways, (), None),
+    "adds_am_taxiways": (adds.convert_am_taxiways, (), None),
+    "merge_runways": (merge_runways, (), None),
+    "build_index": (build_search_index, ("FAACIFP18", "data/search"), None),
+}
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names: list[str], repeat: int) -> dict:
+    """Run each named benchmark `repeat` times in the current directory; return median stats."""
+    results = {}
+    for name in names:
+        func, args, setup = BENCHMARKS[name]
+        runs = []
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            # Converter progress output would drown the results table
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                runs.append(instrument.run_stage(name, func, *args))
+        median = sorted(runs, key=lambda r: r["wall_s"])[len(runs) // 2]
+        results[name] = {
+            "wall_s": median["wall_s"],
+            "cpu_s": median["cpu_s"],
+            "peak_rss_mb": median["peak_rss_mb"],
+            "wall_s_runs": [r["wall_s"] for r in runs],
+            "wall_s_stdev": round(statistics.pstdev(r["wall_s"] for r in runs), 3),
+        }
+        print(f"  {name:<24} {median['wall_s']:>8.3f}s  cpu {median['cpu_s']:>8.3f}s  peak {median['peak_rss_mb']:>7.1f} MB", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print current vs. baseline wall times and return the benchmarks that regressed."""
+    regressed = []
+    print(f"\n  {'benchmark':<24} {'baseline':>9} {'current':>9} {'ratio':>7}")
+    for name, current in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:<24} {'-':>9} {current['wall_s']:>8.3f}s")
+            continue
+        ratio = current["wall_s"] / base["wall_s"] if base["wall_s"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressed.append(name)
+            flag = "  REGRESSED"
+        print(f"  {name:<24} {base['wall_s']:>8.3f}s {current['wall_s']:>8.3f}s {ratio:>6.2f}x{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0.05, help="synthetic dataset size (1.0 ~ national)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", default="data/bench", help="where the synthetic inputs are generated")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--save", help="write results to this baseline JSON")
+    parser.add_argument("--compare", help="compare against this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed wall-time regression (default 0.15)")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    save = os.path.abspath(args.save) if args.save else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    params = generate(args.workdir, args.scale, args.seed)
+    os.chdir(args.workdir)
+    # Intermediate outputs other benchmarks read (e.g. merge_runways) must exist up front
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        build_pmtiles_fgb("FAACIFP18")
+        adds.main()
+
+    print(f"Running {len(names)} benchmarks x{args.repeat} (scale {args.scale})...", flush=True)
+    report = {
+        "params": params,
+        "repeat": args.repeat,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "revision": _git_revision(),
+        "results": run_benchmarks(names, args.repeat),
+    }
+
+    if save:
+        os.makedirs(os.path.dirname(save), exist_ok=True)
+        with open(save, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Saved baseline to {save}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline["params"] != params:
+            print(f"Warning: baseline was recorded with {baseline['params']}, not {params}")
+        regressed = compare(report["results"], baseline, args.tolerance)
+        if regressed:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Tile-by-tile comparison of two PMTiles archives, or of the same-named archives in two
+directories.
+
+Every tile in either archive is decoded and compared layer by layer: the features in order,
+with their geometry and properties, where a property's type counts (5 and "5" differ, as do
+5486.0952 and 5486.095200000001). Tiles whose compressed bytes are equal are not decoded.
+For each archive it prints, per zoom, the tiles compared, those only in one archive and those
+that differ, then per layer how they differ: feature count, order only, properties (with the
+property names and value types involved), extent (tile resolution) or geometry only. Exits
+with status 1 if anything differs.
+
+    python -m src.tools.compare_tiles output/ other/output/ [--zooms 0-9]
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter, defaultdict
+
+from src.tools.pmtiles_reader import PMTilesReader, decode_tile, tileid_to_zxy
+
+
+def _tiles(reader: PMTilesReader, zooms: range) -> dict[int, tuple[int, int]]:
+    tiles = {}
+    for tile_id, offset, length, run in reader.entries():
+        for k in range(run):
+            if tileid_to_zxy(tile_id + k)[0] in zooms:
+                tiles[tile_id + k] = (offset, length)
+    return tiles
+
+
+def _property_diffs(a: list[dict], b: list[dict]) -> Counter:
+    """(property, type in a, type in b) of every differing value, feature by feature."""
+    diffs = Counter()
+    for fa, fb in zip(a, b):
+        pa, pb = fa["properties"], fb["properties"]
+        for key in pa.keys() | pb.keys():
+            va, vb = pa.get(key), pb.get(key)
+            if va != vb or type(va) is not type(vb):
+                diffs[(key, type(va).__name__, type(vb).__name__)] += 1
+    return diffs
+
+
+def _key(feature: dict) -> tuple:
+    properties = sorted((key, type(value).__name__, repr(value)) for key, value in feature["properties"].items())
+    return feature["type"], bytes(feature["geometry"]), properties
+
+
+def compare_layer(a: list[dict], b: list[dict]) -> tuple[str | None, Counter]:
+    """How two versions of a layer's features differ: None, "count", "order", "properties" or "geometry"."""
+    if len(a) != len(b):
+        return "count", Counter()
+    if sorted(map(_key, a)) == sorted(map(_key, b)) and list(map(_key, a)) != list(map(_key, b)):
+        return "order", Counter()
+    diffs = _property_diffs(a, b)
+    if diffs:
+        return "properties", diffs
+    if any((fa["type"], bytes(fa["geometry"])) != (fb["type"], bytes(fb["geometry"])) for fa, fb in zip(a, b)):
+        return "geometry", Counter()
+    return None, Counter()
+
+
+def compare_archives(path_a: str, path_b: str, zooms: range = range(0, 32)) -> dict:
+    """
+    {"tiles", "only_a", "only_b", "differ"} as Counters by zoom, "layers" as a Counter of
+    (layer, kind), "properties" as a Counter of (layer, property, type in a, type in b) and
+    "examples": {(layer, kind): [z/x/y, ...]}.
+    """
+    report = {key: Counter() for key in ("tiles", "only_a", "only_b", "differ", "layers", "properties")}
+    report["examples"] = defaultdict(list)
+    with PMTilesReader(path_a) as a, PMTilesReader(path_b) as b:
+        tiles_a, tiles_b = _tiles(a, zooms), _tiles(b, zooms)
+        for tile_id in sorted(tiles_a.keys() | tiles_b.keys()):
+            z, x, y = tileid_to_zxy(tile_id)
+            report["tiles"][z] += 1
+            if tile_id not in tiles_b:
+                report["only_a"][z] += 1
+                continue
+            if tile_id not in tiles_a:
+                report["only_b"][z] += 1
+                continue
+            if a.raw_tile(*tiles_a[tile_id]) == b.raw_tile(*tiles_b[tile_id]):
+                continue
+            layers_a = decode_tile(a.entry_data(*tiles_a[tile_id]))
+            layers_b = decode_tile(b.entry_data(*tiles_b[tile_id]))
+            differs = False
+            for layer in sorted(layers_a.keys() | layers_b.keys()):
+                la, lb = layers_a.get(layer) or {}, layers_b.get(layer) or {}
+                kind, diffs = compare_layer(la.get("features", []), lb.get("features", []))
+                if kind in (None, "geometry") and la and lb and la["extent"] != lb["extent"]:
+                    # Same features, order and properties at another tile resolution
+                    kind = "extent"
+                if kind is None:
+                    continue
+                differs = True
+                report["layers"][(layer, kind)] += 1
+                report["properties"].update({(layer, *key): n for key, n in diffs.items()})
+                if len(report["examples"][(layer, kind)]) < 3:
+                    report["examples"][(layer, kind)].append(f"{z}/{x}/{y}")
+            if differs:
+                report["differ"][z] += 1
+    return report
+
+
+def is_identical(report: dict) -> bool:
+    return not (report["only_a"] or report["only_b"] or report["differ"])
+
+
+def print_report(name: str, report: dict) -> None:
+    total, differ = sum(report["tiles"].values()), sum(report["differ"].values())
+    only = sum(report["only_a"].values()) + sum(report["only_b"].values())
+    print(f"{name}: {total} tiles, {differ} differ, {only} in one archive only")
+    for z in sorted(report["tiles"]):
+        if report["differ"][z] or report["only_a"][z] or report["only_b"][z]:
+            print(f"  z{z}: {report['differ'][z]}/{report['tiles'][z]} differ, "
+                  f"{report['only_a'][z]} only in first, {report['only_b'][z]} only in second")
+    for (layer, kind), n in sorted(report["layers"].items()):
+        print(f"  {layer}: {n} tiles differ in {kind} (e.g. {', '.join(report['examples'][(layer, kind)])})")
+    for (layer, key, type_a, type_b), n in sorted(report["properties"].items()):
+        print(f"    {layer}.{key}: {n} values ({type_a} vs {type_b})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PMTiles archives tile by tile, attributes included.")
+    parser.add_argument("a", help="archive or directory of archives")
+    parser.add_argument("b", help="archive or directory of archives")
+    parser.add_argument("--zooms", default="0-31", help="zoom range to compare, e.g. 0-9")
+    args = parser.parse_args()
+
+    low, _, high = args.zooms.partition("-")
+    zooms = range(int(low), int(high or low) + 1)
+    if os.path.isdir(args.a):
+        names = sorted(n for n in os.listdir(args.a) if n.endswith(".pmtiles") and os.path.exists(os.path.join(args.b, n)))
+        pairs = [(n, os.path.join(args.a, n), os.path.join(args.b, n)) for n in names]
+    else:
+        pairs = [(os.path.basename(args.a), args.a, args.b)]
+
+    identical = True
+    for name, path_a, path_b in pairs:
+        report = compare_archives(path_a, path_b, zooms)
+        print_report(name, report)
+        identical &= is_identical(report)
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
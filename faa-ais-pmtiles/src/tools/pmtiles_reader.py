@@ -0,0 +1,421 @@
+"""
+In-process reader for PMTiles v3 archives of Mapbox Vector Tiles.
+
+Memory-maps the archive, resolves tiles through the root and leaf directories (cached per
+reader) and decodes MVT layers with a small protobuf parser, so checks can read thousands
+of tiles without spawning `tippecanoe-decode` for each one. Only the compressions
+tippecanoe writes (none and gzip) are supported.
+
+Run as a script to print an archive's header and metadata, or one tile as the same
+nested FeatureCollection `tippecanoe-decode` prints:
+
+    python -m src.tools.pmtiles_reader output/enroute.pmtiles [z x y]
+"""
+
+import functools
+import gzip
+import json
+import math
+import mmap
+import struct
+import sys
+
+HEADER = struct.Struct("<7sBQQQQQQQQQQQBBBBBBiiiiBii")
+HEADER_FIELDS = [
+    "magic", "version",
+    "root_offset", "root_length", "metadata_offset", "metadata_length",
+    "leaf_offset", "leaf_length", "data_offset", "data_length",
+    "addressed_tiles", "tile_entries", "tile_contents",
+    "clustered", "internal_compression", "tile_compression", "tile_type", "min_zoom", "max_zoom",
+    "min_lon_e7", "min_lat_e7", "max_lon_e7", "max_lat_e7", "center_zoom", "center_lon_e7", "center_lat_e7",
+]
+
+# PMTiles compression codes
+COMPRESSION_NONE = 1
+COMPRESSION_GZIP = 2
+
+# MVT geometry types and commands
+GEOMETRY_TYPES = {1: "Point", 2: "LineString", 3: "Polygon"}
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+
+
+def zxy_to_tileid(z: int, x: int, y: int) -> int:
+    """PMTiles tile id: tiles of all lower zooms, then the Hilbert index of x, y at z."""
+    tile_id = ((1 << (2 * z)) - 1) // 3
+    for a in range(z - 1, -1, -1):
+        s = 1 << a
+        rx = s & x
+        ry = s & y
+        tile_id += ((3 * rx) ^ ry) << a
+        if ry == 0:
+            if rx != 0:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+    return tile_id
+
+
+def tileid_to_zxy(tile_id: int) -> tuple[int, int, int]:
+    """Inverse of `zxy_to_tileid`."""
+    z = 0
+    while tile_id >= (1 << (2 * z)):
+        tile_id -= 1 << (2 * z)
+        z += 1
+    x = y = 0
+    s = 1
+    while s < 1 << z:
+        rx = 1 & (tile_id >> 1)
+        ry = 1 & (tile_id ^ rx)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        x += s * rx
+        y += s * ry
+        tile_id >>= 2
+        s <<= 1
+    return z, x, y
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int) -> tuple[int, int]:
+    """The tile at zoom z containing a point."""
+    n = 1 << z
+    lat = max(min(lat, 85.0511287798066), -85.0511287798066)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+# ---------------------------------------------------------------------------
+# Protobuf
+# ---------------------------------------------------------------------------
+
+def _varint(buf, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf):
+    """Yield (field number, value) of a protobuf message; length-delimited values as memoryviews."""
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        wire = key & 7
+        if wire == 0:
+            value, pos = _varint(buf, pos)
+        elif wire == 2:
+            length, pos = _varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire}")
+        yield key >> 3, value
+
+
+def _packed(buf) -> list[int]:
+    values, pos, end = [], 0, len(buf)
+    while pos < end:
+        value, pos = _varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def _zigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+
+def _value(buf):
+    for field, value in _fields(buf):
+        if field == 1:
+            return bytes(value).decode()
+        if field == 2:
+            return struct.unpack("<f", value)[0]
+        if field == 3:
+            return struct.unpack("<d", value)[0]
+        if field == 4:
+            # int64 is two's complement in a varint
+            return value - (1 << 64) if value >= 1 << 63 else value
+        if field == 5:
+            return value
+        if field == 6:
+            return _zigzag(value)
+        if field == 7:
+            return bool(value)
+    return None
+
+
+def decode_tile(data: bytes, layers=None) -> dict[str, dict]:
+    """
+    Decode an MVT tile into {layer name: {"extent", "features"}}, optionally only `layers`.
+
+    Each feature is {"id", "type", "properties", "geometry"}, with the geometry left as its
+    packed command stream; `feature_geometry` turns it into coordinates.
+    """
+    decoded = {}
+    for field, layer_buf in _fields(memoryview(data)):
+        if field != 3:
+            continue
+        name, extent, keys, values, features = None, 4096, [], [], []
+        for lfield, lvalue in _fields(layer_buf):
+            if lfield == 1:
+                name = bytes(lvalue).decode()
+                if layers is not None and name not in layers:
+                    break
+            elif lfield == 2:
+                features.append(lvalue)
+            elif lfield == 3:
+                keys.append(bytes(lvalue).decode())
+            elif lfield == 4:
+                values.append(_value(lvalue))
+            elif lfield == 5:
+                extent = lvalue
+        else:
+            decoded[name] = {"extent": extent, "features": [_feature(f, keys, values) for f in features]}
+    return decoded
+
+
+def layer_stats(data: bytes) -> dict[str, tuple[int, int]]:
+    """{layer name: (feature count, encoded bytes)} of an MVT tile, without decoding features."""
+    stats = {}
+    for field, layer_buf in _fields(memoryview(data)):
+        if field != 3:
+            continue
+        name, features = None, 0
+        for lfield, lvalue in _fields(layer_buf):
+            if lfield == 1:
+                name = bytes(lvalue).decode()
+            elif lfield == 2:
+                features += 1
+        stats[name] = (features, len(layer_buf))
+    return stats
+
+
+def _feature(buf, keys: list[str], values: list) -> dict:
+    feature = {"id": None, "type": None, "properties": {}, "geometry": b""}
+    for field, value in _fields(buf):
+        if field == 1:
+            feature["id"] = value
+        elif field == 2:
+            tags = _packed(value)
+            feature["properties"] = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+        elif field == 3:
+            feature["type"] = GEOMETRY_TYPES.get(value)
+        elif field == 4:
+            feature["geometry"] = value
+    return feature
+
+
+def feature_geometry(feature: dict, extent: int, z: int, x: int, y: int) -> list[list[tuple[float, float]]]:
+    """A feature's parts (points, lines or rings) as lon/lat coordinates."""
+    commands = _packed(feature["geometry"])
+    parts, part = [], None
+    cx = cy = 0
+    i = 0
+    size = extent * (1 << z)
+    while i < len(commands):
+        command, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if command == CLOSE_PATH:
+            if part:
+                part.append(part[0])
+            continue
+        for _ in range(count):
+            cx += _zigzag(commands[i])
+            cy += _zigzag(commands[i + 1])
+            i += 2
+            lon = (x * extent + cx) / size * 360.0 - 180.0
+            lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y * extent + cy) / size))))
+            if command == MOVE_TO:
+                part = [(lon, lat)]
+                parts.append(part)
+            else:
+                part.append((lon, lat))
+    return parts
+
+
+# ---------------------------------------------------------------------------
+# PMTiles
+# ---------------------------------------------------------------------------
+
+def _decompress(data, compression: int) -> bytes:
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    if compression == COMPRESSION_NONE:
+        return bytes(data)
+    raise ValueError(f"Unsupported PMTiles compression {compression}")
+
+
+class PMTilesReader:
+    """A memory-mapped PMTiles archive; use as a context manager or call close()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = dict(zip(HEADER_FIELDS, HEADER.unpack_from(self._map, 0)))
+        if self.header["magic"] != b"PMTiles" or self.header["version"] != 3:
+            raise ValueError(f"{path} is not a PMTiles v3 archive")
+        self._directory = functools.lru_cache(maxsize=256)(self._read_directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _bytes(self, offset: int, length: int) -> memoryview:
+        return memoryview(self._map)[offset:offset + length]
+
+    def metadata(self) -> dict:
+        h = self.header
+        raw = self._bytes(h["metadata_offset"], h["metadata_length"])
+        return json.loads(_decompress(raw, h["internal_compression"])) if h["metadata_length"] else {}
+
+    def _read_directory(self, offset: int, length: int) -> list[tuple[int, int, int, int]]:
+        """Entries (tile_id, offset, length, run_length), sorted by tile id."""
+        values = _packed(_decompress(self._bytes(offset, length), self.header["internal_compression"]))
+        n = values[0]
+        ids, runs, lengths, offsets = values[1:n + 1], values[n + 1:2 * n + 1], values[2 * n + 1:3 * n + 1], values[3 * n + 1:4 * n + 1]
+        entries = []
+        tile_id = 0
+        for i in range(n):
+            tile_id += ids[i]
+            # An offset of 0 means "directly after the previous entry"; others are stored +1
+            offset_i = entries[-1][1] + entries[-1][2] if offsets[i] == 0 and i > 0 else offsets[i] - 1
+            entries.append((tile_id, offset_i, lengths[i], runs[i]))
+        return entries
+
+    @staticmethod
+    def _find(entries: list, tile_id: int):
+        lo, hi = 0, len(entries) - 1
+        while lo <= hi:
+            mid = (lo + hi) >> 1
+            if entries[mid][0] < tile_id:
+                lo = mid + 1
+            elif entries[mid][0] > tile_id:
+                hi = mid - 1
+            else:
+                return entries[mid]
+        # Otherwise the closest lower entry: a leaf directory, or a run of identical tiles
+        if hi >= 0 and (entries[hi][3] == 0 or tile_id - entries[hi][0] < entries[hi][3]):
+            return entries[hi]
+        return None
+
+    def entries(self):
+        """Yield (tile_id, offset, length, run_length) of every tile entry, in tile id order."""
+        h = self.header
+
+        def walk(offset, length):
+            for entry in self._directory(offset, length):
+                if entry[3] == 0:
+                    yield from walk(h["leaf_offset"] + entry[1], entry[2])
+                else:
+                    yield entry
+
+        yield from walk(h["root_offset"], h["root_length"])
+
+    def raw_tile(self, offset: int, length: int) -> memoryview:
+        """The stored (still compressed) bytes of an entry's tile data."""
+        return self._bytes(self.header["data_offset"] + offset, length)
+
+    def entry_data(self, offset: int, length: int) -> bytes:
+        """The decompressed tile data of an entry."""
+        return _decompress(self.raw_tile(offset, length), self.header["tile_compression"])
+
+    def tile_data(self, z: int, x: int, y: int) -> bytes | None:
+        """The decompressed tile, or None if the archive has no such tile."""
+        h = self.header
+        tile_id = zxy_to_tileid(z, x, y)
+        offset, length = h["root_offset"], h["root_length"]
+        for _ in range(4):
+            entry = self._find(self._directory(offset, length), tile_id)
+            if entry is None:
+                return None
+            if entry[3] > 0:
+                return self.entry_data(entry[1], entry[2])
+            offset, length = h["leaf_offset"] + entry[1], entry[2]
+        return None
+
+    def tile(self, z: int, x: int, y: int, layers=None) -> dict[str, dict] | None:
+        """A decoded tile (see `decode_tile`), or None if the archive has no such tile."""
+        data = self.tile_data(z, x, y)
+        return None if data is None else decode_tile(data, layers)
+
+
+def _signed_area(ring) -> float:
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:]))
+
+
+def _group_rings(rings) -> list[list]:
+    """Split MVT rings into polygons: each exterior ring (positive area in tile space) starts one."""
+    polygons = []
+    for ring in rings:
+        # Latitude runs against tile y, which flips the sign of the area
+        if _signed_area(ring) < 0 or not polygons:
+            polygons.append([ring])
+        else:
+            polygons[-1].append(ring)
+    return polygons
+
+
+def to_feature_collection(tile: dict, z: int, x: int, y: int) -> dict:
+    """A decoded tile in `tippecanoe-decode`'s nested FeatureCollection shape."""
+    collections = []
+    for name, layer in tile.items():
+        features = []
+        for f in layer["features"]:
+            parts = feature_geometry(f, layer["extent"], z, x, y)
+            if f["type"] == "Point":
+                geometry = {"type": "Point", "coordinates": parts[0][0]} if len(parts) == 1 else \
+                    {"type": "MultiPoint", "coordinates": [p[0] for p in parts]}
+            elif f["type"] == "LineString":
+                geometry = {"type": "LineString", "coordinates": parts[0]} if len(parts) == 1 else \
+                    {"type": "MultiLineString", "coordinates": parts}
+            else:
+                polygons = _group_rings(parts)
+                geometry = {"type": "Polygon", "coordinates": polygons[0]} if len(polygons) == 1 else \
+                    {"type": "MultiPolygon", "coordinates": polygons}
+            features.append({"type": "Feature", "properties": f["properties"], "geometry": geometry})
+        collections.append({
+            "type": "FeatureCollection",
+            "properties": {"layer": name, "extent": layer["extent"]},
+            "features": features,
+        })
+    return {"type": "FeatureCollection", "properties": {"zoom": z, "x": x, "y": y}, "features": collections}
+
+
+def main():
+    if len(sys.argv) not in (2, 5):
+        print("Usage: python -m src.tools.pmtiles_reader <archive.pmtiles> [z x y]")
+        sys.exit(1)
+    with PMTilesReader(sys.argv[1]) as reader:
+        if len(sys.argv) == 2:
+            header = {k: v for k, v in reader.header.items() if k != "magic"}
+            print(json.dumps({"header": header, "metadata": reader.metadata()}, indent=1))
+            return
+        z, x, y = (int(v) for v in sys.argv[2:])
+        tile = reader.tile(z, x, y)
+        if tile is None:
+            print(f"No tile {z}/{x}/{y} in {sys.argv[1]}")
+            sys.exit(1)
+        print(json.dumps(to_feature_collection(tile, z, x, y)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,114 +2,174 @@
 Performs automated quality assurance checks on generated PMTiles.
 
 Decodes specific tiles at given zoom levels to verify the presence and properties
-of key features (e.g., major airports, specific waypoints).
+of key features (e.g., major airports, specific waypoints). On top of the hand-picked
+checks, every airport and navaid in the intermediate data must appear in its tile at the
+archive's maxzoom. Tiles are read in process (see `src.tools.pmtiles_reader`), each tile
+once for all of its checks, in parallel across tiles.
 """
 
-import subprocess
+import concurrent.futures
+import functools
 import json
-import sys
 import os
+import sys
+
+import pyogrio
+
+from src.tools.pmtiles_reader import PMTilesReader, lonlat_to_tile
+
+CHECKS = [
+    {
+        "name": "Rank 1 Check: KSFO at Z8",
+        "file": "airports_navaids.pmtiles",
+        "z": 8, "x": 40, "y": 99,
+        "layer": "airports",
+        "matches": {"id": "KSFO", "rank": 1}
+    },
+    {
+        "name": "Rank 1 Check: KATL at Z8",
+        "file": "airports_navaids.pmtiles",
+        "z": 8, "x": 67, "y": 102,
+        "layer": "airports",
+        "matches": {"id": "KATL", "rank": 1}
+    },
+    {
+        "name": "Rank 2 Check: KMER at Z8",
+        "file": "airports_navaids.pmtiles",
+        "z": 8, "x": 42, "y": 99,
+        "layer": "airports",
+        "matches": {"id": "KMER", "rank": 2}
+    },
+    {
+        "name": "KSJC in airports_navaids at Z8",
+        "file": "airports_navaids.pmtiles",
+        "z": 8, "x": 41, "y": 99,
+        "layer": "airports",
+        "matches": {"id": "KSJC"}
+    },
+    {
+        "name": "V230 airway in enroute at Z8",
+        "file": "enroute.pmtiles",
+        "z": 8, "x": 41, "y": 99,
+        "layer": "airways",
+        "matches": {"airway": "V230"}
+    },
+    {
+        "name": "Obstacles in waypoints_obstacles at Z10",
+        "file": "waypoints_obstacles.pmtiles",
+        "z": 10, "x": 165, "y": 397,
+        "layer": "obstacles",
+        "matches": {"type": "T-L TWR"}
+    },
+    {
+        "name": "Waypoint VINCO in waypoints_obstacles at Z10",
+        "file": "waypoints_obstacles.pmtiles",
+        "z": 10, "x": 165, "y": 397,
+        "layer": "waypoints",
+        "matches": {"id": "VINCO"}
+    }
+]
 
-def run_decode(pmtiles_path, z, x, y):
-    cmd = f"tippecanoe-decode {pmtiles_path} {z} {x} {y}"
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    if result.returncode != 0:
-        return None
-    return result.stdout
+# Layers whose every feature must survive at the archive's maxzoom:
+# (archive, layer, intermediate file)
+COMPLETE_LAYERS = [
+    ("airports_navaids.pmtiles", "airports", "data/airports.geojson"),
+    ("airports_navaids.pmtiles", "navaids", "data/navaids.fgb"),
+]
 
-def check_feature_in_tile(tile_json, layer_name, matches):
+
+@functools.lru_cache(maxsize=None)
+def open_archive(path):
+    # One reader (and directory cache) per archive per worker process
+    return PMTilesReader(path)
+
+
+def check_feature_in_tile(tile, layer_name, matches):
     """
     Check if a feature exists in the tile that matches all provided property criteria.
     matches is a dict { "prop_name": "expected_value" }
     """
-    if not tile_json:
+    if not tile or layer_name not in tile:
         return False
-    try:
-        data = json.loads(tile_json)
-        # tippecanoe-decode returns a FeatureCollection containing FeatureCollections for each layer
-        for layer_collection in data.get("features", []):
-            current_layer = layer_collection.get("properties", {}).get("layer")
-            if current_layer == layer_name:
-                for feature in layer_collection.get("features", []):
-                    props = feature.get("properties", {})
-                    # Check if all key-value pairs in 'matches' are present in feature properties
-                    if all(props.get(k) == v for k, v in matches.items()):
-                        return True
-    except json.JSONDecodeError:
-        pass
+    for feature in tile[layer_name]["features"]:
+        props = feature["properties"]
+        # Check if all key-value pairs in 'matches' are present in feature properties
+        if all(props.get(k) == v for k, v in matches.items()):
+            return True
     return False
 
+
+def run_tile_checks(path, z, x, y, checks):
+    """Decode one tile and return whether each of its checks passed."""
+    tile = open_archive(path).tile(z, x, y, layers={c["layer"] for c in checks})
+    return [check_feature_in_tile(tile, c["layer"], c["matches"]) for c in checks]
+
+
+def generated_checks(output_dir):
+    """An id check per feature of each COMPLETE_LAYERS layer, in its tile at maxzoom."""
+    checks = []
+    for archive, layer, source in COMPLETE_LAYERS:
+        path = os.path.join(output_dir, archive)
+        if not os.path.exists(path) or not os.path.exists(source):
+            print(f"Skipping {layer} completeness checks: {path} or {source} not found")
+            continue
+        z = open_archive(path).header["max_zoom"]
+        if source.endswith(".geojson"):
+            with open(source) as f:
+                points = [(ft["properties"]["id"], *ft["geometry"]["coordinates"][:2]) for ft in json.load(f)["features"]]
+        else:
+            gdf = pyogrio.read_dataframe(source, columns=["id"])
+            points = zip(gdf["id"], gdf.geometry.x, gdf.geometry.y)
+        for ident, lon, lat in points:
+            x, y = lonlat_to_tile(lon, lat, z)
+            checks.append({
+                "name": f"{ident} in {layer} at Z{z}",
+                "file": archive,
+                "z": z, "x": x, "y": y,
+                "layer": layer,
+                "matches": {"id": ident}
+            })
+    return checks
+
+
 def main():
     # Paths are relative to faa-ais-pmtiles root
     output_dir = "output"
 
-    checks = [
-        {
-            "name": "Rank 1 Check: KSFO at Z8",
-            "file": "airports_navaids.pmtiles",
-            "z": 8, "x": 40, "y": 99,
-            "layer": "airports",
-            "matches": {"id": "KSFO", "rank": 1}
-        },
-        {
-            "name": "Rank 1 Check: KATL at Z8",
-            "file": "airports_navaids.pmtiles",
-            "z": 8, "x": 67, "y": 102,
-            "layer": "airports",
-            "matches": {"id": "KATL", "rank": 1}
-        },
-        {
-            "name": "Rank 2 Check: KMER at Z8",
-            "file": "airports_navaids.pmtiles",
-            "z": 8, "x": 42, "y": 99,
-            "layer": "airports",
-            "matches": {"id": "KMER", "rank": 2}
-        },
-        {
-            "name": "KSJC in airports_navaids at Z8",
-            "file": "airports_navaids.pmtiles",
-            "z": 8, "x": 41, "y": 99,
-            "layer": "airports",
-            "matches": {"id": "KSJC"}
-        },
-        {
-            "name": "V230 airway in enroute at Z8",
-            "file": "enroute.pmtiles",
-            "z": 8, "x": 41, "y": 99,
-            "layer": "airways",
-            "matches": {"airway": "V230"}
-        },
-        {
-            "name": "Obstacles in waypoints_obstacles at Z10",
-            "file": "waypoints_obstacles.pmtiles",
-            "z": 10, "x": 165, "y": 397,
-            "layer": "obstacles",
-            "matches": {"type": "T-L TWR"}
-        },
-        {
-            "name": "Waypoint VINCO in waypoints_obstacles at Z10",
-            "file": "waypoints_obstacles.pmtiles",
-            "z": 10, "x": 165, "y": 397,
-            "layer": "waypoints",
-            "matches": {"id": "VINCO"}
-        }
-    ]
+    checks = CHECKS + generated_checks(output_dir)
 
     failed = False
-    for check in checks:
+    by_tile = {}
+    for i, check in enumerate(checks):
         path = os.path.join(output_dir, check["file"])
         if not os.path.exists(path):
             print(f"FAILED: {check['name']} - File not found: {path}")
             failed = True
             continue
+        by_tile.setdefault((path, check["z"], check["x"], check["y"]), []).append(i)
 
-        tile_json = run_decode(path, check["z"], check["x"], check["y"])
-        if check_feature_in_tile(tile_json, check["layer"], check["matches"]):
-            print(f"PASSED: {check['name']}")
-        else:
+    passed = [False] * len(checks)
+    tiles = list(by_tile.items())
+    if tiles:
+        paths, zs, xs, ys = zip(*(key for key, _ in tiles))
+        groups = [[checks[i] for i in indices] for _, indices in tiles]
+        chunksize = max(1, len(tiles) // (4 * (os.cpu_count() or 1)))
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            results = executor.map(run_tile_checks, paths, zs, xs, ys, groups, chunksize=chunksize)
+            for (_, indices), tile_results in zip(tiles, results):
+                for i, ok in zip(indices, tile_results):
+                    passed[i] = ok
+
+    for i, check in enumerate(checks):
+        if passed[i]:
+            # Generated checks are only reported when they fail
+            if i < len(CHECKS):
+                print(f"PASSED: {check['name']}")
+        elif os.path.exists(os.path.join(output_dir, check["file"])):
             print(f"FAILED: {check['name']} - Feature matching {check['matches']} not found in tile {check['z']}/{check['x']}/{check['y']}")
             failed = True
 
+    print(f"\n{sum(passed)}/{len(checks)} checks passed across {len(tiles)} tiles")
     if failed:
         sys.exit(1)
     else:
@@ -0,0 +1,393 @@
+"""
+Generates synthetic pipeline inputs of configurable size, without network access.
+
+Writes, under an output directory laid out like the pipeline's working directory:
+  - FAACIFP18: fixed-width ARINC 424 airports, runways, localizers, navaids, enroute and
+    terminal waypoints, airways and SID/STAR/IAP legs that `src.cifp.reader` parses
+  - shapefiles/: NFDC-style Class Airspace (a Class E coverage grid plus B/C/D rings)
+  - data/*_raw.geojson: ADDS-shaped SUA, boundary airspace, holding patterns, DOF
+    obstacles and airport-diagram runways/taxiways (matching the CIFP runways)
+  - data/nasr_metadata.json: NASR airport metadata for the generated airports
+
+Sizes scale linearly with `scale`; 1.0 is roughly a national 28-day cycle. Output is
+deterministic for a given (scale, seed).
+"""
+
+import argparse
+import json
+import os
+
+import geopandas as gpd
+import numpy as np
+import pyogrio
+import shapely
+
+from src.runways.geometry import calculate_destination_array, create_runway_poly_array
+
+# Approximate feature counts of a full national cycle
+NATIONAL_COUNTS = {
+    "airports": 5_000,
+    "vhf_navaids": 1_000,
+    "ndb_navaids": 300,
+    "enroute_waypoints": 60_000,
+    "airways": 1_500,
+    "class_e_cells": 8_000,
+    "controlled_rings": 900,
+    "sua": 1_500,
+    "boundary": 150,
+    "holding_patterns": 12_000,
+    "obstacles": 600_000,
+}
+
+# Continental US
+LON_RANGE = (-124.5, -67.5)
+LAT_RANGE = (25.0, 49.0)
+
+PARAMS_FILE = "synth.json"
+
+
+# ---------------------------------------------------------------------------
+# ARINC 424 records
+# ---------------------------------------------------------------------------
+
+def _record(fields: list[tuple[int, str]]) -> str:
+    """Lay out (start column, text) pairs in a blank 132-column record."""
+    line = [" "] * 132
+    for start, text in fields:
+        line[start:start + len(text)] = text
+    return "".join(line)
+
+
+def _arinc_lat(v: float) -> str:
+    hemi = "N" if v >= 0 else "S"
+    total = round(abs(v) * 360000)
+    d, rem = divmod(total, 360000)
+    m, s = divmod(rem, 6000)
+    return f"{hemi}{d:02d}{m:02d}{s:04d}"
+
+
+def _arinc_lon(v: float) -> str:
+    hemi = "E" if v >= 0 else "W"
+    total = round(abs(v) * 360000)
+    d, rem = divmod(total, 360000)
+    m, s = divmod(rem, 6000)
+    return f"{hemi}{d:03d}{m:02d}{s:04d}"
+
+
+def _ident(i: int, width: int, prefix: str = "") -> str:
+    """Unique alphabetic identifier for index i."""
+    letters = []
+    for _ in range(width - len(prefix)):
+        i, r = divmod(i, 26)
+        letters.append(chr(65 + r))
+    return prefix + "".join(reversed(letters))
+
+
+def _runway_number(bearing: float) -> str:
+    n = round(bearing / 10) % 36
+    return f"{n or 36:02d}"
+
+
+def generate_airports(counts: dict, rng: np.random.Generator) -> dict:
+    """Airport reference points plus a runway (two thresholds) or two per airport."""
+    n = counts["airports"]
+    ids = [_ident(i, 4, "K") for i in range(n)]
+    lon = rng.uniform(*LON_RANGE, n)
+    lat = rng.uniform(*LAT_RANGE, n)
+    elevation = rng.integers(0, 8000, n)
+
+    runways_per_airport = rng.integers(1, 3, n)
+    owner = np.repeat(np.arange(n), runways_per_airport)
+    k = len(owner)
+    bearing = rng.uniform(0, 180, k).round(1)
+    length = rng.integers(20, 120, k) * 100
+    width = rng.choice([60, 75, 100, 150], k)
+    start = np.column_stack([lon[owner], lat[owner], np.zeros(k)])
+    start[:, :2] += rng.uniform(-0.01, 0.01, (k, 2))
+    end = calculate_destination_array(start, bearing, length)
+
+    return {
+        "ids": ids, "lon": lon, "lat": lat, "elevation": elevation,
+        "runway_owner": owner, "bearing": bearing, "length": length, "width": width,
+        "start": start, "end": end,
+    }
+
+
+def write_cifp(path: str, airports: dict, counts: dict, rng: np.random.Generator) -> None:
+    lines = ["HDR01FAACIFP18      001P013203704552502  05-MAR-202509:37:43  U.S.A. DOT FAA"]
+    ids, lon, lat = airports["ids"], airports["lon"], airports["lat"]
+
+    # Navaids and enroute waypoints form the fix pool shared by airways and procedures
+    n_vhf, n_ndb, n_wpt = counts["vhf_navaids"], counts["ndb_navaids"], counts["enroute_waypoints"]
+    vhf_lon, vhf_lat = rng.uniform(*LON_RANGE, n_vhf), rng.uniform(*LAT_RANGE, n_vhf)
+    for i in range(n_vhf):
+        vid = _ident(i, 3)
+        lines.append(_record([
+            (0, "SUSAD "), (13, vid), (19, "K2"), (21, "1"), (22, f"{rng.integers(10800, 11795):05d}"),
+            (27, "VTH W"), (32, _arinc_lat(vhf_lat[i])), (41, _arinc_lon(vhf_lon[i])), (51, vid),
+            (55, _arinc_lat(vhf_lat[i])), (64, _arinc_lon(vhf_lon[i])), (79, f"{rng.integers(0, 8000):05d}"),
+            (93, f"{vid} VORTAC"),
+        ]))
+    for i in range(n_ndb):
+        nid = _ident(i, 2) + "N"
+        lines.append(_record([
+            (0, "SUSADB"), (13, nid), (19, "K2"), (21, "1"), (22, f"{rng.integers(1900, 5350):05d}"),
+            (27, "H  W "), (32, _arinc_lat(rng.uniform(*LAT_RANGE))), (41, _arinc_lon(rng.uniform(*LON_RANGE))),
+            (93, f"{nid} NDB"),
+        ]))
+
+    wpt_ids = [_ident(i, 5) for i in range(n_wpt)]
+    wpt_lon, wpt_lat = rng.uniform(*LON_RANGE, n_wpt), rng.uniform(*LAT_RANGE, n_wpt)
+    for i in range(n_wpt):
+        lines.append(_record([
+            (0, "SUSAEA"), (6, "ENRT"), (13, wpt_ids[i]), (19, "K2"), (21, "0"),
+            (26, rng.choice(["C  ", "R  ", "W  "])), (29, rng.choice(["L ", "H ", "B "])),
+            (32, _arinc_lat(wpt_lat[i])), (41, _arinc_lon(wpt_lon[i])), (98, f"{wpt_ids[i]}"),
+        ]))
+
+    # Airways walk the waypoints in longitude order so consecutive points are neighbours
+    order = np.argsort(wpt_lon)
+    for a in range(counts["airways"]):
+        airway_id = f"{rng.choice(['V', 'J', 'Q', 'T'])}{a + 1}"
+        steps = rng.integers(0, max(n_wpt - 200, 1)) + np.cumsum(rng.integers(1, 8, rng.integers(5, 25)))
+        points = order[steps[steps < n_wpt]]
+        route_type = rng.choice(["O", "R", " "])
+        for seq, p in enumerate(points, 1):
+            lines.append(_record([
+                (0, "SUSAER"), (13, airway_id), (25, f"{seq * 10:04d}"), (29, wpt_ids[p]), (38, "0"),
+                (44, route_type), (45, rng.choice(list("BHL"))), (83, rng.choice(["05000", "FL180", "12000", "     "])),
+            ]))
+
+    # Airport records, grouped per airport as in the real file
+    first = np.searchsorted(airports["runway_owner"], np.arange(len(ids)))
+    last = np.searchsorted(airports["runway_owner"], np.arange(len(ids)), side="right")
+    for i, ident in enumerate(ids):
+        longest = int(airports["length"][first[i]:last[i]].max())
+        lines.append(_record([
+            (0, "SUSAP"), (6, ident), (10, "K2"), (12, "A"), (13, ident[1:]), (21, "1"), (22, "18000"),
+            (27, f"{longest // 100:03d}"), (30, rng.choice(["Y", "N"])), (31, rng.choice(list("HSW"))),
+            (32, _arinc_lat(lat[i])), (41, _arinc_lon(lon[i])), (51, "E0140"),
+            (56, f"{airports['elevation'][i]:05d}"), (80, rng.choice(list("CMP"))), (93, f"{ident} MUNICIPAL"),
+        ]))
+
+        terminal = []
+        for t in range(2):
+            wid = f"{ident[1:]}{t}{'AB'[t]}"
+            terminal.append(wid)
+            lines.append(_record([
+                (0, "SUSAP"), (6, ident), (10, "K2"), (12, "C"), (13, wid), (19, "K2"), (21, "0"),
+                (26, "C  "), (29, "  "), (32, _arinc_lat(lat[i] + 0.1 * (t + 1))), (41, _arinc_lon(lon[i] - 0.1)),
+                (98, wid),
+            ]))
+
+        for r in range(first[i], last[i]):
+            bearing = airports["bearing"][r]
+            for end, b in ((airports["start"][r], bearing), (airports["end"][r], (bearing + 180) % 360)):
+                lines.append(_record([
+                    (0, "SUSAP"), (6, ident), (10, "K2"), (12, "G"), (13, f"RW{_runway_number(b)}"), (21, "1"),
+                    (22, f"{airports['length'][r]:05d}"), (27, f"{round(b * 10) % 3600:04d}"),
+                    (32, _arinc_lat(end[1])), (41, _arinc_lon(end[0])),
+                    (66, f"{airports['elevation'][i]:05d}"), (77, f"{airports['width'][r]:03d}"),
+                ]))
+
+        r = first[i]
+        lines.append(_record([
+            (0, "SUSAP"), (6, ident), (10, "K2"), (12, "I"), (13, f"I{ident[1:]}"), (21, "1"), (22, "10950"),
+            (27, f"RW{_runway_number(airports['bearing'][r])}"), (32, _arinc_lat(airports['end'][r][1])),
+            (41, _arinc_lon(airports['end'][r][0])), (51, f"{round(airports['bearing'][r] * 10) % 3600:04d}"),
+            (97, f"{airports['elevation'][i]:05d}"),
+        ]))
+
+        # A SID, a STAR and an approach, each with a common route and one transition
+        near = order[np.searchsorted(wpt_lon[order], lon[i]) % n_wpt]
+        fixes = terminal + [wpt_ids[near], wpt_ids[order[(np.searchsorted(wpt_lon[order], lon[i]) + 3) % n_wpt]]]
+        for kind in "DEF":
+            proc = f"{kind}{ident[1:]}1"
+            for transition in ("     ", wpt_ids[near]):
+                for seq, fix in enumerate(fixes, 1):
+                    lines.append(_record([
+                        (0, "SUSAP"), (6, ident), (10, "K2"), (12, kind), (13, proc), (19, "2"), (20, transition),
+                        (26, f"{seq * 10:03d}"), (29, fix), (38, "1"),
+                        (84, rng.choice(["05000", "FL180", "     ", "03000"])), (94, rng.choice(["18000", "     "])),
+                    ]))
+
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+# ---------------------------------------------------------------------------
+# ADDS / NFDC layers
+# ---------------------------------------------------------------------------
+
+def _frame(columns: dict, geometry) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(columns, geometry=geometry, crs="EPSG:4326")
+
+
+def _rings(lon, lat, radius):
+    return shapely.buffer(shapely.points(lon, lat), radius, quad_segs=8)
+
+
+def write_class_airspace(shp_dir: str, airports: dict, counts: dict, rng: np.random.Generator) -> None:
+    """A Class E coverage (edge-matched grid cells) and B/C/D rings around airports."""
+    os.makedirs(shp_dir, exist_ok=True)
+    n = counts["class_e_cells"]
+    cols = max(1, int(np.sqrt(n * 2)))
+    rows = max(1, n // cols)
+    dx = (LON_RANGE[1] - LON_RANGE[0]) / cols
+    dy = (LAT_RANGE[1] - LAT_RANGE[0]) / rows
+    x, y = np.meshgrid(np.arange(cols), np.arange(rows))
+    x0 = LON_RANGE[0] + x.ravel() * dx
+    y0 = LAT_RANGE[0] + y.ravel() * dy
+    cells = shapely.box(x0, y0, x0 + dx, y0 + dy)
+    m = len(cells)
+    local_e = rng.choice(["CLASS_E5", "CLASS_E5", "CLASS_E6", "CLASS_E2"], m)
+    class_e = _frame({
+        "NAME": np.where(local_e == "CLASS_E2", "SURFACE AREA", ""),
+        "IDENT": [f"E{i}" for i in range(m)],
+        "CLASS": "E",
+        "LOCAL_TYPE": local_e,
+        "UPPER_VAL": np.where(local_e == "CLASS_E6", "17999", "-9998"),
+        "LOWER_VAL": np.where(local_e == "CLASS_E5", "700", "1200"),
+    }, cells)
+
+    k = min(counts["controlled_rings"], len(airports["ids"]))
+    pick = rng.choice(len(airports["ids"]), k, replace=False)
+    local = rng.choice(["CLASS_B", "CLASS_C", "CLASS_D", "CLASS_D"], k)
+    radius = np.select([local == "CLASS_B", local == "CLASS_C"], [0.3, 0.15], 0.07)
+    rings = _rings(airports["lon"][pick], airports["lat"][pick], radius)
+    controlled = _frame({
+        "NAME": [f"{airports['ids'][i]} {t[-1]}" for i, t in zip(pick, local)],
+        "IDENT": [airports["ids"][i] for i in pick],
+        "CLASS": [t[-1] for t in local],
+        "LOCAL_TYPE": local,
+        "UPPER_VAL": np.select([local == "CLASS_B", local == "CLASS_C"], ["10000", "4000"], "2500"),
+        "LOWER_VAL": "SFC",
+    }, rings)
+
+    pyogrio.write_dataframe(class_e, os.path.join(shp_dir, "Class_Airspace_E.shp"), driver="ESRI Shapefile")
+    pyogrio.write_dataframe(controlled, os.path.join(shp_dir, "Class_Airspace.shp"), driver="ESRI Shapefile")
+
+
+def write_adds(data_dir: str, airports: dict, counts: dict, rng: np.random.Generator) -> None:
+    os.makedirs(data_dir, exist_ok=True)
+
+    def geojson(gdf: gpd.GeoDataFrame, name: str) -> None:
+        pyogrio.write_dataframe(gdf, os.path.join(data_dir, f"{name}_raw.geojson"), driver="GeoJSON")
+
+    n = counts["sua"]
+    sua_type = rng.choice(["MOA", "R", "W", "P", "A"], n)
+    geojson(_frame({
+        "NAME": [f"SUA {i}" for i in range(n)],
+        "TYPE_CODE": sua_type,
+        "UPPER_VAL": rng.choice(["18000", "FL230", "10000"], n),
+        "LOWER_VAL": rng.choice(["500", "SFC", "3000"], n),
+    }, _rings(rng.uniform(*LON_RANGE, n), rng.uniform(*LAT_RANGE, n), rng.uniform(0.05, 0.5, n))), "sua")
+
+    n = counts["boundary"]
+    x, y = rng.uniform(*LON_RANGE, n), rng.uniform(*LAT_RANGE, n)
+    geojson(_frame({
+        "NAME": [f"ARTCC {i}" for i in range(n)],
+        "IDENT": [_ident(i, 3, "Z") for i in range(n)],
+        "TYPE_CODE": "ARTCC",
+        "LOCAL_TYPE": rng.choice(["ARTCC_L", "ARTCC_H"], n),
+        "UPPER_VAL": "UNLTD",
+        "LOWER_VAL": "SFC",
+    }, shapely.box(x, y, x + 3, y + 2)), "boundary_airspace")
+
+    n = counts["holding_patterns"]
+    x, y = rng.uniform(*LON_RANGE, n), rng.uniform(*LAT_RANGE, n)
+    course = rng.integers(0, 360, n)
+    racetracks = shapely.linestrings(np.stack([
+        np.column_stack([x, y]), np.column_stack([x + 0.05, y]), np.column_stack([x + 0.05, y + 0.02]),
+        np.column_stack([x, y + 0.02]), np.column_stack([x, y]),
+    ], axis=1))
+    geojson(_frame({
+        "NAME": [f"HOLD {i}" for i in range(n)],
+        "IDENT": [_ident(i, 5) for i in range(n)],
+        "CRSOUT": course,
+        "CRSIN": (course + 180) % 360,
+        "DIRTURN": rng.choice(["R", "L"], n),
+        "STRUCTURES": "",
+        "SPEEDLIMIT": rng.choice([200, 230, 265], n),
+    }, racetracks), "holding_patterns")
+
+    n = counts["obstacles"]
+    agl = rng.integers(50, 2000, n)
+    geojson(_frame({
+        "Type_Code": rng.choice(["TOWER", "BLDG", "STACK", "WINDMILL", "POLE"], n),
+        "AGL": agl,
+        "AMSL": agl + rng.integers(0, 8000, n),
+        "Lighting": rng.choice(["R", "D", "H", "N", "U"], n),
+    }, shapely.points(rng.uniform(*LON_RANGE, n), rng.uniform(*LAT_RANGE, n))), "dof")
+
+    # Airport-diagram runways for half of the CIFP runways, so merge_runways finds matches
+    k = len(airports["bearing"])
+    pick = np.flatnonzero(rng.random(k) < 0.5)
+    rings, valid = create_runway_poly_array(airports["start"][pick], airports["end"][pick], airports["width"][pick])
+    pick, rings = pick[valid], rings[valid]
+    owner = airports["runway_owner"][pick]
+    bearing = airports["bearing"][pick]
+    geojson(_frame({
+        "FAA_ID": [airports["ids"][i][1:] for i in owner],
+        "ICAO_ID": [airports["ids"][i] for i in owner],
+        "RWY_ID": [f"{_runway_number(b)}/{_runway_number((b + 180) % 360)}" for b in bearing],
+        "SURFACE": rng.choice(["1", "2"], len(pick)),
+        "RWY_OPER": "2",
+    }, shapely.polygons(rings[:, :, :2])), "am_runways")
+
+    centers = (airports["start"][pick, :2] + airports["end"][pick, :2]) / 2
+    offset = rng.uniform(0.002, 0.004, len(pick))
+    taxiways = shapely.box(centers[:, 0] + offset, centers[:, 1] - 0.003, centers[:, 0] + offset + 0.0005, centers[:, 1] + 0.003)
+    geojson(_frame({
+        "FAA_ID": [airports["ids"][i][1:] for i in owner],
+        "ICAO_ID": [airports["ids"][i] for i in owner],
+        "DESIGNATOR": rng.choice(list("ABCDEF"), len(pick)),
+        "SURFACE": "1",
+        "TWY_OPER": "2",
+    }, taxiways), "am_taxiways")
+
+    metadata = {
+        ident: {"has_fuel": bool(rng.random() < 0.7), "has_tower": bool(rng.random() < 0.2), "far_139": ""}
+        for ident in airports["ids"]
+    }
+    with open(os.path.join(data_dir, "nasr_metadata.json"), "w") as f:
+        json.dump(metadata, f)
+
+
+def generate(out_dir: str, scale: float = 0.05, seed: int = 1) -> dict:
+    """Write a complete synthetic input set to out_dir and return its parameters."""
+    params = {"scale": scale, "seed": seed}
+    params_path = os.path.join(out_dir, PARAMS_FILE)
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            if json.load(f) == params:
+                print(f"Synthetic inputs (scale {scale}, seed {seed}) already in {out_dir}/")
+                return params
+
+    print(f"Generating synthetic inputs (scale {scale}, seed {seed}) in {out_dir}/...", flush=True)
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    counts = {name: max(1, round(n * scale)) for name, n in NATIONAL_COUNTS.items()}
+
+    airports = generate_airports(counts, rng)
+    write_cifp(os.path.join(out_dir, "FAACIFP18"), airports, counts, rng)
+    write_class_airspace(os.path.join(out_dir, "shapefiles"), airports, counts, rng)
+    write_adds(os.path.join(out_dir, "data"), airports, counts, rng)
+
+    with open(params_path, "w") as f:
+        json.dump(params, f)
+    print(f"  {counts}")
+    return params
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir", nargs="?", default="data/synth")
+    parser.add_argument("--scale", type=float, default=0.05, help="fraction of a national cycle (default 0.05)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    generate(args.out_dir, args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Tile size and feature-count budgets for the PMTiles archives in `output/`.
+
+Scans every tile of every archive and reports, for each zoom, the number of tiles, their
+compressed size (total and largest), the most features in one tile, and each layer's
+feature count and encoded size, followed by the largest tiles of each archive. Most
+archives are built with `--no-tile-size-limit` and `--no-feature-limit`, so this is where
+an oversized tile shows up.
+
+The check fails when
+
+  * a tile exceeds its archive's budget (TILE_BUDGETS, by default tippecanoe's own limits
+    of 500 KB compressed and 200,000 features), or
+  * a total (compressed bytes or largest tile per zoom, features or bytes per layer and
+    zoom) grew by more than `--tolerance` over the baseline, the report of the last passing
+    national build. Growth below GROWTH_FLOOR is ignored.
+
+Every run writes `data/tile_reports/<UTC time>.json`; a passing run becomes the new
+`baseline.json` unless an archive was clipped to a region (`build-pmtiles --bbox`).
+`build-pmtiles` runs the check after tiling.
+
+    tile-budget [--tolerance 0.15] [--top 10]
+"""
+
+import argparse
+import concurrent.futures
+import heapq
+import json
+import os
+import shutil
+import sys
+import time
+
+from src.tools.pmtiles_reader import PMTilesReader, layer_stats, tileid_to_zxy
+
+REPORT_DIR = "data/tile_reports"
+BASELINE = os.path.join(REPORT_DIR, "baseline.json")
+
+# tippecanoe's defaults for the limits most archives turn off
+DEFAULT_BUDGET = {"max_tile_bytes": 500_000, "max_tile_features": 200_000}
+
+# Archive name -> overrides of DEFAULT_BUDGET
+TILE_BUDGETS = {}
+
+# Smallest absolute growth that counts against the tolerance, by metric unit
+GROWTH_FLOOR = {"bytes": 64 * 1024, "features": 1000}
+
+
+def _zoom_runs(tile_id: int, run: int):
+    """Split a run of `run` tile ids starting at `tile_id` into (zoom, count) pieces."""
+    z, start = 0, 0
+    while start + (1 << (2 * z)) <= tile_id:
+        start += 1 << (2 * z)
+        z += 1
+    while run:
+        count = min(run, start + (1 << (2 * z)) - tile_id)
+        yield z, count
+        tile_id += count
+        run -= count
+        start += 1 << (2 * z)
+        z += 1
+
+
+def scan_archive(path: str, top: int = 10) -> dict:
+    """Per-zoom and per-layer size statistics of one archive, and its `top` largest tiles."""
+    zooms = {}
+    largest = []  # min-heap of (bytes, tile_id, features)
+    with PMTilesReader(path) as reader:
+        regional = "--clip-bounding-box" in reader.metadata().get("generator_options", "")
+        for tile_id, offset, length, run in reader.entries():
+            stats = layer_stats(reader.entry_data(offset, length))
+            features = sum(count for count, _ in stats.values())
+            # A run repeats one tile; each repeat is still a separate download
+            for z, count in _zoom_runs(tile_id, run):
+                zoom = zooms.setdefault(str(z), {
+                    "tiles": 0, "bytes": 0, "max_bytes": 0, "max_features": 0, "largest_tile": None, "layers": {},
+                })
+                zoom["tiles"] += count
+                zoom["bytes"] += length * count
+                if length > zoom["max_bytes"]:
+                    zoom["max_bytes"] = length
+                    zoom["largest_tile"] = "/".join(map(str, tileid_to_zxy(tile_id)))
+                zoom["max_features"] = max(zoom["max_features"], features)
+                for name, (layer_features, layer_bytes) in stats.items():
+                    layer = zoom["layers"].setdefault(name, {"features": 0, "max_features": 0, "bytes": 0, "max_bytes": 0})
+                    layer["features"] += layer_features * count
+                    layer["bytes"] += layer_bytes * count
+                    layer["max_features"] = max(layer["max_features"], layer_features)
+                    layer["max_bytes"] = max(layer["max_bytes"], layer_bytes)
+            item = (length, tile_id, features)
+            if len(largest) < top:
+                heapq.heappush(largest, item)
+            elif item > largest[0]:
+                heapq.heapreplace(largest, item)
+
+    return {
+        "bytes": os.path.getsize(path),
+        "regional": regional,
+        "zooms": dict(sorted(zooms.items(), key=lambda kv: int(kv[0]))),
+        "largest": [
+            {"tile": "/".join(map(str, tileid_to_zxy(tile_id))), "bytes": length, "features": features}
+            for length, tile_id, features in sorted(largest, reverse=True)
+        ],
+    }
+
+
+def scan(output_dir: str = "output", top: int = 10) -> dict[str, dict]:
+    """scan_archive for every archive in output_dir, in parallel."""
+    names = sorted(f[:-len(".pmtiles")] for f in os.listdir(output_dir) if f.endswith(".pmtiles"))
+    paths = [os.path.join(output_dir, f"{name}.pmtiles") for name in names]
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        return dict(zip(names, executor.map(scan_archive, paths, [top] * len(paths))))
+
+
+def print_report(archives: dict[str, dict]) -> None:
+    for name, archive in archives.items():
+        tiles = sum(zoom["tiles"] for zoom in archive["zooms"].values())
+        print(f"\n{name}.pmtiles: {tiles} tiles, {archive['bytes'] / 1e6:.1f} MB")
+        print(f"  {'z':>3} {'tiles':>8} {'total KB':>10} {'mean KB':>8} {'max KB':>8} {'max feat':>9}  {'largest':<14} features per layer")
+        for z, zoom in archive["zooms"].items():
+            layers = " ".join(f"{layer}={stats['features']}" for layer, stats in zoom["layers"].items())
+            print(
+                f"  {z:>3} {zoom['tiles']:>8} {zoom['bytes'] / 1e3:>10.1f} {zoom['bytes'] / zoom['tiles'] / 1e3:>8.1f} "
+                f"{zoom['max_bytes'] / 1e3:>8.1f} {zoom['max_features']:>9}  {zoom['largest_tile']:<14} {layers}"
+            )
+        largest = ", ".join(f"{t['tile']} ({t['bytes'] / 1e3:.0f} KB, {t['features']} features)" for t in archive["largest"])
+        print(f"  Largest: {largest}")
+
+
+def over_budget(archives: dict[str, dict]) -> list[str]:
+    """Zooms whose largest tile breaks its archive's size or feature budget."""
+    failures = []
+    for name, archive in archives.items():
+        budget = {**DEFAULT_BUDGET, **TILE_BUDGETS.get(name, {})}
+        for z, zoom in archive["zooms"].items():
+            if zoom["max_bytes"] > budget["max_tile_bytes"]:
+                failures.append(f"{name} z{z}: tile {zoom['largest_tile']} is {zoom['max_bytes']} bytes (budget {budget['max_tile_bytes']})")
+            if zoom["max_features"] > budget["max_tile_features"]:
+                failures.append(f"{name} z{z}: a tile has {zoom['max_features']} features (budget {budget['max_tile_features']})")
+    return failures
+
+
+def _metrics(archives: dict[str, dict]) -> dict[str, int]:
+    metrics = {}
+    for name, archive in archives.items():
+        for z, zoom in archive["zooms"].items():
+            metrics[f"{name} z{z} bytes"] = zoom["bytes"]
+            metrics[f"{name} z{z} max_bytes"] = zoom["max_bytes"]
+            for layer, stats in zoom["layers"].items():
+                metrics[f"{name} z{z} {layer} features"] = stats["features"]
+                metrics[f"{name} z{z} {layer} bytes"] = stats["bytes"]
+    return metrics
+
+
+def growth(archives: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Totals that grew by more than `tolerance` (and GROWTH_FLOOR) over the baseline."""
+    failures = []
+    before = _metrics(baseline)
+    for key, value in _metrics(archives).items():
+        base = before.get(key)
+        if not base:
+            continue
+        floor = GROWTH_FLOOR["features" if key.endswith("features") else "bytes"]
+        if value > base * (1 + tolerance) and value - base >= floor:
+            failures.append(f"{key}: {base} -> {value} (+{value / base - 1:.0%})")
+    return failures
+
+
+def check(output_dir: str = "output", tolerance: float = 0.15, top: int = 10) -> dict:
+    """Scan, print and gate the archives; returns the report written to REPORT_DIR."""
+    report = {"started_at": round(time.time(), 3), "tolerance": tolerance, "archives": scan(output_dir, top)}
+    print_report(report["archives"])
+
+    failures = over_budget(report["archives"])
+    regional = [name for name, archive in report["archives"].items() if archive["regional"]]
+    if regional:
+        print(f"\nRegional archives ({', '.join(regional)}): skipping the growth check")
+    elif os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+        report["baseline"] = baseline["started_at"]
+        failures += growth(report["archives"], baseline["archives"], tolerance)
+    report["failures"] = failures
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(report["started_at"]))
+    path = os.path.join(REPORT_DIR, f"{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+    if failures:
+        print(f"\nTile budget check FAILED ({path}):")
+        for failure in failures:
+            print(f"  {failure}")
+    else:
+        if not regional:
+            shutil.copyfile(path, BASELINE)
+        print(f"\nTile budget check passed ({path})")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed growth over the baseline (default 0.15)")
+    parser.add_argument("--top", type=int, default=10, help="largest tiles to list per archive")
+    args = parser.parse_args()
+
+    if check(args.output_dir, args.tolerance, args.top)["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()